@@ -1,29 +1,74 @@
 # backend/app/main.py
-from fastapi import FastAPI
+import asyncio
+import logging
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.metrics import MetricsMiddleware, registry, CONTENT_TYPE
+from backend.app.services.admission import AdmissionMiddleware
+from backend.app.services.lifecycle import server_state, configure_threadpool, warm_up, background_services
 from backend.app.routes.sql_server_routes import router as sql_server_router
 from backend.app.routes.mongo_routes import router as mongo_router
+from backend.app.routes.parquet_routes import router as parquet_router
+from backend.app.routes.diagnostics_routes import router as diagnostics_router
+from backend.app.routes.analytics_routes import router as analytics_router
+from backend.app.routes.federated_routes import router as federated_router
+from backend.app.routes.sync_routes import router as sync_router
+from backend.app.routes.jobs_routes import router as jobs_router
+from backend.app.routes.health_routes import router as health_router
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
-    应用生命周期管理器。
+    应用生命周期管理器。每个工作进程各自执行：启动时打开并预热数据库资源，完成后才开始接受请求；
+    关闭时（进行中的请求已排空）停止后台服务并释放资源。
     """
     # 启动时的事件
     print("Application startup: Initializing resources...")
+    configure_threadpool()
+    warmup = await warm_up()
+    logger.info("Warm-up finished: %s", warmup)
+    # 同步线程和任务队列只在一个工作进程中运行；async 任务在该进程的主事件循环上执行
+    background_services.start(asyncio.get_running_loop())
     yield
     # 关闭时的事件
     print("Application shutdown: Releasing resources...")
+    server_state.ready = False
+    # 运行中的任务在检查点退出，可恢复的任务下次启动时继续
+    await asyncio.to_thread(background_services.stop)
     SQLServerDatabaseManager.close_connection()
+    await MongoDatabaseManager.close_async_connection()
+    MongoDatabaseManager.close_connection()
 
 # 创建 FastAPI 实例
 app = FastAPI(lifespan=lifespan)
 
+# 截止时间、断开取消和按后端的并发限制（在指标中间件内层，被拒绝的请求也计入指标）
+app.add_middleware(AdmissionMiddleware)
+# 按路由记录请求耗时和错误数
+app.add_middleware(MetricsMiddleware)
+
 # 注册路由
 app.include_router(sql_server_router, prefix="/api/v1/sql_server_database", tags=["SQLServerDatabase"])
 app.include_router(mongo_router, prefix="/api/v1/mongo_database", tags=["MongoDB"])
+app.include_router(parquet_router, prefix="/api/v1/parquet", tags=["Parquet"])
+app.include_router(analytics_router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(federated_router, prefix="/api/v1/federated", tags=["Federated"])
+app.include_router(sync_router, prefix="/api/v1/sync", tags=["Sync"])
+app.include_router(jobs_router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(diagnostics_router, prefix="/diagnostics", tags=["Diagnostics"])
+app.include_router(health_router, prefix="/health", tags=["Health"])
+
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus 抓取端点。
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/")
@@ -0,0 +1,71 @@
+# backend/app/routes/analytics_routes.py
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from backend.app.config import Config
+from backend.app.routes.sql_server_routes import FilterCondition
+from backend.app.services.analytics import materialize, list_snapshots, run_query
+
+router = APIRouter()
+
+# 定义请求体模型
+class MaterializeRequest(BaseModel):
+    source: Literal["sql_server", "mongo"] = Field(..., description="数据来源")
+    name: str = Field(..., min_length=1, max_length=100, description="表名或集合名")
+    columns: Optional[List[str]] = Field(default=None, description="只物化这些列（默认全部）")
+
+class JoinSpec(BaseModel):
+    snapshot: str = Field(..., description="右侧快照名，例如 mongo.customers")
+    left_on: str = Field(..., description="左侧连接键")
+    right_on: str = Field(..., description="右侧连接键")
+    how: Literal["inner", "left", "right", "full"] = Field(default="inner", description="连接类型")
+
+class Aggregation(BaseModel):
+    column: str = Field(..., description="聚合列")
+    func: Literal["sum", "mean", "min", "max", "count", "count_distinct", "stddev", "variance"] = Field(
+        ..., description="聚合函数"
+    )
+    as_: Optional[str] = Field(default=None, alias="as", description="输出列名")
+
+class AnalyticsQueryRequest(BaseModel):
+    snapshot: str = Field(..., description="快照名，例如 sql_server.orders")
+    columns: Optional[List[str]] = Field(default=None, description="无聚合时输出的列")
+    filters: List[FilterCondition] = Field(default=[], description="筛选条件，条件之间为 AND")
+    join: Optional[JoinSpec] = Field(default=None, description="与另一个快照连接")
+    group_by: List[str] = Field(default=[], description="分组列")
+    aggregations: List[Aggregation] = Field(default=[], description="聚合列表")
+    order_by: List[Tuple[str, Literal["asc", "desc"]]] = Field(default=[], description="排序，例如 [[\"total\", \"desc\"]]")
+    limit: Optional[int] = Field(default=None, gt=0, le=Config.ANALYTICS_MAX_RESULT_ROWS, description="最多返回的行数")
+
+
+@router.post("/snapshots")
+def materialize_endpoint(request: MaterializeRequest):
+    """
+    将表或集合物化为本地 Parquet 快照（覆盖同名旧快照）。
+    """
+    result = materialize(request.source, request.name, request.columns)
+    if result["status"] == "error":
+        raise HTTPException(status_code=500, detail=result["message"])
+    result.pop("status")
+    return result
+
+
+@router.get("/snapshots")
+def list_snapshots_endpoint():
+    """
+    列出本节点上的快照及其生成时间。
+    """
+    return {"snapshots": list_snapshots()}
+
+
+@router.post("/query")
+def analytics_query_endpoint(request: AnalyticsQueryRequest):
+    """
+    在本地快照上执行只读聚合 / JOIN 查询，不访问源数据库。结果附带快照的生成时间（freshness / as_of）。
+    """
+    spec = request.model_dump(by_alias=True)
+    result = run_query(spec)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    result.pop("status")
+    return result
@@ -0,0 +1,22 @@
+# backend/app/routes/diagnostics_routes.py
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from backend.app.services.slow_query_log import slow_query_log
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+def slow_queries_endpoint(
+    limit: int = Query(default=20, ge=1, le=500, description="返回的指纹数"),
+    backend: Optional[Literal["sqlserver", "mongo"]] = Query(default=None, description="只看某个后端"),
+    include_plans: bool = Query(default=True, description="是否附带最近一次采集的执行计划"),
+):
+    """
+    按指纹分组列出慢查询日志中总耗时最高的语句。
+    """
+    try:
+        offenders = slow_query_log.top(limit=limit, backend=backend, include_plans=include_plans)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"threshold_ms": slow_query_log.threshold_ms, "slow_queries": offenders}
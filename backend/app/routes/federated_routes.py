@@ -0,0 +1,51 @@
+# backend/app/routes/federated_routes.py
+from typing import Dict, Literal, Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from backend.app.services.federated_join import federated_join
+from backend.app.services.read_routing import resolve_routing
+
+router = APIRouter()
+
+# 定义请求体模型
+class FederatedJoinRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="SQL 查询语句（不能包含 ORDER BY）")
+    collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
+    filter: Dict = Field(default={}, description="MongoDB 筛选条件")
+    projection: Optional[Dict] = Field(default=None, description="MongoDB 投影（自动包含连接键）")
+    sql_key: str = Field(..., description="SQL 结果中的连接键列")
+    mongo_key: str = Field(..., description="文档中的连接键字段")
+    how: Literal["inner", "left"] = Field(default="inner", description="连接类型，left 保留没有匹配文档的 SQL 行")
+    build_side: Literal["auto", "sql", "mongo"] = Field(
+        default="auto", description="构建哈希表的一侧，auto 时先计数并选择较小的一侧"
+    )
+    key_batch_size: Optional[int] = Field(default=None, ge=1, le=2000, description="每批下推的键数")
+
+
+@router.post("/join")
+def federated_join_endpoint(
+    request: FederatedJoinRequest,
+    x_read_preference: Optional[str] = Header(default=None),
+    x_max_staleness: Optional[float] = Header(default=None),
+    x_read_concern: Optional[str] = Header(default=None),
+):
+    """
+    SQL Server 查询结果与 MongoDB 集合的联邦连接，以 NDJSON 流式返回。
+    每行为 {"sql": {...}, "mongo": {...}}，最后一行为 {"stats": {...}}。
+    两侧查询使用同一读路由，可用 X-Read-Preference、X-Max-Staleness、X-Read-Concern 请求头覆盖。
+    """
+    try:
+        routing = resolve_routing("federated.join", x_read_preference, x_max_staleness, x_read_concern)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = federated_join(
+        request.query, request.collection_name, request.sql_key, request.mongo_key,
+        filter_query=request.filter, projection=request.projection, how=request.how,
+        build_side=request.build_side, key_batch_size=request.key_batch_size, routing=routing,
+    )
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return StreamingResponse(
+        result["lines"], media_type="application/x-ndjson", headers={"X-Build-Side": result["build_side"]}
+    )
@@ -0,0 +1,24 @@
+# backend/app/routes/health_routes.py
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from backend.app.services.lifecycle import server_state, check_readiness
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness_endpoint():
+    """
+    存活检查：事件循环能够响应即返回 200，不访问数据库（后端故障不应导致进程被重启）。
+    """
+    return {"status": "alive", "pid": server_state.pid, "uptime_seconds": round(time.time() - server_state.started_at, 3)}
+
+
+@router.get("/ready")
+async def readiness_endpoint():
+    """
+    就绪检查：预热完成、没有在排空且所需后端可达时返回 200，否则返回 503。
+    """
+    result = await check_readiness()
+    return JSONResponse(result, status_code=200 if result["status"] == "ready" else 503)
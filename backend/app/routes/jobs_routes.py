@@ -0,0 +1,124 @@
+# backend/app/routes/jobs_routes.py
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from backend.app.config import Config
+from backend.app.routes.parquet_routes import LoadParquetRequest, _resolve_data_path
+from backend.app.routes.mongo_routes import CreateCollectionRequest
+from backend.app.routes.analytics_routes import MaterializeRequest
+from backend.app.services.jobs import job_manager, QUEUED, RUNNING, FAILED, CANCELLED
+from backend.app.services import job_types  # noqa: F401  注册任务类型
+
+router = APIRouter()
+
+# 定义请求体模型
+class QueryExportRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="完整的 SQL 查询语句")
+    batch_size: Optional[int] = Field(default=None, gt=0, description="每次 fetchmany 的行数")
+
+
+def _submit(job_type: str, params: dict) -> dict:
+    try:
+        return job_manager.submit(job_type, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _get_job(job_id: str) -> dict:
+    job = job_manager.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+@router.post("/parquet-load", status_code=202)
+def submit_parquet_load(request: LoadParquetRequest):
+    """
+    提交 Parquet 导入任务。进程重启后从最后完成的行组续传。
+    """
+    params = request.model_dump()
+    params["file_path"] = _resolve_data_path(request.file_path)
+    return _submit("parquet_load", params)
+
+
+@router.post("/create-collection", status_code=202)
+def submit_create_collection(request: CreateCollectionRequest):
+    """
+    提交创建集合（含索引构建）任务。
+    """
+    return _submit("create_collection", request.model_dump())
+
+
+@router.post("/delete-table", status_code=202)
+def submit_delete_table(table_name: str):
+    """
+    提交删除表任务。
+    """
+    return _submit("delete_table", {"table_name": table_name})
+
+
+@router.post("/query-export", status_code=202)
+def submit_query_export(request: QueryExportRequest):
+    """
+    提交查询导出任务，完成后通过 /api/v1/jobs/{job_id}/result 下载 NDJSON 结果。
+    """
+    return _submit("query_export", request.model_dump())
+
+
+@router.post("/analytics-snapshot", status_code=202)
+def submit_analytics_snapshot(request: MaterializeRequest):
+    """
+    提交分析快照物化任务。
+    """
+    return _submit("analytics_snapshot", request.model_dump())
+
+
+@router.get("/")
+def list_jobs_endpoint(
+    status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = None,
+    job_type: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """
+    按提交时间倒序列出任务。
+    """
+    return {"jobs": job_manager.store.list(status, job_type, limit)}
+
+
+@router.get("/{job_id}")
+def get_job_endpoint(job_id: str):
+    """
+    查询任务状态和进度。
+    """
+    return _get_job(job_id)
+
+
+@router.get("/{job_id}/result")
+def get_job_result_endpoint(job_id: str):
+    """
+    返回任务结果。查询导出任务返回 NDJSON 结果文件；未完成时返回 409。
+    """
+    job = _get_job(job_id)
+    if job["status"] in (QUEUED, RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}.")
+    if job["status"] in (FAILED, CANCELLED):
+        raise HTTPException(status_code=409, detail={"status": job["status"], "message": job["error"]})
+    if job["type"] == "query_export":
+        result_path = os.path.join(Config.JOB_RESULT_DIR, f"{job_id}.ndjson")
+        if not os.path.exists(result_path):
+            raise HTTPException(status_code=410, detail="The result file has expired.")
+        return FileResponse(result_path, media_type="application/x-ndjson", filename=f"{job_id}.ndjson")
+    return job["result"]
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job_endpoint(job_id: str):
+    """
+    取消任务。排队中的任务立即取消；运行中的任务在下一个检查点停止，返回时状态可能仍为 running。
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
@@ -1,9 +1,17 @@
 import logging
-import traceback
-from fastapi import APIRouter, HTTPException
+from bson import json_util
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from backend.app.services.mongo_service import create_collection, insert_data, update_data, delete_data
-from typing import List, Dict, Optional
+from backend.app.config import Config
+from backend.app.services.mongo_service import (
+    create_collection, insert_data, update_data, delete_data, bulk_write, create_indexes, get_index_advice,
+    find_documents, stream_documents, aggregate_documents, explain_aggregate, pipeline_writes
+)
+from backend.app.services.ndjson_ingest import ingest_ndjson
+from backend.app.services.read_routing import resolve_routing
+from backend.app.services.write_coalescer import insert_documents_coalesced
+from typing import List, Dict, Optional, Literal, Tuple, Union
 
 # 初始化日志记录器
 logger = logging.getLogger(__name__)
@@ -12,7 +20,11 @@ router = APIRouter()
 # 定义请求体模型
 class CreateCollectionRequest(BaseModel):
     collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
-    indexes: List[dict] = Field(default=[], description="索引配置列表")
+    indexes: List[dict] = Field(default=[], description="索引配置列表，支持单字段、复合、部分和 TTL 索引")
+
+class CreateIndexesRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
+    indexes: List[dict] = Field(..., min_length=1, description="索引配置列表（格式同 create-collection）")
 
 class InsertDataRequest(BaseModel):
     collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
@@ -29,6 +41,47 @@ class DeleteDataRequest(BaseModel):
     filter_query: Dict = Field(..., description="筛选条件")
     multi: Optional[bool] = Field(default=False, description="是否删除多条数据（默认 False）")
 
+class BulkWriteOperation(BaseModel):
+    op: Literal["insert_one", "update_one", "update_many", "replace_one", "delete_one", "delete_many"] = Field(
+        ..., description="操作类型"
+    )
+    document: Optional[Dict] = Field(default=None, description="insert_one 插入的文档")
+    filter: Optional[Dict] = Field(default=None, description="更新、替换、删除的筛选条件")
+    update: Optional[Union[Dict, List[Dict]]] = Field(default=None, description="更新文档（任意更新操作符）或更新管道")
+    replacement: Optional[Dict] = Field(default=None, description="replace_one 的替换文档")
+    upsert: bool = Field(default=False, description="不存在匹配文档时是否插入")
+    array_filters: Optional[List[Dict]] = Field(default=None, description="数组元素筛选条件")
+
+class BulkWriteRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
+    operations: List[BulkWriteOperation] = Field(..., min_length=1, description="写操作列表")
+    ordered: bool = Field(default=True, description="是否按顺序执行并在第一个错误处停止")
+
+class FindRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
+    filter: Dict = Field(default={}, description="筛选条件")
+    projection: Optional[Dict] = Field(default=None, description="投影，例如 {\"name\": 1}")
+    sort: List[Tuple[str, Literal[1, -1]]] = Field(default=[], description="排序键，例如 [[\"created_at\", -1]]")
+    limit: Optional[int] = Field(
+        default=None, ge=1, le=Config.MONGO_FIND_MAX_LIMIT,
+        description="每页文档数；非流式默认 MONGO_FIND_DEFAULT_LIMIT，流式不提供时返回全部结果"
+    )
+    batch_size: Optional[int] = Field(default=None, ge=1, le=10000, description="游标每批从服务器获取的文档数")
+    continuation_token: Optional[str] = Field(default=None, description="上一页返回的续页令牌")
+    stream: bool = Field(default=False, description="是否以 NDJSON 流式返回")
+
+class AggregateRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, max_length=100, description="集合名称")
+    pipeline: List[Dict] = Field(..., description="聚合管道阶段列表，例如 [{\"$match\": {...}}, {\"$group\": {...}}]")
+    allow_disk_use: Optional[bool] = Field(
+        default=None, description="$group、$sort 等阶段超出内存上限时是否写临时文件，默认 MONGO_AGGREGATE_ALLOW_DISK_USE"
+    )
+    max_time_ms: Optional[int] = Field(
+        default=None, ge=1, description="服务器端执行时间上限（毫秒），默认 MONGO_AGGREGATE_MAX_TIME_MS"
+    )
+    batch_size: Optional[int] = Field(default=None, ge=1, le=10000, description="游标每批从服务器获取的文档数")
+    explain: bool = Field(default=False, description="只返回查询计划及前导 $match/$sort 是否使用索引，不执行管道")
+
 
 # 定义响应模型
 class InsertDataResponse(BaseModel):
@@ -36,12 +89,12 @@ class InsertDataResponse(BaseModel):
     inserted_ids: List[str]
 
 @router.post("/create-collection")
-def create_collection_endpoint(request: CreateCollectionRequest):
+async def create_collection_endpoint(request: CreateCollectionRequest):
     """
     创建集合的 API 端点。
     """
     try:
-        result = create_collection(request.collection_name, request.indexes)
+        result = await create_collection(request.collection_name, request.indexes)
         if result["status"] == "error":
             raise HTTPException(status_code=400, detail=result["message"])
         return {"message": result["message"]}
@@ -50,12 +103,16 @@ def create_collection_endpoint(request: CreateCollectionRequest):
 
 
 @router.post("/insert-data", response_model=InsertDataResponse)
-def insert_data_endpoint(request: InsertDataRequest):
+async def insert_data_endpoint(request: InsertDataRequest):
     """
     插入数据的 API 端点。
     """
     try:
-        result = insert_data(request.collection_name, request.data)
+        # 开启写合并时，同一集合的并发插入合并为一次 insert_many
+        if Config.WRITE_COALESCING_ENABLED:
+            result = await insert_documents_coalesced(request.collection_name, request.data)
+        else:
+            result = await insert_data(request.collection_name, request.data)
         if result["status"] == "error":
             logger.error(f"Insert data error: {result['message']}")
             raise HTTPException(status_code=400, detail=result["message"])
@@ -63,23 +120,49 @@ def insert_data_endpoint(request: InsertDataRequest):
             "message": result["message"],
             "inserted_ids": result["inserted_ids"],
         }
-    except Exception as e:
-        # 捕获完整的异常信息
-        error_message = f"Unhandled exception: {str(e)}"
-        error_traceback = traceback.format_exc()
-        logger.error(f"{error_message}\n{error_traceback}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"{error_message} | Traceback: {error_traceback}",
-        )
+    except HTTPException:
+        raise
+    except Exception:
+        # 完整堆栈只写日志，不返回给客户端
+        logger.exception("Unhandled exception in insert-data")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.post("/ingest-ndjson")
+async def ingest_ndjson_endpoint(
+    request: Request,
+    collection_name: str = Query(..., min_length=1, max_length=100, description="集合名称"),
+    batch_size: Optional[int] = Query(default=None, ge=1, le=100000, description="每次 insert_many 的文档数"),
+    extended_json: bool = Query(default=False, description="按 MongoDB Extended JSON 解析（$oid、$date 等）"),
+    max_rejected: Optional[int] = Query(default=None, ge=0, description="被拒绝的行超过该数量时停止导入"),
+):
+    """
+    流式导入 NDJSON 的 API 端点：请求体每行一个 JSON 对象，可用 gzip 压缩（Content-Encoding: gzip 或自动识别）。
+    请求体边读边解析，按 batch_size 分批无序写入，内存占用与上传大小无关；
+    返回逐批写入数和被拒绝的行号及原因。
+    """
+    compressed = True if request.headers.get("content-encoding", "").lower() == "gzip" else None
+    result = await ingest_ndjson(
+        collection_name,
+        request.stream(),
+        compressed=compressed,
+        batch_size=batch_size,
+        extended_json=extended_json,
+        max_rejected=max_rejected,
+    )
+    if result["status"] == "error":
+        result.pop("status")
+        raise HTTPException(status_code=400, detail=result)
+    result.pop("status")
+    return result
 
 @router.put("/update-data")
-def update_data_endpoint(update_request: UpdateDataRequest):
+async def update_data_endpoint(update_request: UpdateDataRequest):
     """
     更新数据的 API 端点。
     """
     try:
-        result = update_data(
+        result = await update_data(
             collection_name=update_request.collection_name,
             filter_query=update_request.filter_query,
             update_values=update_request.update_values,
@@ -98,12 +181,12 @@ def update_data_endpoint(update_request: UpdateDataRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/delete-data")
-def delete_data_endpoint(delete_request: DeleteDataRequest):
+async def delete_data_endpoint(delete_request: DeleteDataRequest):
     """
     删除数据的 API 端点。
     """
     try:
-        result = delete_data(
+        result = await delete_data(
             collection_name=delete_request.collection_name,
             filter_query=delete_request.filter_query,
             multi=delete_request.multi,
@@ -117,4 +200,120 @@ def delete_data_endpoint(delete_request: DeleteDataRequest):
             "deleted_count": result["deleted_count"],
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk-write")
+async def bulk_write_endpoint(request: BulkWriteRequest):
+    """
+    在一次往返中执行混合写操作的 API 端点。
+    返回汇总计数和逐操作错误（write_errors 中的 index 对应 operations 的下标）。
+    """
+    result = await bulk_write(
+        request.collection_name,
+        [operation.model_dump(exclude_none=True) for operation in request.operations],
+        ordered=request.ordered,
+    )
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    result.pop("status")
+    return result
+
+
+@router.post("/create-indexes")
+async def create_indexes_endpoint(request: CreateIndexesRequest):
+    """
+    为已有集合批量创建复合、部分或 TTL 索引的 API 端点。
+    """
+    result = await create_indexes(request.collection_name, request.indexes)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return {"message": result["message"], "index_names": result["index_names"]}
+
+
+@router.get("/index-advice")
+async def index_advice_endpoint(collection_name: Optional[str] = None):
+    """
+    根据 update-data / delete-data 等操作的筛选形状和耗时给出索引建议。
+    """
+    result = await get_index_advice(collection_name)
+    if result["status"] == "error":
+        raise HTTPException(status_code=500, detail=result["message"])
+    return {"recommendations": result["recommendations"], "shapes": result["shapes"]}
+
+
+@router.post("/find")
+async def find_endpoint(
+    request: FindRequest,
+    x_read_preference: Optional[str] = Header(default=None),
+    x_max_staleness: Optional[float] = Header(default=None),
+    x_read_concern: Optional[str] = Header(default=None),
+):
+    """
+    按键集分页查询文档的 API 端点。
+    文档以 MongoDB Extended JSON（relaxed）编码，ObjectId、日期等类型可无损还原；
+    stream=true 时以 NDJSON 逐行返回，分页时最后一行为 {"continuation_token": ...}。
+    X-Read-Preference、X-Max-Staleness（秒，至少 90）和 X-Read-Concern 请求头覆盖默认的读偏好和读关注。
+    """
+    try:
+        routing = resolve_routing("mongo.find", x_read_preference, x_max_staleness, x_read_concern)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    arguments = dict(
+        collection_name=request.collection_name,
+        filter_query=request.filter,
+        projection=request.projection,
+        sort=[list(key) for key in request.sort],
+        limit=request.limit,
+        batch_size=request.batch_size,
+        continuation_token=request.continuation_token,
+        routing=routing,
+    )
+    if request.stream:
+        result = await stream_documents(**arguments)
+        if result["status"] == "error":
+            raise HTTPException(status_code=400, detail=result["message"])
+        return StreamingResponse(result["lines"], media_type="application/x-ndjson")
+
+    result = await find_documents(**arguments)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    result.pop("status")
+    return Response(content=json_util.dumps(result), media_type="application/json")
+
+
+@router.post("/aggregate")
+async def aggregate_endpoint(
+    request: AggregateRequest,
+    x_read_preference: Optional[str] = Header(default=None),
+    x_max_staleness: Optional[float] = Header(default=None),
+    x_read_concern: Optional[str] = Header(default=None),
+):
+    """
+    在 MongoDB 服务器端执行聚合管道的 API 端点，结果以 NDJSON（MongoDB Extended JSON，relaxed）逐行返回。
+    explain=true 时返回查询计划汇总：前导 $match / $sort 是否下推并使用索引、哪些阶段留在聚合层执行。
+    以 $out / $merge 写入的管道只能访问主库；其余管道可用 X-Read-Preference、X-Max-Staleness、X-Read-Concern 请求头路由。
+    """
+    endpoint = "mongo.aggregate_write" if pipeline_writes(request.pipeline) else "mongo.aggregate"
+    try:
+        routing = resolve_routing(endpoint, x_read_preference, x_max_staleness, x_read_concern)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    arguments = dict(
+        collection_name=request.collection_name,
+        pipeline=request.pipeline,
+        allow_disk_use=request.allow_disk_use,
+        max_time_ms=request.max_time_ms,
+        routing=routing,
+    )
+    if request.explain:
+        result = await explain_aggregate(**arguments)
+        if result["status"] == "error":
+            raise HTTPException(status_code=400, detail=result["message"])
+        result.pop("status")
+        return result
+
+    result = await aggregate_documents(batch_size=request.batch_size, **arguments)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return StreamingResponse(result["lines"], media_type="application/x-ndjson")
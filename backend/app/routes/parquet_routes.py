@@ -0,0 +1,72 @@
+# backend/app/routes/parquet_routes.py
+import os
+from typing import Dict, Literal, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from backend.app.config import Config
+from backend.app.services.parquet_loader import load_parquet, inspect_parquet
+
+router = APIRouter()
+
+# 定义请求体模型
+class LoadParquetRequest(BaseModel):
+    file_path: str = Field(..., description="Parquet 文件路径（相对于 Config.PARQUET_DATA_DIR）")
+    target: Literal["sql_server", "mongo"] = Field(..., description="写入目标")
+    name: str = Field(..., min_length=1, max_length=100, description="目标表名或集合名")
+    batch_size: Optional[int] = Field(default=None, gt=0, description="每批读取的行数")
+    column_mapping: Optional[Dict[str, str]] = Field(default=None, description="{源字段: 目标列} 映射")
+    start_row_group: int = Field(default=0, ge=0, description="从该行组开始导入（断点续传）")
+    create_table: bool = Field(default=False, description="是否根据 Parquet schema 创建 SQL Server 表")
+
+
+def _resolve_data_path(file_path: str) -> str:
+    """
+    将请求中的路径解析到数据目录内，拒绝越出数据目录的路径。
+    """
+    data_dir = os.path.realpath(Config.PARQUET_DATA_DIR)
+    full_path = os.path.realpath(os.path.join(data_dir, file_path))
+    if os.path.commonpath([data_dir, full_path]) != data_dir:
+        raise HTTPException(status_code=400, detail="file_path must be inside the data directory.")
+    if not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail=f"File '{file_path}' not found.")
+    return full_path
+
+
+@router.get("/inspect")
+def inspect_parquet_endpoint(file_path: str):
+    """
+    查看 Parquet 文件的行数、行组数和字段类型（只读取元数据）。
+    """
+    try:
+        return inspect_parquet(_resolve_data_path(file_path))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/load")
+def load_parquet_endpoint(request: LoadParquetRequest):
+    """
+    将 Parquet 文件按记录批次导入 SQL Server 表或 MongoDB 集合的 API 端点。
+    失败时返回的 next_row_group 可作为 start_row_group 续传。
+    """
+    result = load_parquet(
+        _resolve_data_path(request.file_path),
+        request.target,
+        request.name,
+        batch_size=request.batch_size,
+        column_mapping=request.column_mapping,
+        start_row_group=request.start_row_group,
+        create_table=request.create_table,
+    )
+    if result["status"] == "error":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": result["message"],
+                "rows_loaded": result["rows_loaded"],
+                "next_row_group": result["next_row_group"],
+            },
+        )
+    return result
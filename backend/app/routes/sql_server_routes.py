@@ -1,7 +1,23 @@
 # backend/app/routes/sql_server_routes.py
-from fastapi import APIRouter, HTTPException, Form
-from pydantic import BaseModel
-from ..services.sql_server_service import create_table, insert_data, delete_data, update_data, delete_table, join_tables
+from fastapi import APIRouter, HTTPException, Form, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from ..services.sql_server_service import (
+    create_table, insert_data, bulk_insert_data, delete_data, update_data, delete_table, join_tables,
+    stream_join_tables, update_rows, delete_rows
+)
+from ..services.write_coalescer import insert_data_coalesced
+from ..services.streaming import iter_ndjson, iter_json_document
+from ..services.query_cache import query_cache
+from ..services.sql_builder import statement_cache_info
+from ..services.read_routing import resolve_routing
+from ..services.arrow_export import (
+    negotiate_format, schema_from_description, iter_arrow_ipc, iter_parquet,
+    ARROW_STREAM_MEDIA_TYPE, ARROW_FILE_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+)
+from ..config import Config
 
 router = APIRouter()
 
@@ -11,6 +27,28 @@ class InsertDataRequest(BaseModel):
     columns: list
     values: list
 
+class BulkInsertDataRequest(BaseModel):
+    table_name: str
+    columns: list
+    rows: List[list] = Field(..., min_length=1, description="待插入的多行数据，每行与 columns 顺序一致")
+    chunk_size: Optional[int] = Field(default=None, gt=0, description="每块行数（默认使用配置值）")
+
+class FilterCondition(BaseModel):
+    column: str = Field(..., description="列名")
+    op: Literal["=", "!=", "<>", "<", "<=", ">", ">=", "like", "not_like", "in", "not_in", "between",
+                "is_null", "is_not_null"] = Field(default="=", description="运算符")
+    value: Any = Field(default=None, description="比较值；in/not_in 为列表，between 为 [下限, 上限]")
+
+class UpdateRowsRequest(BaseModel):
+    table_name: str
+    updates: Dict[str, Any] = Field(..., min_length=1, description="更新字段和值")
+    filters: List[FilterCondition] = Field(..., min_length=1, description="筛选条件，条件之间为 AND")
+
+class DeleteRowsRequest(BaseModel):
+    table_name: str
+    filters: List[FilterCondition] = Field(..., min_length=1, description="筛选条件，条件之间为 AND")
+
+
 @router.post("/create_table")
 def create_table_endpoint(table_name: str, table_query: str):
     """
@@ -32,14 +70,35 @@ def insert_data_endpoint(request: InsertDataRequest):
     :param request: 包含表名、字段名列表和字段值列表的请求体
     """
     try:
-        # 解包请求数据
-        result = insert_data(request.table_name, request.columns, request.values)
+        # 开启写合并时，并发的单行插入合并为一次 executemany 和一次提交
+        if Config.WRITE_COALESCING_ENABLED:
+            result = insert_data_coalesced(request.table_name, request.columns, request.values)
+        else:
+            result = insert_data(request.table_name, request.columns, request.values)
         if result["status"] == "error":
             raise HTTPException(status_code=400, detail=result["message"])
         return {"message": result["message"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/bulk_insert_data")
+def bulk_insert_data_endpoint(request: BulkInsertDataRequest):
+    """
+    批量插入数据的 API 端点。
+    :param request: 包含表名、字段名列表、多行字段值和可选块大小的请求体
+    """
+    result = bulk_insert_data(request.table_name, request.columns, request.rows, request.chunk_size)
+    if result["status"] == "error":
+        raise HTTPException(
+            status_code=400,
+            detail={"message": result["message"], "chunks": result.get("chunks", [])},
+        )
+    return {
+        "message": result["message"],
+        "inserted_count": result["inserted_count"],
+        "chunks": result["chunks"],
+    }
+
 @router.delete("/delete_data")
 def delete_data_endpoint(table_name: str, condition: str):
     """
@@ -69,6 +128,27 @@ def update_data_endpoint(
 
 
 
+@router.put("/update_rows")
+def update_rows_endpoint(request: UpdateRowsRequest):
+    """
+    使用结构化条件更新数据的 API 端点（参数化语句，可复用执行计划）。
+    """
+    result = update_rows(request.table_name, request.updates, [f.model_dump() for f in request.filters])
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+@router.delete("/delete_rows")
+def delete_rows_endpoint(request: DeleteRowsRequest):
+    """
+    使用结构化条件删除数据的 API 端点（参数化语句，可复用执行计划）。
+    """
+    result = delete_rows(request.table_name, [f.model_dump() for f in request.filters])
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+
 @router.delete("/delete_table")
 def delete_table_endpoint(table_name: str):
     """
@@ -79,13 +159,131 @@ def delete_table_endpoint(table_name: str):
         raise HTTPException(status_code=500, detail=result["message"])
     return result
 
+def _binary_join_response(binary_format: str, query: str, batch_size: Optional[int], routing):
+    """
+    以 Arrow IPC（流或文件格式）或 Parquet 格式流式返回查询结果，跳过逐行构造字典和 JSON 编码。
+    """
+    result = stream_join_tables(query, batch_size, routing=routing)
+    if result["status"] == "error":
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    batches = result["batches"]
+    try:
+        schema = schema_from_description(result["description"])
+        # 响应结束（包括客户端中途断开）后归还连接
+        close = BackgroundTask(batches.close)
+        if binary_format in ("arrow", "arrow_file"):
+            file_format = binary_format == "arrow_file"
+            return StreamingResponse(
+                iter_arrow_ipc(schema, batches, file_format=file_format),
+                media_type=ARROW_FILE_MEDIA_TYPE if file_format else ARROW_STREAM_MEDIA_TYPE,
+                background=close,
+            )
+        body = iter_parquet(schema, batches, Config.PARQUET_RESPONSE_ROW_GROUP_SIZE)
+        return StreamingResponse(
+            body,
+            media_type=PARQUET_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="result.parquet"'},
+            background=close,
+        )
+    except Exception:
+        batches.close()
+        raise
+
+def _parse_cache_control(cache_control: Optional[str]) -> dict:
+    """
+    解析请求的 Cache-Control 头：
+    - no-store: 不读缓存也不写缓存
+    - no-cache: 不读缓存，但用新结果刷新缓存
+    - max-age=N: 只接受不超过 N 秒的缓存结果
+    """
+    options = {"use_cache": True, "store_cache": True, "max_age": None}
+    for directive in (cache_control or "").lower().split(","):
+        directive = directive.strip()
+        if directive == "no-store":
+            options["use_cache"] = False
+            options["store_cache"] = False
+        elif directive == "no-cache":
+            options["use_cache"] = False
+        elif directive.startswith("max-age="):
+            try:
+                options["max_age"] = max(0.0, float(directive.split("=", 1)[1]))
+            except ValueError:
+                pass
+    return options
+
 @router.post("/join_tables")
-def join_tables_endpoint(query: str):
+def join_tables_endpoint(
+    response: Response,
+    query: str,
+    stream: bool = False,
+    stream_format: Literal["ndjson", "json"] = "ndjson",
+    batch_size: Optional[int] = Query(default=None, gt=0),
+    key_column: Optional[str] = None,
+    page_size: Optional[int] = Query(default=None, gt=0),
+    continuation_token: Optional[str] = None,
+    cache_control: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    x_read_preference: Optional[str] = Header(default=None),
+    x_max_staleness: Optional[float] = Header(default=None),
+):
     """
     跨表 JOIN 查询的 API 端点。
     :param query: 完整的 SQL 查询语句（如 JOIN 操作）。
+    :param stream: 为 True 时按 batch_size 分批读取并流式返回结果
+    :param stream_format: 流式输出格式，ndjson（每行一条记录）或 json（分块输出的完整 JSON 文档）
+    :param key_column: 键集分页使用的唯一键列
+    :param page_size: 每页行数，提供时启用键集分页
+    :param continuation_token: 上一页返回的续页令牌；ndjson 格式下令牌在最后一行 {"continuation_token": ...} 中返回
+    非流式查询使用结果缓存，可通过 Cache-Control 请求头（no-cache / no-store / max-age=N）控制，
+    命中情况在 X-Cache 响应头中返回。
+    Accept 为 application/vnd.apache.arrow.stream、application/vnd.apache.arrow.file 或 application/vnd.apache.parquet 时，
+    按批读取并直接返回 Arrow IPC 流、Arrow IPC 文件或 Parquet 文件（不支持键集分页，提供分页参数时返回 400）。
+    配置了只读副本时按读偏好路由，可用 X-Read-Preference 和 X-Max-Staleness（秒）请求头覆盖默认值。
     """
-    result = join_tables(query)
+    try:
+        routing = resolve_routing("sqlserver.join_tables", x_read_preference, x_max_staleness)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    binary_format = negotiate_format(accept)
+    if binary_format != "json":
+        if key_column or page_size or continuation_token:
+            raise HTTPException(status_code=400,
+                                detail="Keyset pagination is not supported for Arrow or Parquet responses.")
+        return _binary_join_response(binary_format, query, batch_size, routing)
+
+    if not stream:
+        result = join_tables(query, key_column, page_size, continuation_token, routing=routing,
+                             **_parse_cache_control(cache_control))
+        if result["status"] == "error":
+            raise HTTPException(status_code=500, detail=result["message"])
+        response.headers["X-Cache"] = result.pop("cache").upper()
+        return result
+
+    result = stream_join_tables(query, batch_size, key_column, page_size, continuation_token, routing=routing)
     if result["status"] == "error":
         raise HTTPException(status_code=500, detail=result["message"])
-    return result
\ No newline at end of file
+
+    batches = result["batches"]
+    try:
+        page = result["page"]
+        trailer = (lambda: {"continuation_token": page.continuation_token}) if page is not None else None
+        # 响应结束（包括客户端中途断开）后归还连接
+        close = BackgroundTask(batches.close)
+        if stream_format == "ndjson":
+            body = iter_ndjson(result["columns"], batches, trailer)
+            return StreamingResponse(body, media_type="application/x-ndjson", background=close)
+        body = iter_json_document(result["columns"], batches, trailer)
+        return StreamingResponse(body, media_type="application/json", background=close)
+    except Exception:
+        batches.close()
+        raise
+
+
+@router.get("/query_cache/stats")
+def query_cache_stats_endpoint():
+    """
+    查询结果缓存的命中、淘汰和失效统计，以及结构化语句编译缓存的统计。
+    """
+    return {**query_cache.stats(), "statement_cache": statement_cache_info()}
@@ -0,0 +1,92 @@
+# backend/app/routes/sync_routes.py
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from backend.app.services.table_sync import (
+    define_sync, run_sync, reset_sync, delete_sync, sync_status, sync_store
+)
+
+router = APIRouter()
+
+# 定义请求体模型
+class SyncDefinitionRequest(BaseModel):
+    table_name: str = Field(..., min_length=1, max_length=100, description="源表名")
+    collection_name: str = Field(..., min_length=1, max_length=100, description="目标集合名")
+    key_columns: List[str] = Field(..., min_length=1, description="主键列，单列时作为 _id，多列时 _id 为子文档")
+    mode: Literal["change_tracking", "rowversion"] = Field(default="change_tracking", description="变更检测方式")
+    rowversion_column: Optional[str] = Field(default=None, description="rowversion 模式下的 rowversion 列")
+    deleted_column: Optional[str] = Field(default=None, description="rowversion 模式下的软删除标记列")
+    interval_seconds: Optional[float] = Field(default=None, gt=0, description="后台同步间隔（秒）")
+    batch_size: Optional[int] = Field(default=None, ge=1, le=100000, description="每次 bulk_write 的变更数")
+    enabled: bool = Field(default=True, description="是否由后台线程定期运行")
+
+
+def _get_state(name: str) -> dict:
+    try:
+        state = sync_store.get(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Sync '{name}' does not exist.")
+    return state
+
+
+@router.put("/syncs/{name}")
+def define_sync_endpoint(name: str, request: SyncDefinitionRequest):
+    """
+    新建或修改同步定义。修改表、集合、键列或模式时清除检查点，下一轮全量加载。
+    """
+    result = define_sync(name, **request.model_dump())
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return sync_status(result["sync"])
+
+
+@router.get("/syncs")
+def list_syncs_endpoint():
+    """
+    列出全部同步及其检查点、最近一次运行结果和滞后秒数。
+    """
+    return {"syncs": [sync_status(state) for state in sync_store.list()]}
+
+
+@router.get("/syncs/{name}")
+def get_sync_endpoint(name: str):
+    return sync_status(_get_state(name))
+
+
+@router.post("/syncs/{name}/run")
+def run_sync_endpoint(name: str):
+    """
+    立即执行一轮同步（与后台线程互斥，正在运行时返回 409）。
+    """
+    _get_state(name)
+    result = run_sync(name)
+    if result["status"] == "error":
+        status_code = 409 if result["message"].endswith("is already running.") else 500
+        raise HTTPException(status_code=status_code, detail=result["message"])
+    result.pop("status")
+    return result
+
+
+@router.post("/syncs/{name}/reset")
+def reset_sync_endpoint(name: str):
+    """
+    清除检查点，下一轮全量加载并删除源表中已不存在的文档。
+    """
+    _get_state(name)
+    result = reset_sync(name)
+    if result["status"] == "error":
+        raise HTTPException(status_code=404, detail=result["message"])
+    return sync_status(result["sync"])
+
+
+@router.delete("/syncs/{name}")
+def delete_sync_endpoint(name: str):
+    """
+    删除同步定义和检查点（不删除目标集合中的文档）。
+    """
+    result = delete_sync(name)
+    if result["status"] == "error":
+        raise HTTPException(status_code=404, detail=result["message"])
+    return result
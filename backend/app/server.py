@@ -0,0 +1,94 @@
+import sys
+import os
+import argparse
+import logging
+import threading
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from backend.app.config import Config
+from backend.app.services.lifecycle import server_state
+
+APP = "backend.app.main:app"
+
+logger = logging.getLogger(__name__)
+
+
+class Server(uvicorn.Server):
+    """
+    在 uvicorn.Server 的基础上：
+    - 在工作进程中、导入应用之前应用命令行覆盖的配置（工作进程以 spawn 方式启动，不继承父进程修改过的 Config）；
+    - 收到第一个关闭信号后先排空 drain_seconds 秒（就绪检查返回 503，仍然处理请求），
+      再停止接受连接，并等待进行中的请求完成（最多 timeout_graceful_shutdown 秒）。再次收到信号时立即停止。
+    """
+
+    def __init__(self, config: uvicorn.Config, settings: dict = None, drain_seconds: float = 0):
+        super().__init__(config)
+        self.settings = settings or {}
+        self.drain_seconds = drain_seconds
+
+    def run(self, sockets=None):
+        for name, value in self.settings.items():
+            setattr(Config, name, value)
+        return super().run(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self.drain_seconds > 0 and not server_state.draining and not self.should_exit:
+            server_state.draining = True
+            timer = threading.Timer(self.drain_seconds, self._stop_after_drain, (sig, frame))
+            timer.daemon = True
+            timer.start()
+            return
+        server_state.draining = True
+        super().handle_exit(sig, frame)
+
+    def _stop_after_drain(self, sig, frame):
+        if not self.should_exit:
+            super().handle_exit(sig, frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以多个工作进程运行 API 服务")
+    parser.add_argument("--host", default=Config.SERVER_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS, help="工作进程数")
+    parser.add_argument("--threadpool-size", type=int, default=Config.SERVER_THREADPOOL_SIZE,
+                        help="每个进程执行同步路由的线程数")
+    parser.add_argument("--graceful-timeout", type=float, default=Config.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+                        help="关闭时等待进行中请求完成的最长秒数")
+    parser.add_argument("--drain-seconds", type=float, default=Config.SERVER_DRAIN_SECONDS,
+                        help="收到关闭信号后就绪检查先失败的秒数")
+    parser.add_argument("--log-level", default="info", help="uvicorn 日志级别")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    config = uvicorn.Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+    settings = {"SERVER_THREADPOOL_SIZE": args.threadpool_size, "SERVER_WORKERS": args.workers}
+    if args.workers > 1 and Config.QUERY_CACHE_ENABLED:
+        # 缓存在每个进程内，写入后其他进程的缓存在 TTL 内仍返回旧结果
+        logger.warning("Query cache is per process and is disabled with %d workers.", args.workers)
+        settings["QUERY_CACHE_ENABLED"] = False
+    server = Server(config, settings, args.drain_seconds)
+    if config.workers > 1:
+        # 父进程只绑定端口并监督工作进程（退出时重启）；每个工作进程各自导入应用、建立连接并预热
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+        return 0
+    server.run()
+    return 0 if server.started else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+# backend/app/services/admission.py
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import pymongo
+from backend.app.config import Config
+from backend.app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total", "Requests shed by admission control.", ("backend", "reason")
+)
+ADMISSION_SLOTS = registry.gauge(
+    "admission_slots", "Admission control slots by state.", ("backend", "state")
+)
+REQUESTS_ABORTED = registry.counter(
+    "requests_aborted_total", "Requests aborted before completion.", ("reason",)
+)
+
+
+class RequestCancelledError(Exception):
+    """请求已超过截止时间或客户端已断开，不再执行新的语句。"""
+
+
+class RequestContext:
+    """
+    单个请求的截止时间和取消状态。进行中的语句通过 on_abort 登记取消回调（如 pyodbc 的 cursor.cancel），
+    请求超时或客户端断开时由中间件调用；回调可能来自工作线程，内部加锁。
+    """
+
+    def __init__(self, deadline: float = None):
+        self.deadline = deadline  # time.monotonic() 时刻，None 表示不限制
+        self.aborted = None  # 中止原因：deadline / disconnect
+        self._lock = threading.Lock()
+        self._callbacks = set()
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self):
+        if self.aborted:
+            raise RequestCancelledError(f"Request aborted ({self.aborted}).")
+        if self.expired:
+            raise RequestCancelledError("Request deadline exceeded.")
+
+    def abort(self, reason: str):
+        with self._lock:
+            if self.aborted:
+                return
+            self.aborted = reason
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Failed to cancel in-flight statement: %s", e)
+
+    @contextmanager
+    def on_abort(self, callback):
+        with self._lock:
+            self._callbacks.add(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.discard(callback)
+
+
+_current = contextvars.ContextVar("request_context", default=None)
+
+
+def current_request():
+    """
+    返回当前请求的 RequestContext；请求之外（后台任务、同步线程、命令行脚本）为 None。
+    """
+    return _current.get()
+
+
+def cancellable(callback):
+    """
+    在当前请求中止时调用 callback 的上下文管理器；请求之外什么也不做。调用前先检查请求是否已中止。
+    """
+    request = _current.get()
+    if request is None:
+        return nullcontext()
+    request.check()
+    return request.on_abort(callback)
+
+
+@contextmanager
+def detached_deadline(timeout: float):
+    """
+    在全新的上下文（contextvars.Context().run 或以新上下文创建的任务）中使用：
+    设置 timeout 秒的独立截止时间（pyodbc 查询超时和 pymongo.timeout），不登记任何请求的取消回调。
+    用于多个请求共享的操作（如写合并的 flush），不受触发它的请求的截止时间和客户端断开影响。
+    """
+    token = _current.set(RequestContext(time.monotonic() + timeout))
+    try:
+        with pymongo.timeout(timeout):
+            yield
+    finally:
+        _current.reset(token)
+
+
+def statement_timeout() -> int:
+    """
+    pyodbc 查询超时（整秒，0 表示不限制）：请求内为剩余时间（向上取整），请求之外为 Config.SQL_SERVER_QUERY_TIMEOUT_SECONDS。
+    """
+    request = _current.get()
+    remaining = request.remaining() if request is not None else None
+    if remaining is None:
+        return Config.SQL_SERVER_QUERY_TIMEOUT_SECONDS
+    return max(1, math.ceil(remaining))
+
+
+class ConcurrencyLimiter:
+    """
+    asyncio 并发限制：最多 limit 个请求同时执行，最多 max_queue 个请求排队等待，其余立即拒绝。
+    释放的名额按先来先得直接交给排队者。所有调用必须在同一个事件循环中。
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float = None) -> str:
+        """
+        :return: None 表示已获得名额；否则为拒绝原因 queue_full / queue_timeout
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return None
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时或取消与名额移交同时发生，名额已经属于本请求
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                return "queue_timeout"
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def _match_prefix(mapping: dict, path: str, default=None):
+    best = None
+    for prefix in mapping:
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return mapping[best] if best is not None else default
+
+
+class AdmissionMiddleware:
+    """
+    纯 ASGI 中间件：请求截止时间、客户端断开时取消、按后端的并发限制。
+
+    - 截止时间按路径前缀取 Config.ENDPOINT_TIMEOUT_SECONDS，默认 Config.REQUEST_TIMEOUT_SECONDS，
+      请求头 X-Request-Timeout 只能缩短。截止时间用于 pyodbc 查询超时和 MongoDB maxTimeMS（pymongo.timeout）；
+      超时前还没有开始响应时，取消进行中的语句并返回 504。
+    - 客户端断开时取消进行中的语句和请求任务。
+    - 按路径前缀（Config.ADMISSION_BACKENDS）确定访问的后端，每个后端最多 Config.ADMISSION_CONCURRENCY 个请求同时执行，
+      最多 Config.ADMISSION_QUEUE_SIZE 个排队；队列已满或排队超过 Config.ADMISSION_QUEUE_TIMEOUT_SECONDS 时
+      返回 503 和 Retry-After。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = {
+            backend: ConcurrencyLimiter(backend, limit, Config.ADMISSION_QUEUE_SIZE.get(backend, 0))
+            for backend, limit in Config.ADMISSION_CONCURRENCY.items()
+        }
+        _middlewares.append(self)
+
+    def _deadline(self, scope):
+        timeout = _match_prefix(Config.ENDPOINT_TIMEOUT_SECONDS, scope["path"], Config.REQUEST_TIMEOUT_SECONDS)
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    requested = float(value)
+                except ValueError:
+                    break
+                if requested > 0:
+                    timeout = requested if timeout is None else min(timeout, requested)
+                break
+        return None if timeout is None else time.monotonic() + timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestContext(self._deadline(scope))
+        backends = _match_prefix(Config.ADMISSION_BACKENDS, scope["path"], ())
+        acquired = []
+        try:
+            # 固定顺序获取，访问多个后端的请求之间不会互相等待
+            for backend in sorted(backends):
+                limiter = self.limiters.get(backend)
+                if limiter is None:
+                    continue
+                wait = Config.ADMISSION_QUEUE_TIMEOUT_SECONDS
+                remaining = request.remaining()
+                if remaining is not None:
+                    wait = max(0.0, min(wait, remaining))
+                reason = await limiter.acquire(wait)
+                if reason is not None:
+                    ADMISSION_REJECTED.inc(backend=backend, reason=reason)
+                    await _send_error(send, 503, f"{backend} is overloaded, retry later.",
+                                      [(b"retry-after", str(Config.ADMISSION_RETRY_AFTER_SECONDS).encode())])
+                    return
+                acquired.append(limiter)
+            await self._run(scope, receive, send, request)
+        finally:
+            for limiter in acquired:
+                limiter.release()
+
+    async def _run(self, scope, receive, send, request: RequestContext):
+        started = False
+        finished = False
+        queue = asyncio.Queue(maxsize=1)
+
+        async def pump():
+            # 唯一读取 receive 的任务：请求体按需转交给应用（队列长度 1，保持背压），收到断开消息时结束
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    if not queue.full():
+                        queue.put_nowait(message)
+                    return
+                await queue.put(message)
+
+        async def send_wrapper(message):
+            nonlocal started, finished
+            if message["type"] == "http.response.start":
+                started = True
+                if message["status"] >= 500 and request.expired:
+                    # 语句因截止时间失败后应用返回的 5xx
+                    message = {**message, "status": 504}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = True
+            await send(message)
+
+        token = _current.set(request)
+        remaining = request.remaining()
+        try:
+            with pymongo.timeout(max(remaining, 0.001)) if remaining is not None else nullcontext():
+                app_task = asyncio.ensure_future(self.app(scope, queue.get, send_wrapper))
+        finally:
+            _current.reset(token)
+
+        reason = None
+
+        def abort(why: str):
+            nonlocal reason
+            if reason is None and not app_task.done():
+                reason = why
+                REQUESTS_ABORTED.inc(reason=why)
+                request.abort(why)
+                app_task.cancel()
+
+        def on_deadline():
+            # 已经开始输出的流式响应不受截止时间限制，由语句本身的超时约束
+            if not started:
+                abort("deadline")
+
+        pump_task = asyncio.ensure_future(pump())
+        # 响应体发送完毕后的断开是正常的连接关闭，不取消仍在运行的后台任务
+        pump_task.add_done_callback(lambda task: None if task.cancelled() or finished else abort("disconnect"))
+        timer = asyncio.get_running_loop().call_later(max(remaining, 0), on_deadline) if remaining is not None else None
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if reason is None:
+                raise
+        finally:
+            pump_task.cancel()
+            if timer is not None:
+                timer.cancel()
+            if not app_task.done():
+                # 中间件自身被取消（如服务关闭）
+                request.abort("cancelled")
+        if reason == "deadline":
+            await _send_error(send, 504, "Request deadline exceeded.")
+
+
+async def _send_error(send, status: int, detail: str, headers: list = ()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# 已创建的中间件实例，用于导出指标
+_middlewares = []
+
+
+def _collect_admission_metrics():
+    for middleware in _middlewares:
+        for backend, limiter in middleware.limiters.items():
+            ADMISSION_SLOTS.set(limiter.active, backend=backend, state="active")
+            ADMISSION_SLOTS.set(limiter.queued, backend=backend, state="queued")
+
+
+registry.add_collect_hook(_collect_admission_metrics)
@@ -0,0 +1,368 @@
+# backend/app/services/analytics.py
+import datetime
+import json
+import os
+import re
+import uuid
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from bson import ObjectId, Decimal128
+from backend.app.config import Config
+from backend.app.services.sql_server_service import stream_join_tables
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.sql_builder import quote_identifier
+from backend.app.services.arrow_export import schema_from_description, rows_to_record_batch
+
+SOURCES = ("sql_server", "mongo")
+AGGREGATIONS = ("sum", "mean", "min", "max", "count", "count_distinct", "stddev", "variance")
+JOIN_TYPES = {
+    "inner": "inner", "left": "left outer", "right": "right outer", "full": "full outer",
+}
+_NAME_RE = re.compile(r"^[A-Za-z0-9_\-.]+$")
+
+
+def snapshot_id(source: str, name: str) -> str:
+    if source not in SOURCES:
+        raise ValueError(f"Unknown snapshot source '{source}'.")
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Invalid snapshot name '{name}'.")
+    return f"{source}.{name}"
+
+
+def _paths(snapshot: str):
+    base = os.path.join(Config.ANALYTICS_SNAPSHOT_DIR, snapshot)
+    return base + ".parquet", base + ".json"
+
+
+def _publish(snapshot: str, write_data, metadata: dict) -> dict:
+    """
+    先写临时文件再原子替换，读取方始终看到完整的旧快照或新快照。
+    """
+    os.makedirs(Config.ANALYTICS_SNAPSHOT_DIR, exist_ok=True)
+    data_path, meta_path = _paths(snapshot)
+    suffix = f".{uuid.uuid4().hex}.tmp"
+    try:
+        metadata.update(write_data(data_path + suffix))
+        metadata["created_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with open(meta_path + suffix, "w", encoding="utf-8") as file:
+            json.dump(metadata, file, ensure_ascii=False)
+        os.replace(data_path + suffix, data_path)
+        os.replace(meta_path + suffix, meta_path)
+    finally:
+        for path in (data_path + suffix, meta_path + suffix):
+            if os.path.exists(path):
+                os.remove(path)
+    return metadata
+
+
+def _write_sql_table(table_name: str, columns: list = None, progress_callback=None):
+    select = ", ".join(quote_identifier(column) for column in columns) if columns else "*"
+    query = f"SELECT {select} FROM {quote_identifier(table_name)}"
+
+    def write(path: str) -> dict:
+        result = stream_join_tables(query, Config.PARQUET_BATCH_SIZE)
+        if result["status"] == "error":
+            raise RuntimeError(result["message"])
+        schema = schema_from_description(result["description"])
+        row_count = 0
+        try:
+            with pq.ParquetWriter(path, schema) as writer:
+                for rows in result["batches"]:
+                    writer.write_batch(rows_to_record_batch(rows, schema))
+                    row_count += len(rows)
+                    if progress_callback:
+                        progress_callback({"rows": row_count})
+        finally:
+            # 提前退出（如任务被取消）时归还连接
+            result["batches"].close()
+        return {"rows": row_count, "columns": [{"name": f.name, "type": str(f.type)} for f in schema]}
+
+    return write
+
+
+def _to_arrow_value(value):
+    """
+    将 BSON 特有类型转换为 Arrow 可推断的 Python 值。
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if isinstance(value, dict):
+        return {key: _to_arrow_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_arrow_value(item) for item in value]
+    return value
+
+
+def _write_mongo_collection(collection_name: str, columns: list = None, progress_callback=None):
+    projection = {column: 1 for column in columns} if columns else None
+
+    def write(path: str) -> dict:
+        db = MongoDatabaseManager.get_connection()
+        cursor = db[collection_name].find({}, projection, batch_size=Config.PARQUET_BATCH_SIZE)
+        writer = None
+        schema = None
+        row_count = 0
+        try:
+            batch = []
+            for document in cursor:
+                batch.append(_to_arrow_value(document))
+                if len(batch) >= Config.PARQUET_BATCH_SIZE:
+                    schema, writer = _write_documents(batch, path, schema, writer)
+                    row_count += len(batch)
+                    batch = []
+                    if progress_callback:
+                        progress_callback({"rows": row_count})
+            if batch or writer is None:
+                schema, writer = _write_documents(batch, path, schema, writer)
+                row_count += len(batch)
+                if batch and progress_callback:
+                    progress_callback({"rows": row_count})
+        finally:
+            cursor.close()
+            if writer is not None:
+                writer.close()
+        return {"rows": row_count, "columns": [{"name": f.name, "type": str(f.type)} for f in schema]}
+
+    return write
+
+
+def _write_documents(documents: list, path: str, schema, writer):
+    """
+    第一批文档决定 schema；后续批次按该 schema 转换（缺失字段为 null，新增字段被忽略）。
+    """
+    if schema is None:
+        table = pa.Table.from_pylist(documents)
+        if not table.column_names:
+            table = pa.table({"_id": pa.array([], pa.string())})
+        schema = table.schema
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        table = pa.Table.from_pylist(documents, schema=schema)
+    writer.write_table(table)
+    return schema, writer
+
+
+def materialize(source: str, name: str, columns: list = None, progress_callback=None) -> dict:
+    """
+    将 SQL Server 表或 MongoDB 集合整体物化为本地 Parquet 快照（按批读取，内存占用与表大小无关）。
+    :param source: sql_server 或 mongo
+    :param name: 表名或集合名
+    :param columns: 只物化这些列（可选）
+    :param progress_callback: 每写入一批调用一次，参数为 {"rows": 已写入行数}；抛出异常时放弃快照，旧快照保持不变
+    :return: 操作结果字典，包含快照名、行数和 created_at
+    """
+    try:
+        snapshot = snapshot_id(source, name)
+        if source == "sql_server":
+            write = _write_sql_table(name, columns, progress_callback)
+        else:
+            write = _write_mongo_collection(name, columns, progress_callback)
+        metadata = _publish(snapshot, write, {"snapshot": snapshot, "source": source, "name": name})
+        return {"status": "success", **metadata}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def list_snapshots() -> list:
+    if not os.path.isdir(Config.ANALYTICS_SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for entry in sorted(os.listdir(Config.ANALYTICS_SNAPSHOT_DIR)):
+        if entry.endswith(".json"):
+            with open(os.path.join(Config.ANALYTICS_SNAPSHOT_DIR, entry), encoding="utf-8") as file:
+                snapshots.append(json.load(file))
+    return snapshots
+
+
+def _load_metadata(snapshot: str) -> dict:
+    if not _NAME_RE.match(snapshot):
+        raise ValueError(f"Invalid snapshot name '{snapshot}'.")
+    _, meta_path = _paths(snapshot)
+    if not os.path.exists(meta_path):
+        raise ValueError(f"Snapshot '{snapshot}' does not exist.")
+    with open(meta_path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _filter_expression(condition: dict) -> pc.Expression:
+    """
+    将结构化筛选条件（与 update_rows / delete_rows 相同的运算符）转换为 Arrow 表达式。
+    """
+    field = pc.field(condition["column"])
+    op = condition.get("op", "=")
+    value = condition.get("value")
+    if op == "=":
+        return field == value
+    if op in ("!=", "<>"):
+        return field != value
+    if op == "<":
+        return field < value
+    if op == "<=":
+        return field <= value
+    if op == ">":
+        return field > value
+    if op == ">=":
+        return field >= value
+    if op == "in":
+        return field.isin(list(value))
+    if op == "not_in":
+        return ~field.isin(list(value))
+    if op == "between":
+        low, high = value
+        return (field >= low) & (field <= high)
+    if op == "is_null":
+        return field.is_null()
+    if op == "is_not_null":
+        return field.is_valid()
+    if op == "like":
+        return pc.match_like(field, value)
+    if op == "not_like":
+        return ~pc.match_like(field, value)
+    raise ValueError(f"Unsupported operator '{op}'.")
+
+
+def _combine(expressions: list):
+    result = None
+    for expression in expressions:
+        result = expression if result is None else result & expression
+    return result
+
+
+def _read(snapshot: str, columns: list, filters: list) -> pa.Table:
+    """
+    只读取需要的列；筛选条件下推到 Parquet 行组统计信息和页面读取。
+    """
+    data_path, _ = _paths(snapshot)
+    dataset = ds.dataset(data_path, format="parquet")
+    return dataset.to_table(columns=columns, filter=_combine([_filter_expression(f) for f in filters]))
+
+
+def run_query(spec: dict) -> dict:
+    """
+    在本地快照上执行只读查询，不访问源数据库。
+
+    :param spec: {
+        "snapshot": "sql_server.orders",
+        "columns": ["region", "amount"],                       # 无聚合时输出的列（可选）
+        "filters": [{"column": "amount", "op": ">", "value": 10}],  # 两侧同名的列写成 "mongo.customers.tier"
+        "join": {"snapshot": "mongo.customers", "left_on": "customer_id", "right_on": "_id", "how": "inner"},
+        "group_by": ["region"],
+        "aggregations": [{"column": "amount", "func": "sum", "as": "total"}],
+        "order_by": [["total", "desc"]],
+        "limit": 100
+    }
+    :return: 操作结果字典，data 为结果行，freshness 为各快照的生成时间，as_of 为其中最早的时间
+    """
+    try:
+        left_meta = _load_metadata(spec["snapshot"])
+        join = spec.get("join")
+        right_meta = _load_metadata(join["snapshot"]) if join else None
+        left_columns = [column["name"] for column in left_meta["columns"]]
+        right_columns = [column["name"] for column in right_meta["columns"]] if right_meta else []
+
+        # 筛选条件按列所在的快照分别下推；两侧都有的列必须写成 "快照.列" 指明一侧
+        left_filters, right_filters = [], []
+        sides = [(spec["snapshot"], left_columns, left_filters)]
+        if join:
+            sides.append((join["snapshot"], right_columns, right_filters))
+        for condition in spec.get("filters") or []:
+            column = condition["column"]
+            qualified = [(target, column[len(name) + 1:]) for name, columns, target in sides
+                         if column.startswith(name + ".") and column[len(name) + 1:] in columns]
+            if qualified:
+                target, column = qualified[0]
+                target.append({**condition, "column": column})
+                continue
+            owners = [target for _, columns, target in sides if column in columns]
+            if not owners:
+                raise ValueError(f"Unknown column '{column}'.")
+            if len(owners) > 1:
+                raise ValueError(f"Column '{column}' exists in both snapshots; qualify it as '<snapshot>.{column}'.")
+            owners[0].append(condition)
+
+        needed = set(spec.get("columns") or []) | set(spec.get("group_by") or [])
+        needed |= {aggregation["column"] for aggregation in spec.get("aggregations") or []}
+        needed |= {column for column, _ in spec.get("order_by") or []}
+        read_all = not needed
+        post_filters = []
+        if join:
+            needed |= {join["left_on"], join["right_on"]}
+            how = JOIN_TYPES.get(join.get("how", "inner"))
+            if how is None:
+                raise ValueError(f"Unsupported join type '{join.get('how')}'.")
+            # 外连接中补空值一侧的条件不能在连接前下推，否则未匹配的行会以空值保留下来，与 WHERE 语义不符；
+            # 改为在连接后按输出列名筛选（右侧与左侧同名的列带 _right 后缀）
+            if how in ("right outer", "full outer"):
+                if any(condition["column"] == join["left_on"] for condition in left_filters):
+                    raise ValueError(f"Cannot filter on join column '{join['left_on']}' of the outer side.")
+                post_filters += left_filters
+                needed |= {condition["column"] for condition in left_filters}
+                left_filters = []
+            if how in ("left outer", "full outer"):
+                if any(condition["column"] == join["right_on"] for condition in right_filters):
+                    raise ValueError(f"Cannot filter on join column '{join['right_on']}' of the outer side.")
+                post_filters += [
+                    {**condition, "column": condition["column"] + "_right"}
+                    if condition["column"] in left_columns else condition
+                    for condition in right_filters
+                ]
+                needed |= {condition["column"] for condition in right_filters}
+                right_filters = []
+
+        def pick(available: list, key: str) -> list:
+            return available if read_all else [column for column in available if column in needed or column == key]
+
+        table = _read(spec["snapshot"], pick(left_columns, join["left_on"] if join else None), left_filters)
+        if join:
+            right = _read(join["snapshot"], pick(right_columns, join["right_on"]), right_filters)
+            table = table.join(right, keys=join["left_on"], right_keys=join["right_on"], join_type=how,
+                               right_suffix="_right")
+            if post_filters:
+                table = table.filter(_combine([_filter_expression(condition) for condition in post_filters]))
+
+        aggregations = spec.get("aggregations") or []
+        group_by = spec.get("group_by") or []
+        if aggregations or group_by:
+            for aggregation in aggregations:
+                if aggregation["func"] not in AGGREGATIONS:
+                    raise ValueError(f"Unsupported aggregation '{aggregation['func']}'.")
+            table = table.group_by(group_by).aggregate(
+                [(aggregation["column"], aggregation["func"]) for aggregation in aggregations]
+            )
+            renames = {
+                f"{aggregation['column']}_{aggregation['func']}": aggregation.get("as") or
+                f"{aggregation['column']}_{aggregation['func']}"
+                for aggregation in aggregations
+            }
+            table = table.rename_columns([renames.get(name, name) for name in table.column_names])
+
+        # 先排序再投影：排序列不一定在输出列中
+        order_by = spec.get("order_by") or []
+        if order_by:
+            table = table.sort_by([
+                (column, "descending" if str(direction).lower() in ("desc", "descending", "-1") else "ascending")
+                for column, direction in order_by
+            ])
+        if not (aggregations or group_by) and spec.get("columns"):
+            table = table.select(spec["columns"])
+        limit = min(int(spec.get("limit") or Config.ANALYTICS_MAX_RESULT_ROWS), Config.ANALYTICS_MAX_RESULT_ROWS)
+        truncated = table.num_rows > limit
+        table = table.slice(0, limit)
+
+        freshness = {left_meta["snapshot"]: left_meta["created_at"]}
+        if right_meta:
+            freshness[right_meta["snapshot"]] = right_meta["created_at"]
+        return {
+            "status": "success",
+            "data": table.to_pylist(),
+            "row_count": table.num_rows,
+            "truncated": truncated,
+            "freshness": freshness,
+            "as_of": min(freshness.values()),
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
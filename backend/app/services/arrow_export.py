@@ -0,0 +1,142 @@
+# backend/app/services/arrow_export.py
+import datetime
+import decimal
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Accept 头中可识别的媒体类型 -> 输出格式
+_MEDIA_TYPES = {
+    ARROW_STREAM_MEDIA_TYPE: "arrow",
+    ARROW_FILE_MEDIA_TYPE: "arrow_file",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def negotiate_format(accept: str) -> str:
+    """
+    根据 Accept 请求头选择输出格式：arrow（IPC 流格式）、arrow_file（IPC 文件格式）、parquet 或默认的 json。
+    按 Accept 中出现的顺序取第一个支持的二进制格式，忽略 q 值为 0 的项。
+    """
+    for item in (accept or "").split(","):
+        media_type, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        fmt = _MEDIA_TYPES.get(media_type.strip().lower())
+        if fmt:
+            return fmt
+    return "json"
+
+
+def _arrow_type(type_code, precision, scale) -> pa.DataType:
+    """
+    将 DB-API cursor.description 中的 Python 类型映射为 Arrow 类型。
+    """
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is decimal.Decimal:
+        return pa.decimal128(precision or 38, scale or 0)
+    if type_code is datetime.datetime:
+        return pa.timestamp("us")
+    if type_code is datetime.date:
+        return pa.date32()
+    if type_code is datetime.time:
+        return pa.time64("us")
+    if type_code in (bytes, bytearray):
+        return pa.binary()
+    return pa.string()
+
+
+def schema_from_description(description) -> pa.Schema:
+    """
+    根据 cursor.description 构造 Arrow schema，使所有批次的类型一致，不依赖逐批推断。
+    """
+    return pa.schema([
+        pa.field(column[0], _arrow_type(column[1], column[4], column[5]), nullable=True)
+        for column in description
+    ])
+
+
+def rows_to_record_batch(rows: list, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    将一批行按列转置后直接构造 RecordBatch。
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    只追加的输出缓冲：写入的数据可被分段取走，同时保持正确的绝对偏移（Parquet 页脚依赖 tell()）。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_arrow_ipc(schema: pa.Schema, batches, file_format: bool = False):
+    """
+    将逐批产出的行编码为 Arrow IPC 流，每批行对应一个 RecordBatch 消息。
+    file_format 为 True 时输出 IPC 文件格式：消息相同，前后加魔数，页脚（批次索引）在最后输出。
+    """
+    sink = _DrainableSink()
+    new_writer = pa.ipc.new_file if file_format else pa.ipc.new_stream
+    with new_writer(pa.PythonFile(sink, mode="w"), schema) as writer:
+        yield sink.drain()
+        for rows in batches:
+            writer.write_batch(rows_to_record_batch(rows, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(schema: pa.Schema, batches, row_group_size: int = 65536):
+    """
+    将逐批产出的行编码为 Parquet。累计到 row_group_size 行写为一个行组并立即输出，页脚在最后输出。
+    """
+    sink = _DrainableSink()
+    pending = []
+    pending_rows = 0
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for rows in batches:
+            pending.append(rows_to_record_batch(rows, schema))
+            pending_rows += len(rows)
+            if pending_rows >= row_group_size:
+                writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                pending, pending_rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+    yield sink.drain()
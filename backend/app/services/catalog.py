@@ -0,0 +1,171 @@
+# backend/app/services/catalog.py
+import datetime
+import decimal
+import threading
+import time
+from backend.app.config import Config
+
+# 一次查询加载全部列信息
+CATALOG_COLUMNS_QUERY = """
+SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH
+FROM INFORMATION_SCHEMA.COLUMNS
+ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION
+"""
+CATALOG_IDENTITY_QUERY = "SELECT @@SERVERNAME, DB_NAME()"
+
+_INTEGER_TYPES = {"tinyint", "smallint", "int", "bigint"}
+_DECIMAL_TYPES = {"decimal", "numeric", "money", "smallmoney"}
+_FLOAT_TYPES = {"float", "real"}
+_STRING_TYPES = {"char", "varchar", "nchar", "nvarchar", "text", "ntext"}
+_DATETIME_TYPES = {"datetime", "datetime2", "smalldatetime", "datetimeoffset"}
+_TRUE_STRINGS = {"1", "true", "t", "yes", "y"}
+_FALSE_STRINGS = {"0", "false", "f", "no", "n"}
+
+
+def _table_key(table_name: str) -> str:
+    return ".".join(part.strip('[]"') for part in table_name.strip().split(".")).lower()
+
+
+def coerce_value(column: dict, value):
+    """
+    按列的 SQL 类型在进程内转换并校验值，非法值抛出 ValueError。
+    """
+    name = column["name"]
+    if value is None:
+        if not column["nullable"]:
+            raise ValueError(f"Column '{name}' does not allow NULL.")
+        return None
+
+    data_type = column["type"]
+    try:
+        if data_type in _INTEGER_TYPES:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError
+            return int(value)
+        if data_type == "bit":
+            if isinstance(value, str):
+                lowered = value.strip().lower()
+                if lowered not in _TRUE_STRINGS | _FALSE_STRINGS:
+                    raise ValueError
+                return lowered in _TRUE_STRINGS
+            return bool(value)
+        if data_type in _DECIMAL_TYPES:
+            return decimal.Decimal(str(value))
+        if data_type in _FLOAT_TYPES:
+            return float(value)
+        if data_type == "date" and isinstance(value, str):
+            return datetime.date.fromisoformat(value)
+        if data_type in _DATETIME_TYPES and isinstance(value, str):
+            return datetime.datetime.fromisoformat(value)
+        if data_type == "time" and isinstance(value, str):
+            return datetime.time.fromisoformat(value)
+    except (ValueError, TypeError, decimal.InvalidOperation):
+        raise ValueError(f"Value {value!r} is not valid for column '{name}' of type {data_type}.")
+
+    if data_type in _STRING_TYPES:
+        value = value if isinstance(value, str) else str(value)
+        max_length = column["max_length"]
+        if max_length and max_length > 0 and len(value) > max_length:
+            raise ValueError(f"Value for column '{name}' exceeds maximum length {max_length}.")
+    return value
+
+
+class SchemaCatalog:
+    """
+    SQL Server 与 MongoDB 的元数据缓存：服务器标识、表、列类型和集合名。
+    启动时加载，DDL 后标记过期，或超过 TTL 后在下一次访问时重新加载。
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.refresh_lock = threading.Lock()
+        self.server_name = None
+        self.database_name = None
+        self._tables = {}
+        self._sql_loaded_at = None
+        self._collections = set()
+        self._mongo_loaded_at = None
+
+    def sql_is_stale(self) -> bool:
+        return self._sql_loaded_at is None or time.monotonic() - self._sql_loaded_at > self.ttl
+
+    def sql_age(self) -> float:
+        return float("inf") if self._sql_loaded_at is None else time.monotonic() - self._sql_loaded_at
+
+    def load_sql(self, conn):
+        """
+        使用给定连接加载服务器标识和全部表的列信息。
+        """
+        cursor = conn.cursor()
+        cursor.execute(CATALOG_IDENTITY_QUERY)
+        server_name, database_name = cursor.fetchone()
+        cursor.execute(CATALOG_COLUMNS_QUERY)
+
+        tables = {}
+        for schema, table, column, data_type, is_nullable, max_length in cursor.fetchall():
+            entry = tables.setdefault(f"{schema}.{table}".lower(), {"schema": schema, "name": table, "columns": {}})
+            entry["columns"][column.lower()] = {
+                "name": column,
+                "type": data_type.lower(),
+                "nullable": is_nullable == "YES",
+                "max_length": max_length,
+            }
+        # 未带 schema 的表名按 dbo 优先解析
+        for entry in list(tables.values()):
+            short_key = entry["name"].lower()
+            if short_key not in tables or entry["schema"].lower() == "dbo":
+                tables[short_key] = entry
+
+        self.server_name = server_name
+        self.database_name = database_name
+        self._tables = tables
+        self._sql_loaded_at = time.monotonic()
+
+    def invalidate_sql(self):
+        """
+        DDL 之后调用，下一次访问时重新加载。
+        """
+        self._sql_loaded_at = None
+
+    def get_table(self, table_name: str):
+        return self._tables.get(_table_key(table_name))
+
+    def coerce_row(self, table: dict, columns: list, values: list) -> list:
+        """
+        校验列名并按列类型转换一行数据。
+        """
+        if len(values) != len(columns):
+            raise ValueError(f"Got {len(values)} values for {len(columns)} columns.")
+        infos = []
+        for column in columns:
+            info = table["columns"].get(str(column).strip("[]").lower())
+            if info is None:
+                raise ValueError(f"Column '{column}' does not exist in table '{table['name']}'.")
+            infos.append(info)
+        return [coerce_value(info, value) for info, value in zip(infos, values)]
+
+    def mongo_is_stale(self) -> bool:
+        return self._mongo_loaded_at is None or time.monotonic() - self._mongo_loaded_at > self.ttl
+
+    def load_collections(self, names):
+        self._collections = set(names)
+        self._mongo_loaded_at = time.monotonic()
+
+    def has_collection(self, name: str) -> bool:
+        return name in self._collections
+
+    def add_collection(self, name: str):
+        self._collections.add(name)
+
+    def summary(self) -> dict:
+        return {
+            "server_name": self.server_name,
+            "database_name": self.database_name,
+            "tables": sorted({f"{entry['schema']}.{entry['name']}" for entry in self._tables.values()}),
+            "collections": sorted(self._collections),
+            "sql_age_seconds": None if self._sql_loaded_at is None else round(self.sql_age(), 1),
+        }
+
+
+# 全局元数据缓存（每个进程一份）
+schema_catalog = SchemaCatalog(ttl=Config.CATALOG_TTL_SECONDS)
@@ -0,0 +1,194 @@
+# backend/app/services/connection_pool.py
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """在超时时间内未能从连接池借出连接。"""
+
+
+class PoolClosedError(Exception):
+    """连接池已关闭。"""
+
+
+class ConnectionPool:
+    """
+    线程安全的有界数据库连接池。
+
+    :param factory: 无参可调用对象，返回一个新的 DB-API 连接
+    :param min_size: 预先创建并尽量保持的连接数
+    :param max_size: 连接总数（空闲 + 借出）上限
+    :param timeout: 借出连接的最长等待时间（秒）
+    :param validate_query: 借出前用于健康检查的语句
+    :param validate_idle_seconds: 空闲超过该秒数的连接在借出前才做健康检查，0 表示每次都检查
+    :param on_acquire: 可选回调，每次成功借出后以等待秒数（含健康检查和新建连接）调用
+    """
+
+    def __init__(self, factory, min_size: int = 1, max_size: int = 10, timeout: float = 30.0,
+                 validate_query: str = "SELECT 1", validate_idle_seconds: float = 0, on_acquire=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validate_query = validate_query
+        self.validate_idle_seconds = validate_idle_seconds
+        self._on_acquire = on_acquire
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()  # 元素为 (连接, 最近归还时间)
+        self._size = 0  # 已创建的连接数（含借出）
+        self._waiting = 0
+        self._closed = False
+
+    def open(self):
+        """
+        预先创建 min_size 个连接。创建失败只记录日志，后续借出时会重试。
+        """
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._factory()
+            except Exception as e:
+                logger.warning("Failed to pre-create pooled connection: %s", e)
+                with self._cond:
+                    self._size -= 1
+                return
+            self.release(conn)
+
+    def acquire(self, timeout: float = None):
+        """
+        借出一个连接。没有空闲连接且已达上限时等待，超时抛出 PoolTimeoutError。
+        空闲连接未通过健康检查时会被丢弃并自动补建新连接。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            conn, idle_since = self._checkout(deadline)
+            if conn is None:
+                # 已在计数中为新连接预留名额
+                try:
+                    conn = self._factory()
+                except Exception:
+                    self._forget()
+                    raise
+                break
+            if self._is_healthy(conn, idle_since):
+                break
+            logger.warning("Discarding dead pooled connection")
+            self._discard(conn)
+        if self._on_acquire is not None:
+            self._on_acquire(time.monotonic() - started)
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        """
+        归还连接。discard=True 或连接池已关闭时直接关闭该连接。
+        """
+        with self._cond:
+            if not (discard or self._closed):
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """
+        借出连接的上下文管理器。块内抛出异常时回滚事务，回滚失败则视为坏连接丢弃。
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, discard=True)
+            else:
+                self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """
+        关闭连接池：关闭所有空闲连接，借出中的连接在归还时关闭。
+        """
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    def _checkout(self, deadline: float):
+        """
+        在锁内取出空闲连接，或为新建连接预留名额（返回 (None, None)）。
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosedError("Connection pool is closed.")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out waiting for a database connection (max_size={self.max_size})."
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.validate_idle_seconds:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.validate_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.debug("Pooled connection failed validation: %s", e)
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
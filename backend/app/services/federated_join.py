@@ -0,0 +1,384 @@
+# backend/app/services/federated_join.py
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from contextlib import ExitStack
+from bson import ObjectId, Decimal128
+from backend.app.config import Config
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, stream_join_tables, _execute
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.sql_builder import quote_identifier
+from backend.app.services.metrics import instrument, DB_ROWS
+from backend.app.services.streaming import json_default
+
+logger = logging.getLogger(__name__)
+
+BUILD_SIDES = ("auto", "sql", "mongo")
+JOIN_TYPES = ("inner", "left")
+# SQL Server 单条语句最多 2100 个参数
+_MAX_SQL_PARAMS = 2000
+
+
+def _join_key(value):
+    """
+    两侧键值的统一表示：ObjectId 按十六进制字符串比较，Decimal128 转为 Decimal。
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    return value
+
+
+def _join_keys(value) -> list:
+    """
+    一行参与匹配的键列表。数组字段（多键）按每个元素各匹配一次，与 $in 的语义一致；
+    子文档无法与 SQL 值相等，不参与匹配。返回空列表表示该行没有可匹配的键。
+    """
+    values = value if isinstance(value, (list, tuple)) else [value]
+    keys = [_join_key(item) for item in values if item is not None and not isinstance(item, (dict, list, tuple))]
+    return list(dict.fromkeys(keys))
+
+
+def _estimate_size(value) -> int:
+    """
+    粗略估计一行在内存中的字节数（容器递归一层以下按元素累加）。
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + _estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+
+def _output_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    return json_default(value)
+
+
+def _ndjson_line(obj: dict) -> str:
+    return json.dumps(obj, default=_output_default, ensure_ascii=False) + "\n"
+
+
+class BuildTable:
+    """
+    构建侧哈希表：键 -> 行列表。估计内存超过 memory_limit 字节时转为分区模式，
+    已有的和后续的行按键哈希写入 partitions 个临时文件，之后逐个分区载入内存探测（grace hash join）。
+    键为 None（或没有可匹配的键）的行不参与匹配，单独保存（左连接时原样输出）；键为数组的行按每个元素各登记一次。
+    """
+
+    def __init__(self, key, memory_limit: int, partitions: int, spill_dir: str = None):
+        self.key = key
+        self.memory_limit = memory_limit
+        self.partition_count = max(1, partitions)
+        self.spill_dir = spill_dir
+        self.row_count = 0
+        self.bytes = 0
+        self.unmatchable = []
+        self._table = {}
+        self._directory = None
+        self._files = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._files is not None
+
+    def _partition(self, key) -> int:
+        return hash(key) % self.partition_count
+
+    def _spill(self):
+        self._directory = tempfile.mkdtemp(prefix="federated_join_", dir=self.spill_dir)
+        self._files = [
+            open(os.path.join(self._directory, f"partition_{index}.pkl"), "wb")
+            for index in range(self.partition_count)
+        ]
+        logger.info("Federated join build side exceeded %d bytes, spilling to %s", self.memory_limit, self._directory)
+        table, self._table = self._table, {}
+        for key, rows in table.items():
+            pickle.dump((key, rows), self._files[self._partition(key)], pickle.HIGHEST_PROTOCOL)
+
+    def add(self, rows: list):
+        for row in rows:
+            keys = _join_keys(self.key(row))
+            self.row_count += 1
+            if not keys:
+                self.unmatchable.append(row)
+                continue
+            if self.spilled:
+                for key in keys:
+                    pickle.dump((key, [row]), self._files[self._partition(key)], pickle.HIGHEST_PROTOCOL)
+                continue
+            for key in keys:
+                self._table.setdefault(key, []).append(row)
+            self.bytes += _estimate_size(row)
+            if self.bytes > self.memory_limit:
+                self._spill()
+
+    def partitions(self):
+        """
+        逐个产出分区的哈希表；未溢写时只有一个内存分区。
+        """
+        if not self.spilled:
+            yield self._table
+            return
+        for file in self._files:
+            file.close()
+        for index in range(self.partition_count):
+            table = {}
+            with open(os.path.join(self._directory, f"partition_{index}.pkl"), "rb") as file:
+                while True:
+                    try:
+                        key, rows = pickle.load(file)
+                    except EOFError:
+                        break
+                    table.setdefault(key, []).extend(rows)
+            if table:
+                yield table
+
+    def close(self):
+        if self._files is not None:
+            for file in self._files:
+                file.close()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._table = {}
+
+
+def _chunks(values: list, size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _sql_row_batches(query: str, batch_size: int, routing=None):
+    result = stream_join_tables(query, batch_size, routing=routing)
+    if result["status"] == "error":
+        raise RuntimeError(result["message"])
+    columns = result["columns"]
+    batches = result["batches"]
+    try:
+        for rows in batches:
+            yield [dict(zip(columns, row)) for row in rows]
+    finally:
+        batches.close()
+
+
+def _mongo_projection(projection: dict, key_field: str):
+    if not projection:
+        return None
+    projection = dict(projection)
+    if any(value for key, value in projection.items() if key != "_id"):
+        projection[key_field] = 1
+    else:
+        projection.pop(key_field, None)
+    return projection
+
+
+def _mongo_document_batches(collection_name: str, filter_query: dict, projection: dict, batch_size: int,
+                            routing=None):
+    db = MongoDatabaseManager.get_connection(routing)
+    cursor = db[collection_name].find(filter_query or {}, projection, batch_size=batch_size)
+    try:
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _mongo_key_values(key_field: str, keys: list) -> list:
+    """
+    下推到 MongoDB 的 $in 值：_id 字段上形如 ObjectId 的字符串同时按 ObjectId 匹配。
+    """
+    values = list(keys)
+    if key_field == "_id":
+        values += [ObjectId(key) for key in keys if isinstance(key, str) and ObjectId.is_valid(key)]
+    return values
+
+
+def _probe_mongo(collection_name: str, filter_query: dict, projection: dict, key_field: str, keys: list,
+                 batch_size: int, routing=None):
+    """
+    按 $in 批次查询另一侧，只读取可能匹配的文档。产出 (本批的键集合, 文档)：
+    数组键的文档会被包含其任一元素的每个批次返回，只能用本批的键匹配，否则同一对结果会重复输出。
+    """
+    db = MongoDatabaseManager.get_connection(routing)
+    for chunk in _chunks(keys, batch_size):
+        chunk_keys = set(chunk)
+        condition = {key_field: {"$in": _mongo_key_values(key_field, chunk)}}
+        query = {"$and": [filter_query, condition]} if filter_query else condition
+        cursor = db[collection_name].find(query, projection, batch_size=batch_size)
+        try:
+            for document in cursor:
+                yield chunk_keys, document
+        finally:
+            cursor.close()
+
+
+def _probe_sql(query: str, key_column: str, keys: list, batch_size: int, routing=None):
+    """
+    按参数化 IN 列表分批查询另一侧：SELECT * FROM (原查询) AS federated_probe WHERE [key] IN (?, ...)
+    产出 (本批的键集合, 行)，与 _probe_mongo 相同。
+    """
+    inner = query.strip().rstrip(";")
+    column = quote_identifier(key_column)
+    with SQLServerDatabaseManager.get_read_connection(routing) as conn:
+        cursor = conn.cursor()
+        try:
+            for chunk in _chunks(keys, min(batch_size, _MAX_SQL_PARAMS)):
+                placeholders = ", ".join("?" for _ in chunk)
+                sql = f"SELECT * FROM ({inner}) AS federated_probe WHERE {column} IN ({placeholders})"
+                chunk_keys = set(chunk)
+                _execute(cursor, "federated_join", sql, list(chunk))
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(Config.SQL_SERVER_FETCH_BATCH_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield chunk_keys, dict(zip(columns, row))
+        finally:
+            cursor.close()
+
+
+def _count_sql(query: str, routing=None) -> int:
+    inner = query.strip().rstrip(";")
+    with SQLServerDatabaseManager.get_read_connection(routing) as conn:
+        rows = _execute(conn.cursor(), "federated_join", f"SELECT COUNT_BIG(*) FROM ({inner}) AS federated_count",
+                        fetch=True)
+    return rows[0][0]
+
+
+def _count_mongo(collection_name: str, filter_query: dict, routing=None) -> int:
+    return MongoDatabaseManager.get_connection(routing)[collection_name].count_documents(filter_query or {})
+
+
+def _choose_build_side(build_side: str, how: str, query: str, collection_name: str, filter_query: dict,
+                       routing=None) -> str:
+    """
+    左连接需要知道哪些 SQL 行没有匹配，总是以 SQL 侧构建；auto 时比较两侧行数，选择较小的一侧。
+    """
+    if how == "left":
+        return "sql"
+    if build_side != "auto":
+        return build_side
+    return "sql" if _count_sql(query, routing) <= _count_mongo(collection_name, filter_query, routing) else "mongo"
+
+
+@instrument("federated")
+def federated_join(query: str, collection_name: str, sql_key: str, mongo_key: str, filter_query: dict = None,
+                   projection: dict = None, how: str = "inner", build_side: str = "auto",
+                   key_batch_size: int = None, memory_limit: int = None, routing=None):
+    """
+    SQL Server 查询结果与 MongoDB 集合的哈希连接。
+
+    先完整读取构建侧（较小的一侧）建立哈希表，超过内存上限时按键分区溢写到磁盘；
+    然后把构建侧的键按批下推到探测侧（MongoDB 用 $in，SQL Server 用参数化 IN 列表），
+    只读取可能匹配的行，结果逐行流式输出。
+
+    :param query: SQL 查询语句（不能包含 ORDER BY）
+    :param collection_name: 集合名
+    :param sql_key: SQL 结果中的连接键列
+    :param mongo_key: 文档中的连接键字段（支持点路径）
+    :param filter_query: MongoDB 筛选条件
+    :param projection: MongoDB 投影（会自动包含连接键）
+    :param how: inner 或 left（保留没有匹配文档的 SQL 行）
+    :param build_side: auto / sql / mongo；auto 时先分别计数，有额外的 COUNT 开销
+    :param key_batch_size: 每批下推的键数，默认 Config.FEDERATED_JOIN_KEY_BATCH_SIZE
+    :param memory_limit: 构建侧哈希表的估计内存上限（字节），默认 Config.FEDERATED_JOIN_MEMORY_LIMIT_BYTES
+    :param routing: 两侧查询共用的读路由（read_routing.ReadRouting），None 表示访问主库
+    :return: 成功时为 {"status": "success", "build_side": ..., "lines": NDJSON 行生成器}，
+             每行为 {"sql": {...}, "mongo": {...}}，最后一行为 {"stats": {...}}
+    """
+    key_batch_size = key_batch_size or Config.FEDERATED_JOIN_KEY_BATCH_SIZE
+    memory_limit = memory_limit or Config.FEDERATED_JOIN_MEMORY_LIMIT_BYTES
+    filter_query = filter_query or {}
+    projection = _mongo_projection(projection, mongo_key)
+    stack = ExitStack()
+    try:
+        if how not in JOIN_TYPES:
+            raise ValueError(f"Unsupported join type '{how}'.")
+        if build_side not in BUILD_SIDES:
+            raise ValueError(f"Unsupported build side '{build_side}'.")
+        quote_identifier(sql_key)
+        side = _choose_build_side(build_side, how, query, collection_name, filter_query, routing)
+
+        def mongo_value(document):
+            value = document
+            for part in mongo_key.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            return value
+
+        if side == "sql":
+            table = BuildTable(lambda row: row.get(sql_key), memory_limit,
+                               Config.FEDERATED_JOIN_SPILL_PARTITIONS, Config.FEDERATED_JOIN_SPILL_DIR)
+            stack.callback(table.close)
+            batches = _sql_row_batches(query, Config.SQL_SERVER_FETCH_BATCH_SIZE, routing)
+        else:
+            table = BuildTable(mongo_value, memory_limit,
+                               Config.FEDERATED_JOIN_SPILL_PARTITIONS, Config.FEDERATED_JOIN_SPILL_DIR)
+            stack.callback(table.close)
+            batches = _mongo_document_batches(collection_name, filter_query, projection, key_batch_size, routing)
+        for rows in batches:
+            table.add(rows)
+    except Exception as e:
+        stack.close()
+        logger.error("Error during federated join: %s", e)
+        return {"status": "error", "message": str(e)}
+
+    def lines():
+        stats = {"build_side": side, "build_rows": table.row_count, "spilled": table.spilled,
+                 "probe_rows": 0, "output_rows": 0}
+        with stack:
+            for partition in table.partitions():
+                keys = list(partition)
+                matched = set()
+                if side == "sql":
+                    probe = _probe_mongo(collection_name, filter_query, projection, mongo_key, keys, key_batch_size,
+                                         routing)
+                    probe_key = mongo_value
+                else:
+                    probe = _probe_sql(query, sql_key, keys, key_batch_size, routing)
+                    probe_key = lambda row: row.get(sql_key)
+                for chunk_keys, probe_row in probe:
+                    stats["probe_rows"] += 1
+                    output = []
+                    for key in _join_keys(probe_key(probe_row)):
+                        build_rows = partition.get(key) if key in chunk_keys else None
+                        if not build_rows:
+                            continue
+                        matched.add(key)
+                        for build_row in build_rows:
+                            pair = {"sql": build_row, "mongo": probe_row} if side == "sql" else \
+                                {"sql": probe_row, "mongo": build_row}
+                            output.append(_ndjson_line(pair))
+                    if not output:
+                        continue
+                    stats["output_rows"] += len(output)
+                    yield "".join(output)
+                if how == "left":
+                    output = [_ndjson_line({"sql": row, "mongo": None})
+                              for key, rows in partition.items() if key not in matched for row in rows]
+                    stats["output_rows"] += len(output)
+                    if output:
+                        yield "".join(output)
+            if how == "left" and table.unmatchable:
+                stats["output_rows"] += len(table.unmatchable)
+                yield "".join(_ndjson_line({"sql": row, "mongo": None}) for row in table.unmatchable)
+            DB_ROWS.observe(stats["output_rows"], backend="federated", operation="federated_join")
+            yield _ndjson_line({"stats": stats})
+
+    return {"status": "success", "build_side": side, "lines": lines()}
@@ -0,0 +1,89 @@
+# backend/app/services/job_types.py
+"""
+注册可以在后台任务队列中运行的长耗时操作。
+"""
+import os
+from backend.app.config import Config
+from backend.app.services.jobs import JobType, job_manager
+from backend.app.services.parquet_loader import load_parquet
+from backend.app.services.mongo_service import create_collection
+from backend.app.services.sql_server_service import delete_table, stream_join_tables
+from backend.app.services.analytics import materialize
+from backend.app.services.streaming import iter_ndjson
+
+
+def _parquet_load(context, file_path: str, target: str, name: str, batch_size: int = None,
+                  column_mapping: dict = None, start_row_group: int = 0, create_table: bool = False):
+    def progress(value: dict):
+        # 每个行组提交后保存进度，取消或关闭时在行组边界停止，可从 next_row_group 续传
+        context.report(value, force=True)
+        context.check_cancelled()
+
+    return load_parquet(file_path, target, name, batch_size=batch_size, column_mapping=column_mapping,
+                        start_row_group=start_row_group, create_table=create_table, progress_callback=progress)
+
+
+def _resume_parquet_load(params: dict, progress: dict) -> dict:
+    if not progress:
+        return params
+    return {**params, "start_row_group": progress["next_row_group"], "create_table": False}
+
+
+async def _create_collection(context, collection_name: str, indexes: list = None):
+    return await create_collection(collection_name, indexes)
+
+
+def _delete_table(context, table_name: str):
+    return delete_table(table_name)
+
+
+def _query_export(context, query: str, batch_size: int = None):
+    """
+    执行查询并把结果以 NDJSON 写入结果文件（先写临时文件，完成后原子替换），通过结果端点下载。
+    """
+    result = stream_join_tables(query, batch_size)
+    if result["status"] == "error":
+        return result
+    batches = result["batches"]
+    progress = {"rows": 0}
+
+    def tracked():
+        for rows in batches:
+            context.check_cancelled()
+            yield rows
+            progress["rows"] += len(rows)
+            context.report(progress)
+
+    temp_path = context.result_path + ".tmp"
+    try:
+        os.makedirs(Config.JOB_RESULT_DIR, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for chunk in iter_ndjson(result["columns"], tracked()):
+                file.write(chunk)
+        os.replace(temp_path, context.result_path)
+    finally:
+        batches.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    context.report(progress, force=True)
+    return {"status": "success", "rows": progress["rows"], "columns": result["columns"], "format": "ndjson"}
+
+
+def _analytics_snapshot(context, source: str, name: str, columns: list = None):
+    def progress(value: dict):
+        # 快照整体替换，取消或关闭时在批次之间放弃临时文件，重新排队后从头物化
+        context.report(value)
+        context.check_cancelled()
+
+    return materialize(source, name, columns, progress_callback=progress)
+
+
+for job_type in (
+    JobType("parquet_load", _parquet_load, resumable=True, resume=_resume_parquet_load),
+    JobType("create_collection", _create_collection),
+    JobType("delete_table", _delete_table),
+    JobType("query_export", _query_export, resumable=True),
+    JobType("analytics_snapshot", _analytics_snapshot, resumable=True),
+):
+    job_type.concurrency = Config.JOB_TYPE_CONCURRENCY.get(job_type.name, 1)
+    job_manager.register(job_type)
@@ -0,0 +1,382 @@
+# backend/app/services/jobs.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from backend.app.config import Config
+from backend.app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+JOBS_SUBMITTED = registry.counter("jobs_submitted_total", "Background jobs submitted.", ("type",))
+JOBS_FINISHED = registry.counter("jobs_finished_total", "Background jobs finished by outcome.", ("type", "status"))
+JOBS_ACTIVE = registry.gauge("jobs_active", "Background jobs by state.", ("type", "state"))
+
+
+class JobCancelled(Exception):
+    """
+    任务在检查点发现已被取消（或进程正在关闭）时抛出。
+    """
+
+
+class JobStore:
+    """
+    任务状态的本地持久化（SQLite），进程重启后仍可查询和恢复。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+                "progress TEXT, result TEXT, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        return self._conn
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        job = dict(row)
+        for field in ("params", "progress", "result"):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def insert(self, job: dict):
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, type, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job["id"], job["type"], job["status"], json.dumps(job["params"], default=str), job["created_at"]),
+            )
+
+    def update(self, job_id: str, **fields):
+        assignments, values = [], []
+        for field, value in fields.items():
+            if field in ("params", "progress", "result") and value is not None:
+                value = json.dumps(value, default=str)
+            assignments.append(f"{field} = ?")
+            values.append(value)
+        with self._lock:
+            self._connection().execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", (*values, job_id))
+
+    def claim(self, job_id: str) -> bool:
+        """
+        把排队中的任务标记为运行中。任务已被其他进程取消或启动时不修改，返回 False。
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def cancel_queued(self, job_id: str) -> bool:
+        """
+        把排队中的任务标记为已取消。任务已被其他进程启动或已结束时不修改，返回 False。
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, cancel_requested = 1 "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), "Job was cancelled.", job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: str = None, job_type: str = None, limit: int = 100) -> list:
+        sql, params = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if job_type:
+            sql += " AND type = ?"
+            params.append(job_type)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def queued(self) -> list:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def purge(self, finished_before: float) -> list:
+        """
+        删除早于 finished_before 结束的任务，返回被删除的任务 id。
+        """
+        with self._lock:
+            conn = self._connection()
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({', '.join('?' for _ in FINISHED)}) AND finished_at < ?",
+                (*FINISHED, finished_before),
+            )]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in ids])
+        return ids
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JobType:
+    """
+    任务类型：执行函数 func(context, **params)（同步或 async）、同时运行的上限，
+    以及进程中断后是否重新排队（resume 可根据已保存的进度改写参数，实现断点续传）。
+    """
+
+    def __init__(self, name: str, func, concurrency: int = 1, resumable: bool = False, resume=None):
+        self.name = name
+        self.func = func
+        self.concurrency = concurrency
+        self.resumable = resumable
+        self.resume = resume
+
+
+class JobContext:
+    """
+    传给任务函数的上下文：上报进度、在循环中检查是否已被取消。
+    """
+
+    def __init__(self, manager, job: dict):
+        self.manager = manager
+        self.job_id = job["id"]
+        self.params = job["params"]
+        self.result_path = os.path.join(Config.JOB_RESULT_DIR, f"{job['id']}.ndjson")
+        self._cancel = threading.Event()
+        self._progress_saved_at = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set() or self.manager.stopping
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled("Job was cancelled." if self._cancel.is_set() else "Job was interrupted by shutdown.")
+
+    def report(self, progress: dict, force: bool = False):
+        """
+        记录进度；写入存储的频率限制在每 Config.JOB_PROGRESS_INTERVAL_SECONDS 秒一次。
+        """
+        now = time.monotonic()
+        if force or now - self._progress_saved_at >= Config.JOB_PROGRESS_INTERVAL_SECONDS:
+            self._progress_saved_at = now
+            self.manager.store.update(self.job_id, progress=progress)
+
+
+class JobManager:
+    """
+    后台任务队列：提交后立即返回任务 id，由有界线程池按提交顺序执行，每种任务类型有独立的并发上限。
+    排队中的任务直接取消；运行中的任务在下一个检查点（check_cancelled / report 之间）停止。
+    """
+
+    def __init__(self, store: JobStore, max_workers: int):
+        self.store = store
+        self.max_workers = max_workers
+        self.types = {}
+        self.stopping = False
+        self._lock = threading.Lock()
+        self._executor = None
+        self._loop = None
+        self._running = {}
+        self._running_by_type = {}
+        self._polling = None
+
+    def register(self, job_type: JobType):
+        self.types[job_type.name] = job_type
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        启动线程池并恢复上次进程留下的任务：
+        运行中的可恢复任务重新排队，其余标记为失败；过期的已结束任务及其结果文件被清理。
+        :param loop: async 任务函数运行所在的事件循环（应用的主循环，异步数据库客户端绑定在其上）
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self.stopping = False
+            self._loop = loop
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._polling = threading.Event()
+            threading.Thread(target=self._poll, args=(self._polling,), name="job-poll", daemon=True).start()
+        for job in self.store.list(status=RUNNING, limit=1000000):
+            self._requeue_or_fail(job, "Job was interrupted by a restart.")
+        for job_id in self.store.purge(time.time() - Config.JOB_RETENTION_SECONDS):
+            self._remove_result(job_id)
+        self._dispatch()
+
+    def stop(self, timeout: float = None):
+        """
+        停止接收新任务，通知运行中的任务在下一个检查点退出，并等待最多 timeout 秒。
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.stopping = True
+        if executor is None:
+            return
+        self._polling.set()
+        deadline = time.monotonic() + (timeout or 0)
+        while self._running and (timeout is None or time.monotonic() < deadline):
+            time.sleep(0.05)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self, stopped: threading.Event):
+        """
+        定期检查任务存储：多进程部署时，其他工作进程提交的任务只写入存储，
+        对本进程运行中任务的取消也只设置存储中的 cancel_requested 标记。
+        """
+        while not stopped.wait(Config.JOB_POLL_INTERVAL_SECONDS):
+            try:
+                with self._lock:
+                    running = dict(self._running)
+                for job_id, context in running.items():
+                    job = self.store.get(job_id)
+                    if job is not None and job["cancel_requested"]:
+                        context._cancel.set()
+                self._dispatch()
+            except Exception as e:
+                logger.warning("Job poll failed: %s", e)
+
+    def _requeue_or_fail(self, job: dict, message: str):
+        job_type = self.types.get(job["type"])
+        if job_type is not None and job_type.resumable and not job["cancel_requested"]:
+            params = job_type.resume(job["params"], job["progress"]) if job_type.resume else job["params"]
+            self.store.update(job["id"], status=QUEUED, params=params, started_at=None)
+        else:
+            status = CANCELLED if job["cancel_requested"] else FAILED
+            self.store.update(job["id"], status=status, error=message, finished_at=time.time())
+
+    @staticmethod
+    def _remove_result(job_id: str):
+        path = os.path.join(Config.JOB_RESULT_DIR, f"{job_id}.ndjson")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def submit(self, job_type: str, params: dict) -> dict:
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type '{job_type}'.")
+        job = {"id": uuid.uuid4().hex, "type": job_type, "status": QUEUED, "params": params,
+               "created_at": time.time()}
+        self.store.insert(job)
+        JOBS_SUBMITTED.inc(type=job_type)
+        self._dispatch()
+        return self.store.get(job["id"])
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        取消任务：排队中的立即取消；运行中的设置取消标记，由任务在检查点响应；已结束的不变。
+        """
+        with self._lock:
+            job = self.store.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return job
+            # 读取之后任务可能已被其他进程启动，只取消仍在排队的任务，否则由运行它的进程在检查点响应
+            if job["status"] == QUEUED and self.store.cancel_queued(job_id):
+                JOBS_FINISHED.inc(type=job["type"], status=CANCELLED)
+                return self.store.get(job_id)
+            self.store.update(job_id, cancel_requested=1)
+            if job_id in self._running:
+                self._running[job_id]._cancel.set()
+        return self.store.get(job_id)
+
+    def _dispatch(self):
+        """
+        按提交顺序启动排队任务，直到线程池或对应类型的并发上限用满。
+        """
+        with self._lock:
+            if self._executor is None:
+                return
+            for job in self.store.queued():
+                if len(self._running) >= self.max_workers:
+                    break
+                job_type = self.types.get(job["type"])
+                if job_type is None:
+                    continue
+                if self._running_by_type.get(job_type.name, 0) >= job_type.concurrency:
+                    continue
+                # 读取队列之后任务可能已被其他进程取消，只启动仍在排队的任务
+                if not self.store.claim(job["id"]):
+                    continue
+                context = JobContext(self, job)
+                self._running[job["id"]] = context
+                self._running_by_type[job_type.name] = self._running_by_type.get(job_type.name, 0) + 1
+                self._executor.submit(self._run, job_type, job, context)
+
+    def _call(self, job_type: JobType, context: JobContext, params: dict):
+        if asyncio.iscoroutinefunction(job_type.func):
+            coroutine = job_type.func(context, **params)
+            if self._loop is not None and self._loop.is_running():
+                return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+            return asyncio.run(coroutine)
+        return job_type.func(context, **params)
+
+    def _run(self, job_type: JobType, job: dict, context: JobContext):
+        status, result, error = FAILED, None, None
+        try:
+            result = self._call(job_type, context, job["params"])
+            if isinstance(result, dict) and result.get("status") == "error":
+                error = result.get("message")
+            else:
+                status = SUCCEEDED
+            # 任务函数捕获了 JobCancelled 并返回错误时，按取消处理
+            if status == FAILED and context.cancelled:
+                raise JobCancelled(error)
+        except JobCancelled as e:
+            status, error = CANCELLED, str(e)
+        except Exception as e:
+            logger.error("Job %s (%s) failed: %s", job["id"], job_type.name, e)
+            error = str(e)
+        finally:
+            with self._lock:
+                self._running.pop(job["id"], None)
+                self._running_by_type[job_type.name] -= 1
+
+        if status == CANCELLED and self.stopping and not context._cancel.is_set():
+            # 进程关闭导致的中断：可恢复的任务重新排队，下次启动时继续
+            self._requeue_or_fail(self.store.get(job["id"]), error)
+        else:
+            self.store.update(job["id"], status=status, result=result, error=error, finished_at=time.time())
+            JOBS_FINISHED.inc(type=job_type.name, status=status)
+        self._dispatch()
+
+    def active_counts(self) -> dict:
+        with self._lock:
+            return dict(self._running_by_type)
+
+
+def _collect_job_metrics():
+    counts = job_manager.active_counts()
+    for name in job_manager.types:
+        JOBS_ACTIVE.set(counts.get(name, 0), type=name, state="running")
+
+
+job_manager = JobManager(JobStore(Config.JOB_STORE_PATH), Config.JOB_MAX_WORKERS)
+registry.add_collect_hook(_collect_job_metrics)
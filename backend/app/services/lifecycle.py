@@ -0,0 +1,207 @@
+# backend/app/services/lifecycle.py
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+import anyio.to_thread
+from backend.app.config import Config
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, get_schema_catalog
+from backend.app.services.mongo_service import MongoDatabaseManager, get_collection_catalog
+from backend.app.services.table_sync import sync_worker
+from backend.app.services.jobs import job_manager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class ServerState:
+    """
+    当前工作进程的状态。预热完成后才就绪；收到关闭信号后进入排空状态，
+    就绪检查失败使负载均衡器不再分配新请求，进行中的请求继续完成。
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.ready = False
+        self.draining = False
+        self.warmup = {}  # 各后端的预热结果：ok 或错误信息
+
+    def reset(self):
+        self.__init__()
+
+
+server_state = ServerState()
+
+
+def configure_threadpool(size: int = None):
+    """
+    设置执行同步路由（FastAPI 把 def 端点放到 anyio 线程池中执行）的线程数，必须在事件循环中调用。
+    线程数应与连接池上限和准入控制的并发数相匹配：多出的线程只会在借出连接时等待。
+    """
+    size = size or Config.SERVER_THREADPOOL_SIZE
+    if size:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+def _open_sql_server_pool():
+    pool = SQLServerDatabaseManager.init_pool()
+    # 连接池预建连接失败只记录日志，这里确认至少有一个连接可用
+    with pool.connection(Config.SERVER_WARMUP_TIMEOUT_SECONDS) as conn:
+        conn.timeout = max(1, math.ceil(Config.SERVER_WARMUP_TIMEOUT_SECONDS))
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+async def _warm_sql_server():
+    # 建立连接（登录可能挂起）在工作线程中进行，超时后不再等待，就绪检查继续报告该后端不可用
+    await asyncio.wait_for(asyncio.to_thread(_open_sql_server_pool), Config.SERVER_WARMUP_TIMEOUT_SECONDS)
+    if Config.SQL_SERVER_READ_REPLICAS:
+        # 测量复制延迟的同时为每个副本建立第一个连接，开始接受请求时副本已可参与路由
+        await asyncio.wait_for(asyncio.to_thread(SQLServerDatabaseManager.get_replicas().check_all),
+                               Config.SERVER_WARMUP_TIMEOUT_SECONDS)
+    await asyncio.wait_for(asyncio.to_thread(get_schema_catalog, True), Config.CATALOG_STARTUP_TIMEOUT_SECONDS)
+
+
+async def _warm_mongo():
+    db = MongoDatabaseManager.get_async_connection()
+    # 完成服务器选择、建立连接和认证
+    await asyncio.wait_for(db.command("ping"), Config.SERVER_WARMUP_TIMEOUT_SECONDS)
+    await asyncio.wait_for(get_collection_catalog(force=True), Config.CATALOG_STARTUP_TIMEOUT_SECONDS)
+
+
+async def warm_up() -> dict:
+    """
+    在开始接受请求之前打开并预热本进程的数据库资源：SQL Server 连接池和只读副本、
+    MongoDB 客户端、元数据缓存。某个后端失败只记录结果，不阻止启动，就绪检查会继续报告该后端不可用。
+    :return: {后端: "ok" 或错误信息}
+    """
+    results = {}
+    for backend, warm in (("sqlserver", _warm_sql_server), ("mongo", _warm_mongo)):
+        started = time.monotonic()
+        try:
+            await warm()
+            results[backend] = "ok"
+            logger.info("Warmed up %s in %.0f ms", backend, (time.monotonic() - started) * 1000)
+        except Exception as e:
+            results[backend] = repr(e)
+            logger.warning("Warm-up of %s failed: %r", backend, e)
+    server_state.warmup = results
+    server_state.ready = True
+    return results
+
+
+def _ping_sql_server():
+    with SQLServerDatabaseManager.get_pool().connection(Config.HEALTH_CHECK_TIMEOUT_SECONDS) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+async def _ping_mongo():
+    await MongoDatabaseManager.get_async_connection().command("ping")
+
+
+async def check_readiness() -> dict:
+    """
+    就绪检查：预热已完成、没有在排空，并且 Config.HEALTH_READY_BACKENDS 中的后端都能在
+    Config.HEALTH_CHECK_TIMEOUT_SECONDS 秒内响应。
+    """
+    checks = {}
+    probes = {"sqlserver": lambda: asyncio.to_thread(_ping_sql_server), "mongo": _ping_mongo}
+    if server_state.ready and not server_state.draining:
+        for backend in Config.HEALTH_READY_BACKENDS:
+            try:
+                await asyncio.wait_for(probes[backend](), Config.HEALTH_CHECK_TIMEOUT_SECONDS)
+                checks[backend] = "ok"
+            except Exception as e:
+                checks[backend] = repr(e)
+    ready = server_state.ready and not server_state.draining and all(value == "ok" for value in checks.values())
+    return {
+        "status": "ready" if ready else "not_ready",
+        "pid": server_state.pid,
+        "warming_up": not server_state.ready,
+        "draining": server_state.draining,
+        "checks": checks,
+    }
+
+
+class BackgroundServices:
+    """
+    后台同步线程和任务队列只在一个工作进程中运行：各进程竞争 Config.BACKGROUND_LOCK_PATH 上的文件锁，
+    持有者启动服务，其余进程每隔 Config.BACKGROUND_LOCK_RETRY_SECONDS 秒重试，持有者退出（包括崩溃）后由其中一个接管。
+    未持有锁的进程提交和取消任务只写入任务存储，由持有者轮询执行。
+    """
+
+    def __init__(self):
+        self.owner = False
+        self._fd = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        :param loop: 应用的主事件循环，async 任务在其上执行
+        """
+        self._loop = loop
+        self._stopped.clear()
+        if not self._try_acquire():
+            threading.Thread(target=self._retry, name="background-lock", daemon=True).start()
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._stopped.is_set():
+                return True
+            if Config.BACKGROUND_LOCK_PATH is not None:
+                os.makedirs(os.path.dirname(Config.BACKGROUND_LOCK_PATH) or ".", exist_ok=True)
+                fd = os.open(Config.BACKGROUND_LOCK_PATH, os.O_RDWR | os.O_CREAT)
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    else:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                except OSError:
+                    os.close(fd)
+                    return False
+                self._fd = fd
+            self.owner = True
+            logger.info("Process %s runs the background services", os.getpid())
+            if Config.SYNC_WORKER_ENABLED:
+                sync_worker.start()
+            # 恢复上次留下的任务
+            job_manager.start(self._loop)
+            return True
+
+    def _retry(self):
+        while not self._stopped.wait(Config.BACKGROUND_LOCK_RETRY_SECONDS):
+            if self._try_acquire():
+                return
+
+    def stop(self):
+        """
+        停止后台服务并释放文件锁。运行中的任务在检查点退出，可恢复的任务由下一个持有者继续。
+        """
+        with self._lock:
+            self._stopped.set()
+            owner, self.owner = self.owner, False
+        if not owner:
+            return
+        sync_worker.stop(timeout=30)
+        job_manager.stop(Config.JOB_SHUTDOWN_TIMEOUT_SECONDS)
+        if self._fd is not None:
+            if fcntl is None:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._fd)
+            self._fd = None
+
+
+background_services = BackgroundServices()
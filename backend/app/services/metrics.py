@@ -0,0 +1,323 @@
+# backend/app/services/metrics.py
+import functools
+import inspect
+import os
+import threading
+import time
+from backend.app.config import Config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, const_labels: dict = None) -> list:
+        """
+        :param const_labels: 附加到每个序列的固定标签（如多进程部署时的 pid）
+        """
+        names = self.labelnames + tuple(const_labels or {})
+        extra = tuple((const_labels or {}).values())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(names, key + extra, value) for key, value in series)
+        return lines
+
+    def _render_series(self, names: tuple, key: tuple, value) -> str:
+        return f"{self.name}{_format_labels(names, key)} {_format_number(value)}"
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    """只增不减的计数器。"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值。"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """按上界累计的分桶直方图，同时记录总和与次数。"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self, **labels) -> dict:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return {"sum": series["sum"], "count": series["count"]} if series else {"sum": 0.0, "count": 0}
+
+    def _render_series(self, names: tuple, key: tuple, series: dict) -> str:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series["buckets"]):
+            cumulative += count
+            labels = _format_labels(names, key, f'le="{_format_number(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(names, key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {series['count']}")
+        labels = _format_labels(names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_number(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表，按 Prometheus 文本格式（0.0.4）输出。
+    collect hook 在每次抓取前调用，用于刷新连接池占用等按需读取的瞬时值。
+    const_labels 附加到输出的每个序列上。
+    """
+
+    def __init__(self, const_labels: dict = None):
+        self.const_labels = dict(const_labels or {})
+        self._metrics = {}
+        self._hooks = []
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collect_hook(self, hook):
+        self._hooks.append(hook)
+
+    def render(self) -> str:
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception:
+                pass
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(self.const_labels))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+# 全局指标注册表（每个进程一份）。多个工作进程时带 pid 标签，
+# 同一地址的每次抓取只落到其中一个进程，由 Prometheus 侧按 pid 区分序列并用 sum without (pid) 聚合
+registry = MetricsRegistry({"pid": str(os.getpid())} if Config.SERVER_WORKERS > 1 else None)
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency including the streamed body.",
+    ("method", "endpoint", "status"),
+)
+REQUEST_ERRORS = registry.counter(
+    "http_request_errors_total", "HTTP requests that ended with a 5xx status or an unhandled exception.",
+    ("method", "endpoint", "status"),
+)
+SERVICE_LATENCY = registry.histogram(
+    "db_service_call_duration_seconds", "Duration of a service call, including validation and pool checkout.",
+    ("backend", "operation"),
+)
+SERVICE_ERRORS = registry.counter(
+    "db_service_errors_total", "Service calls that returned an error.", ("backend", "operation"),
+)
+DB_EXECUTION = registry.histogram(
+    "db_execution_duration_seconds", "Time spent executing statements or commands on the database.",
+    ("backend", "operation"),
+)
+DB_ROWS = registry.histogram(
+    "db_rows", "Rows returned (reads) or affected (writes) per statement or command.",
+    ("backend", "operation"), buckets=ROW_BUCKETS,
+)
+POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.", ("backend",),
+)
+POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections", "Pooled connections by state.", ("backend", "state"),
+)
+
+
+def observe_execution(backend: str, operation: str, seconds: float, rows: int = None):
+    DB_EXECUTION.observe(seconds, backend=backend, operation=operation)
+    if rows is not None and rows >= 0:
+        DB_ROWS.observe(rows, backend=backend, operation=operation)
+
+
+def _is_error(result) -> bool:
+    return isinstance(result, dict) and result.get("status") == "error"
+
+
+def instrument(backend: str, operation: str = None):
+    """
+    服务函数装饰器：记录调用耗时，返回 {"status": "error"} 或抛出异常时计入错误数。
+    同时支持同步函数和 async 函数。
+    """
+    def decorator(func):
+        name = operation or func.__name__
+
+        def record(started: float, failed: bool):
+            SERVICE_LATENCY.observe(time.perf_counter() - started, backend=backend, operation=name)
+            if failed:
+                SERVICE_ERRORS.inc(backend=backend, operation=name)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    record(started, True)
+                    raise
+                record(started, _is_error(result))
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                record(started, True)
+                raise
+            record(started, _is_error(result))
+            return result
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件：按路由模板（而非原始路径，避免标签基数膨胀）记录请求耗时和错误数。
+    耗时统计到响应体发送完毕为止，流式响应也能得到完整时长。
+    """
+
+    def __init__(self, app, skip_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self._templates = None
+
+    def _endpoint_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._templates is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._templates = {
+                getattr(route, "endpoint", None): route.path for route in routes if hasattr(route, "path")
+            }
+        return self._templates.get(endpoint, getattr(endpoint, "__name__", "unknown"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        failed = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            endpoint = self._endpoint_label(scope)
+            code = str(status["code"])
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method=method, endpoint=endpoint, status=code)
+            if failed or status["code"] >= 500:
+                REQUEST_ERRORS.inc(method=method, endpoint=endpoint, status=code)
@@ -0,0 +1,278 @@
+# backend/app/services/mongo_index_advisor.py
+import threading
+import time
+from pymongo import IndexModel
+from backend.app.config import Config
+
+_EQUALITY_OPS = {"$eq", "$in"}
+_RANGE_OPS = {"$gt", "$gte", "$lt", "$lte"}
+_INDEX_DIRECTIONS = {1, -1, "text", "hashed", "2d", "2dsphere"}
+
+
+def _classify(value) -> str:
+    """
+    判断单个字段条件的类别：equality、range 或 other（$ne、$regex 等无法有效利用索引前缀的条件）。
+    """
+    if not isinstance(value, dict) or not any(str(key).startswith("$") for key in value):
+        return "equality"
+    ops = set(value)
+    if ops <= _EQUALITY_OPS:
+        return "equality"
+    if ops <= _RANGE_OPS | _EQUALITY_OPS:
+        return "range"
+    if ops == {"$exists"}:
+        return "exists" if value["$exists"] else "other"
+    return "other"
+
+
+def _collect(filter_query: dict, fields: dict):
+    for key, value in filter_query.items():
+        if key == "$and" and isinstance(value, list):
+            for clause in value:
+                if isinstance(clause, dict):
+                    _collect(clause, fields)
+        elif key.startswith("$"):
+            # $or / $nor / $expr 等无法直接映射为单个复合索引
+            fields[key] = "other"
+        else:
+            fields[key] = _classify(value)
+
+
+def filter_shape(filter_query: dict) -> tuple:
+    """
+    提取筛选条件的形状：按字段名排序的 (字段, 类别) 元组，不包含任何值。
+    """
+    fields = {}
+    _collect(filter_query or {}, fields)
+    return tuple(sorted(fields.items()))
+
+
+def summarize_explain(explain: dict) -> dict:
+    """
+    从 explain 输出中提取获胜计划的关键阶段和使用的索引。
+    """
+    stages = []
+    indexes = []
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # 新版本查询引擎把经典计划放在 queryPlan 下
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stages.append(plan.get("stage"))
+        if plan.get("indexName"):
+            indexes.append(plan["indexName"])
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return {"stages": stages, "indexes": indexes, "collection_scan": "COLLSCAN" in stages}
+
+
+def leading_stages(pipeline: list) -> list:
+    """
+    返回管道开头可以下推到查询层、由索引支持的阶段名：连续的 $match 和 $sort。
+    """
+    names = []
+    for stage in pipeline:
+        name = next(iter(stage), None) if isinstance(stage, dict) else None
+        if name not in ("$match", "$sort"):
+            break
+        names.append(name)
+    return names
+
+
+def summarize_aggregate_explain(pipeline: list, explain: dict) -> dict:
+    """
+    汇总聚合管道的 explain（queryPlanner）输出：前导 $match / $sort 是否下推到查询层并使用索引，
+    以及哪些阶段仍在聚合层执行。兼容经典格式（stages[0].$cursor）、整体下推格式（顶层 queryPlanner）和分片集群（shards）。
+    """
+    leading = leading_stages(pipeline)
+    parts = explain["shards"].items() if isinstance(explain.get("shards"), dict) else [(None, explain)]
+    plans = []
+    for shard, part in parts:
+        stages = part.get("stages")
+        if stages:
+            source = stages[0].get("$cursor", {})
+            remaining = [next(iter(stage)) for stage in stages[1:]]
+        else:
+            source, remaining = part, []
+        plan = summarize_explain(source)
+        index_used = bool(plan["indexes"]) or "IDHACK" in plan["stages"]
+        blocking_sort = "SORT" in plan["stages"]
+        summary = {
+            "plan_stages": plan["stages"],
+            "indexes": plan["indexes"],
+            "collection_scan": plan["collection_scan"],
+            "match_uses_index": "$match" in leading and index_used,
+            # 排序由索引提供时计划中没有 SORT 阶段，$sort 也不会留在聚合层
+            "sort_uses_index": ("$sort" in leading and index_used and not blocking_sort
+                                and "$sort" not in remaining),
+            "blocking_sort": blocking_sort or "$sort" in remaining,
+            "aggregation_stages": remaining,
+        }
+        if shard is not None:
+            summary["shard"] = shard
+        plans.append(summary)
+    return {
+        "leading_stages": leading,
+        "uses_index": bool(plans) and all(plan["match_uses_index"] or plan["sort_uses_index"] for plan in plans),
+        "plans": plans,
+    }
+
+
+class IndexAdvisor:
+    """
+    记录 Mongo 操作的筛选形状（字段和运算符类别，不含值）及耗时，
+    对慢形状抽样 explain，并据此给出复合索引或部分索引建议。
+    """
+
+    def __init__(self, slow_ms: float = 100, explain_interval: float = 300, max_shapes: int = 1000):
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def record(self, collection_name: str, operation: str, filter_query: dict, duration_ms: float) -> bool:
+        """
+        记录一次操作。返回 True 表示该形状较慢且需要（重新）抽样 explain。
+        """
+        shape = filter_shape(filter_query)
+        key = (collection_name, shape)
+        now = time.monotonic()
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # 淘汰最久未出现的形状
+                    oldest = min(self._shapes, key=lambda k: self._shapes[k]["last_seen"])
+                    del self._shapes[oldest]
+                stats = self._shapes[key] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "operations": set(),
+                    "last_seen": now, "explain": None, "explained_at": None,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["operations"].add(operation)
+            stats["last_seen"] = now
+
+            needs_explain = duration_ms >= self.slow_ms and (
+                stats["explained_at"] is None or now - stats["explained_at"] > self.explain_interval
+            )
+            if needs_explain:
+                # 先占位，避免并发请求重复 explain
+                stats["explained_at"] = now
+            return needs_explain
+
+    def store_explain(self, collection_name: str, filter_query: dict, explain: dict):
+        key = (collection_name, filter_shape(filter_query))
+        with self._lock:
+            if key in self._shapes:
+                self._shapes[key]["explain"] = summarize_explain(explain)
+
+    def shapes(self, collection_name: str = None) -> list:
+        with self._lock:
+            items = [(key, dict(stats)) for key, stats in self._shapes.items()
+                     if collection_name is None or key[0] == collection_name]
+        result = []
+        for (collection, shape), stats in items:
+            result.append({
+                "collection": collection,
+                "shape": dict(shape),
+                "operations": sorted(stats["operations"]),
+                "count": stats["count"],
+                "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+                "explain": stats["explain"],
+            })
+        result.sort(key=lambda item: item["avg_ms"] * item["count"], reverse=True)
+        return result
+
+    def advise(self, existing_indexes: dict, collection_name: str = None, min_count: int = 1) -> list:
+        """
+        根据慢形状给出索引建议。键顺序遵循“等值字段在前、范围字段在后”；
+        所有匹配都要求某字段存在时建议部分索引。已有索引的键前缀能覆盖时不再建议。
+
+        :param existing_indexes: {集合名: [[(字段, 方向), ...], ...]}
+        """
+        recommendations = []
+        for item in self.shapes(collection_name):
+            slow = item["avg_ms"] >= self.slow_ms
+            scanned = bool(item["explain"] and item["explain"]["collection_scan"])
+            if item["count"] < min_count or not (slow or scanned):
+                continue
+
+            equality = [field for field, kind in item["shape"].items() if kind == "equality"]
+            ranges = [field for field, kind in item["shape"].items() if kind == "range"]
+            exists = [field for field, kind in item["shape"].items() if kind == "exists"]
+            keys = [(field, 1) for field in equality + ranges] or [(field, 1) for field in exists]
+            if not keys:
+                continue
+
+            existing = existing_indexes.get(item["collection"], [])
+            prefix = (equality, ranges) if equality + ranges else (exists, [])
+            if any(_covers([field for field, _ in index], *prefix) for index in existing):
+                continue
+
+            recommendation = {
+                "collection": item["collection"],
+                "keys": [list(key) for key in keys],
+                "reason": "collection scan" if scanned else f"average {item['avg_ms']} ms",
+                "observed": {"count": item["count"], "avg_ms": item["avg_ms"], "max_ms": item["max_ms"]},
+            }
+            if exists and equality + ranges:
+                recommendation["partial_filter_expression"] = {field: {"$exists": True} for field in exists}
+            if recommendation not in recommendations:
+                recommendations.append(recommendation)
+        return recommendations
+
+
+def _covers(index_fields: list, equality: list, ranges: list) -> bool:
+    """
+    已有索引能否支持该形状：等值字段的顺序不影响索引的使用，按集合与索引前导字段比较，之后紧接范围字段。
+    """
+    if set(index_fields[:len(equality)]) != set(equality):
+        return False
+    return set(index_fields[len(equality):len(equality) + len(ranges)]) == set(ranges)
+
+
+def build_index_models(indexes: list) -> list:
+    """
+    将索引配置转换为 IndexModel 列表，用于一次 create_indexes 调用。
+    支持：
+    - {"field": "a", "unique": true}（单字段升序，兼容旧格式）
+    - {"keys": [["a", 1], ["b", -1]], "name", "unique", "sparse",
+       "partial_filter_expression": {...}, "expire_after_seconds": 3600}
+    """
+    models = []
+    for index, spec in enumerate(indexes or []):
+        if "keys" in spec:
+            keys = spec["keys"]
+            keys = list(keys.items()) if isinstance(keys, dict) else [tuple(key) for key in keys]
+        elif spec.get("field"):
+            keys = [(spec["field"], 1)]
+        else:
+            raise ValueError(f"Index {index} requires 'keys' or 'field'.")
+        if not keys or any(len(key) != 2 or key[1] not in _INDEX_DIRECTIONS for key in keys):
+            raise ValueError(f"Index {index} has invalid keys: {spec.get('keys')}")
+
+        options = {}
+        if spec.get("name"):
+            options["name"] = spec["name"]
+        if spec.get("unique"):
+            options["unique"] = True
+        if spec.get("sparse"):
+            options["sparse"] = True
+        if spec.get("partial_filter_expression"):
+            options["partialFilterExpression"] = spec["partial_filter_expression"]
+        if spec.get("expire_after_seconds") is not None:
+            if len(keys) != 1:
+                raise ValueError(f"Index {index}: TTL indexes must have exactly one field.")
+            options["expireAfterSeconds"] = int(spec["expire_after_seconds"])
+        models.append(IndexModel(keys, **options))
+    return models
+
+
+# 全局索引顾问（每个进程一份）
+index_advisor = IndexAdvisor(
+    slow_ms=Config.MONGO_SLOW_OPERATION_MS,
+    explain_interval=Config.MONGO_EXPLAIN_INTERVAL_SECONDS,
+    max_shapes=Config.MONGO_ADVISOR_MAX_SHAPES,
+)
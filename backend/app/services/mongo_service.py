@@ -1,63 +1,284 @@
-from pymongo import MongoClient
-from pymongo.errors import CollectionInvalid
+import asyncio
+import json
+import logging
+import time
+from pymongo import MongoClient, AsyncMongoClient, InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, BulkWriteError
+from bson import json_util
 from backend.app.config import Config
+from backend.app.services.catalog import schema_catalog
+from backend.app.services.mongo_index_advisor import (
+    index_advisor, build_index_models, filter_shape, summarize_aggregate_explain
+)
+from backend.app.services.slow_query_log import slow_query_log, statement_fingerprint
+from backend.app.services.metrics import instrument, observe_execution, POOL_WAIT, POOL_CONNECTIONS
+from backend.app.services.read_routing import READ_ROUTES
+from backend.app.services.streaming import (
+    query_fingerprint, encode_continuation_token, decode_continuation_token
+)
+
+logger = logging.getLogger(__name__)
+
+# 持有后台 explain 任务的引用，防止被垃圾回收
+_background_tasks = set()
+
+
+class _MetricsListener(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """
+    驱动事件监听器：记录每个命令的服务器执行耗时和返回/影响文档数，以及连接池借出等待时间。
+    回调在驱动内部同步执行，只做计数，不做 I/O。
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        reply = event.reply or {}
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            rows = len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+        else:
+            rows = reply.get("n")
+        observe_execution("mongo", event.command_name, event.duration_micros / 1e6, rows)
+
+    def failed(self, event):
+        observe_execution("mongo", event.command_name, event.duration_micros / 1e6)
+
+    def connection_checked_out(self, event):
+        POOL_WAIT.observe(event.duration, backend="mongo")
+        POOL_CONNECTIONS.inc(backend="mongo", state="in_use")
+
+    def connection_checked_in(self, event):
+        POOL_CONNECTIONS.dec(backend="mongo", state="in_use")
+
+    def connection_check_out_failed(self, event):
+        POOL_WAIT.observe(event.duration, backend="mongo")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+_metrics_listener = _MetricsListener()
+
+
+def _with_routing(db, routing):
+    if routing is None:
+        return db
+    READ_ROUTES.inc(backend="mongo", target=routing.preference)
+    return db.with_options(**routing.mongo_options())
 
 
 class MongoDatabaseManager:
     _connection = None
+    _async_connection = None
 
     @classmethod
-    def get_connection(cls):
+    def get_connection(cls, routing=None):
         """
-        获取全局 MongoDB 数据库连接。如果不存在，则创建一个新连接。
+        获取全局同步 MongoDB 数据库连接（供命令行脚本和后台线程使用）。如果不存在，则创建一个新连接。
+        :param routing: 读路由（read_routing.ReadRouting），提供时返回带对应读偏好和读关注的数据库对象
         """
         if cls._connection is None:
-            cls._connection = MongoClient(Config.MONGO_URI)
-        return cls._connection[Config.MONGO_DB_NAME]
+            cls._connection = MongoClient(Config.MONGO_URI, event_listeners=[_metrics_listener])
+        return _with_routing(cls._connection[Config.MONGO_DB_NAME], routing)
 
     @classmethod
     def close_connection(cls):
         """
-        关闭全局 MongoDB 数据库连接。
+        关闭全局同步 MongoDB 数据库连接。
         """
         if cls._connection:
             cls._connection.close()
             cls._connection = None
 
-def create_collection(collection_name: str, indexes: list = None):
+    @classmethod
+    def get_async_connection(cls, routing=None):
+        """
+        获取全局异步 MongoDB 数据库连接（供 async 路由使用）。如果不存在，则创建一个新客户端。
+        :param routing: 读路由（read_routing.ReadRouting），提供时返回带对应读偏好和读关注的数据库对象
+        """
+        if cls._async_connection is None:
+            cls._async_connection = AsyncMongoClient(
+                Config.MONGO_URI, maxPoolSize=Config.MONGO_MAX_POOL_SIZE, event_listeners=[_metrics_listener]
+            )
+        return _with_routing(cls._async_connection[Config.MONGO_DB_NAME], routing)
+
+    @classmethod
+    async def close_async_connection(cls):
+        """
+        关闭全局异步 MongoDB 客户端。
+        """
+        if cls._async_connection:
+            await cls._async_connection.close()
+            cls._async_connection = None
+
+def _normalize_operation(collection_name: str, operation: str, filter_query: dict) -> str:
+    """
+    慢查询日志中的规范化文本：集合、操作和筛选形状（不含值）。
+    """
+    shape = {field: kind for field, kind in filter_shape(filter_query)}
+    return json.dumps({"collection": collection_name, "op": operation, "filter": shape}, sort_keys=True)
+
+
+def _explain_command(collection_name: str, operation: str, filter_query: dict, update: dict = None,
+                     multi: bool = False) -> dict:
+    """
+    构造与实际执行的命令相同的 explain 目标：update / delete 按写命令解释（queryPlanner 级别不执行写入），其余按 find。
+    """
+    if operation == "update":
+        return {"update": collection_name, "updates": [{"q": filter_query, "u": update, "multi": multi}]}
+    if operation == "delete":
+        return {"delete": collection_name, "deletes": [{"q": filter_query, "limit": 0 if multi else 1}]}
+    return {"find": collection_name, "filter": filter_query}
+
+
+def _in_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _explain_filter(collection_name: str, filter_query: dict, advise: bool = True, slow: dict = None,
+                          command: dict = None):
+    """
+    在后台获取筛选条件的查询计划（只做计划选择，不执行查询）。
+    :param advise: 是否把计划交给索引顾问
+    :param slow: 非空时为慢操作信息 {"operation", "duration_ms", "rows"}，连同计划写入慢查询日志
+    :param command: 要解释的命令，默认为使用该筛选条件的 find
+    """
+    statement = fingerprint = None
+    capture = advise
+    if slow is not None:
+        statement = _normalize_operation(collection_name, slow["operation"], filter_query)
+        fingerprint = statement_fingerprint("mongo", statement)
+        capture = capture or (Config.SLOW_QUERY_CAPTURE_PLANS and slow_query_log.should_capture_plan(fingerprint))
+
+    explain, explain_error = None, None
+    if capture:
+        try:
+            db = MongoDatabaseManager.get_async_connection()
+            explain = await db.command(
+                "explain", command or {"find": collection_name, "filter": filter_query}, verbosity="queryPlanner"
+            )
+        except Exception as e:
+            explain_error = str(e)
+            logger.debug("Explain failed for %s: %s", collection_name, e)
+
+    if advise and explain is not None:
+        index_advisor.store_explain(collection_name, filter_query, explain)
+    if slow is not None:
+        try:
+            plan = json.loads(json_util.dumps(explain)) if explain is not None else None
+            # 写日志文件（及轮转）是阻塞 I/O，放到线程中执行，不占用事件循环
+            await asyncio.to_thread(slow_query_log.record, "mongo", slow["operation"], statement,
+                                    slow["duration_ms"], slow["rows"], plan=plan, plan_format="explain",
+                                    plan_error=explain_error, fingerprint=fingerprint)
+        except Exception as e:
+            logger.warning("Failed to record slow operation: %s", e)
+
+def _observe_filter(collection_name: str, operation: str, filter_query: dict, started: float, rows: int = None,
+                    command: dict = None):
+    """
+    把筛选形状和耗时记录到索引顾问，慢形状在后台抽样 explain；超过慢查询阈值的操作连同 explain 写入慢查询日志。
+    :param command: 要解释的命令（见 _explain_command），默认为使用该筛选条件的 find
+    """
+    duration_ms = (time.perf_counter() - started) * 1000
+    advise = index_advisor.record(collection_name, operation, filter_query, duration_ms)
+    slow = None
+    if slow_query_log.is_slow(duration_ms):
+        slow = {"operation": operation, "duration_ms": duration_ms, "rows": rows}
+    if advise or slow is not None:
+        _in_background(_explain_filter(collection_name, filter_query, advise, slow, command))
+
+async def _record_slow_write(collection_name: str, operation: str, duration_ms: float, rows: int, kinds: list):
+    statement = json.dumps({"collection": collection_name, "op": operation, "ops": kinds}, sort_keys=True)
+    try:
+        await asyncio.to_thread(slow_query_log.record, "mongo", operation, statement, duration_ms, rows)
+    except Exception as e:
+        logger.warning("Failed to record slow operation: %s", e)
+
+def _observe_write(collection_name: str, operation: str, started: float, rows: int = None, kinds: list = ()):
+    """
+    超过慢查询阈值的插入和批量写入在后台写入慢查询日志（没有单一的筛选条件，不做 explain）。
+    :param kinds: 批量写入包含的操作类型，用于区分指纹
+    """
+    duration_ms = (time.perf_counter() - started) * 1000
+    if slow_query_log.is_slow(duration_ms):
+        _in_background(_record_slow_write(collection_name, operation, duration_ms, rows, sorted(set(kinds))))
+
+async def get_collection_catalog(force: bool = False):
+    """
+    返回包含集合名的元数据缓存，未加载、已过期或 force=True 时重新加载。
+    """
+    if force or schema_catalog.mongo_is_stale():
+        db = MongoDatabaseManager.get_async_connection()
+        schema_catalog.load_collections(await db.list_collection_names())
+    return schema_catalog
+
+@instrument("mongo")
+async def create_collection(collection_name: str, indexes: list = None):
     """
     创建集合，并可选配置索引。
     """
     try:
-        db = MongoDatabaseManager.get_connection()
-        if collection_name in db.list_collection_names():
+        models = build_index_models(indexes)
+        db = MongoDatabaseManager.get_async_connection()
+        catalog = await get_collection_catalog()
+        if catalog.has_collection(collection_name):
             return {"status": "error", "message": f"Collection '{collection_name}' already exists."}
 
-        collection = db.create_collection(collection_name)
+        try:
+            collection = await db.create_collection(collection_name)
+        except CollectionInvalid:
+            # 缓存过期期间由其他进程创建
+            catalog.add_collection(collection_name)
+            return {"status": "error", "message": f"Collection '{collection_name}' already exists."}
+        catalog.add_collection(collection_name)
 
-        # 创建索引
-        if indexes:
-            for index in indexes:
-                field = index.get("field")
-                unique = index.get("unique", False)
-                if field:
-                    collection.create_index([(field, 1)], unique=unique)
+        # 一次 create_indexes 调用创建全部索引
+        if models:
+            await collection.create_indexes(models)
 
         return {"status": "success", "message": f"Collection '{collection_name}' created successfully."}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
-def insert_data(collection_name: str, data: list):
+@instrument("mongo")
+async def insert_data(collection_name: str, data: list):
     try:
-        db = MongoDatabaseManager.get_connection()
+        db = MongoDatabaseManager.get_async_connection()
         collection = db[collection_name]
 
         # 确保 data 是列表
         if not isinstance(data, list):
             data = [data]
 
-        result = collection.insert_many(data)
+        started = time.perf_counter()
+        result = await collection.insert_many(data)
+        _observe_write(collection_name, "insert", started, len(result.inserted_ids))
 
         if not result.inserted_ids:
             raise ValueError("No documents were inserted.")
@@ -71,7 +292,48 @@ def insert_data(collection_name: str, data: list):
         return {"status": "error", "message": str(e)}
 
 
-def update_data(collection_name: str, filter_query: dict, update_values: dict, multi: bool = False):
+@instrument("mongo")
+async def insert_data_batch(collection_name: str, batches: list) -> list:
+    """
+    将多个独立调用方的插入合并为一次无序 insert_many（写合并使用）。
+    某个文档写入失败只影响它所属的调用方；与单独调用 insert_data 不同，该调用方的其他文档仍会写入。
+    :param batches: 文档列表的列表，每项对应一个调用方
+    :return: 与 batches 一一对应的结果字典列表（格式与 insert_data 相同）
+    """
+    documents = [document for batch in batches for document in batch]
+    owners = [index for index, batch in enumerate(batches) for _ in batch]
+    errors = {}
+    try:
+        if documents:
+            db = MongoDatabaseManager.get_async_connection()
+            started = time.perf_counter()
+            try:
+                await db[collection_name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    errors.setdefault(owners[error["index"]], error.get("errmsg"))
+            _observe_write(collection_name, "insert_data_batch", started, len(documents) - len(errors))
+    except Exception as e:
+        return [{"status": "error", "message": str(e)} for _ in batches]
+
+    results = []
+    for index, batch in enumerate(batches):
+        if not batch:
+            results.append({"status": "error", "message": "No documents were inserted."})
+        elif index in errors:
+            results.append({"status": "error", "message": errors[index]})
+        else:
+            # insert_many 在客户端为每个文档生成 _id
+            results.append({
+                "status": "success",
+                "message": "Data inserted successfully.",
+                "inserted_ids": [str(document["_id"]) for document in batch],
+            })
+    return results
+
+
+@instrument("mongo")
+async def update_data(collection_name: str, filter_query: dict, update_values: dict, multi: bool = False):
     """
     更新集合中的数据。
 
@@ -82,16 +344,19 @@ def update_data(collection_name: str, filter_query: dict, update_values: dict, m
     :return: 操作结果字典
     """
     try:
-        db = MongoDatabaseManager.get_connection()
+        db = MongoDatabaseManager.get_async_connection()
         collection = db[collection_name]
 
         # 构造更新操作
         update_operation = {"$set": update_values}
 
+        started = time.perf_counter()
         if multi:
-            result = collection.update_many(filter_query, update_operation)
+            result = await collection.update_many(filter_query, update_operation)
         else:
-            result = collection.update_one(filter_query, update_operation)
+            result = await collection.update_one(filter_query, update_operation)
+        _observe_filter(collection_name, "update", filter_query, started, result.modified_count,
+                        _explain_command(collection_name, "update", filter_query, update_operation, multi))
 
         return {
             "status": "success",
@@ -103,7 +368,8 @@ def update_data(collection_name: str, filter_query: dict, update_values: dict, m
         return {"status": "error", "message": str(e)}
 
 
-def delete_data(collection_name: str, filter_query: dict, multi: bool = False):
+@instrument("mongo")
+async def delete_data(collection_name: str, filter_query: dict, multi: bool = False):
     """
     删除集合中的数据。
 
@@ -113,14 +379,17 @@ def delete_data(collection_name: str, filter_query: dict, multi: bool = False):
     :return: 操作结果字典
     """
     try:
-        db = MongoDatabaseManager.get_connection()
+        db = MongoDatabaseManager.get_async_connection()
         collection = db[collection_name]
 
         # 根据 multi 参数执行删除操作
+        started = time.perf_counter()
         if multi:
-            result = collection.delete_many(filter_query)
+            result = await collection.delete_many(filter_query)
         else:
-            result = collection.delete_one(filter_query)
+            result = await collection.delete_one(filter_query)
+        _observe_filter(collection_name, "delete", filter_query, started, result.deleted_count,
+                        _explain_command(collection_name, "delete", filter_query, multi=multi))
 
         return {
             "status": "success",
@@ -131,3 +400,376 @@ def delete_data(collection_name: str, filter_query: dict, multi: bool = False):
         return {"status": "error", "message": str(e)}
 
 
+def _find_fingerprint(collection_name: str, filter_query: dict, sort: list) -> str:
+    return query_fingerprint(json_util.dumps({"c": collection_name, "f": filter_query, "s": sort}, sort_keys=True))
+
+
+def _get_path(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _keyset_filter(sort: list, last_values: list) -> dict:
+    """
+    生成“排在上一页最后一条之后”的条件：
+    (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...，降序字段使用 $lt。
+    null 和缺失字段在升序中排在最前、降序中排在最后：v 为 null 时升序的“之后”是 {k: {"$ne": null}}，
+    降序没有“之后”；v 不为 null 时降序的“之后”还包括 {k: null}。
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        prefix = {prefix_field: last_values[index] for index, (prefix_field, _) in enumerate(sort[:position])}
+        value = last_values[position]
+        if value is None:
+            conditions = [{"$ne": None}] if direction == 1 else []
+        elif direction == 1:
+            conditions = [{"$gt": value}]
+        else:
+            conditions = [{"$lt": value}, None]
+        clauses.extend({**prefix, field: condition} for condition in conditions)
+    return {"$or": clauses}
+
+def _prepare_find(collection_name: str, filter_query: dict, projection: dict, sort: list,
+                  continuation_token: str):
+    """
+    规范化排序（追加 _id 作为唯一的决胜键）、补全投影中的排序字段并应用续页条件。
+    :return: (筛选条件, 投影, 排序, 需要从结果中去掉的字段, 令牌指纹)
+    """
+    sort = [(field, 1 if direction >= 0 else -1) for field, direction in (sort or [])]
+    if "_id" not in [field for field, _ in sort]:
+        sort.append(("_id", sort[-1][1] if sort else 1))
+
+    hidden = []
+    if projection:
+        included = any(value for key, value in projection.items() if key != "_id")
+        projection = dict(projection)
+        for field, _ in sort:
+            if included and not projection.get(field, field == "_id"):
+                projection[field] = 1
+                hidden.append(field)
+            elif not included and field in projection and not projection[field]:
+                del projection[field]
+                hidden.append(field)
+
+    fingerprint = _find_fingerprint(collection_name, filter_query, sort)
+    if continuation_token:
+        token = decode_continuation_token(continuation_token, json_util.loads)
+        if token.get("q") != fingerprint:
+            raise ValueError("Continuation token does not belong to this query.")
+        keyset = _keyset_filter(sort, token["v"])
+        filter_query = {"$and": [filter_query, keyset]} if filter_query else keyset
+    return filter_query, projection or None, sort, hidden, fingerprint
+
+
+def _page_token(fingerprint: str, sort: list, last_document: dict) -> str:
+    return encode_continuation_token(
+        {"q": fingerprint, "v": [_get_path(last_document, field) for field, _ in sort]}, json_util.dumps
+    )
+
+
+def _strip_hidden(document: dict, hidden: list) -> dict:
+    for field in hidden:
+        document.pop(field, None)
+    return document
+
+
+@instrument("mongo")
+async def find_documents(collection_name: str, filter_query: dict = None, projection: dict = None,
+                         sort: list = None, limit: int = None, batch_size: int = None,
+                         continuation_token: str = None, routing=None):
+    """
+    按键集分页查询文档。翻页条件基于排序键和 _id，而不是 skip，因此任意深度的页成本相同。
+
+    :param filter_query: 筛选条件
+    :param projection: 投影
+    :param sort: 排序键列表，例如 [["created_at", -1]]，会自动追加 _id 作为决胜键
+    :param limit: 每页文档数，默认 Config.MONGO_FIND_DEFAULT_LIMIT
+    :param batch_size: 游标每批从服务器获取的文档数
+    :param continuation_token: 上一页返回的续页令牌
+    :param routing: 读路由（read_routing.ReadRouting），None 表示使用客户端默认设置
+    :return: 操作结果字典，documents 为文档列表，continuation_token 为下一页令牌（没有更多数据时为 None）
+    """
+    try:
+        limit = min(limit or Config.MONGO_FIND_DEFAULT_LIMIT, Config.MONGO_FIND_MAX_LIMIT)
+        original_filter = filter_query or {}
+        query, projection, sort, hidden, fingerprint = _prepare_find(
+            collection_name, original_filter, projection, sort, continuation_token
+        )
+
+        db = MongoDatabaseManager.get_async_connection(routing)
+        started = time.perf_counter()
+        # 多取一条用于判断是否还有下一页
+        cursor = db[collection_name].find(query, projection, sort=sort, limit=limit + 1,
+                                          batch_size=batch_size or 0)
+        documents = [document async for document in cursor]
+        _observe_filter(collection_name, "find", original_filter, started, len(documents))
+
+        token = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            token = _page_token(fingerprint, sort, documents[-1])
+        return {
+            "status": "success",
+            "documents": [_strip_hidden(document, hidden) for document in documents],
+            "continuation_token": token,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+@instrument("mongo")
+async def stream_documents(collection_name: str, filter_query: dict = None, projection: dict = None,
+                           sort: list = None, limit: int = None, batch_size: int = None,
+                           continuation_token: str = None, routing=None):
+    """
+    以 NDJSON 流式返回查询结果，游标按 batch_size 分批获取，内存占用与结果集大小无关。
+    提供 limit 且结果达到 limit 时，最后一行为 {"continuation_token": ...}。
+    :param routing: 读路由（read_routing.ReadRouting），None 表示使用客户端默认设置
+    :return: 成功时为 {"status": "success", "lines": NDJSON 行的异步生成器}
+    """
+    try:
+        original_filter = filter_query or {}
+        query, projection, sort, hidden, fingerprint = _prepare_find(
+            collection_name, original_filter, projection, sort, continuation_token
+        )
+        db = MongoDatabaseManager.get_async_connection(routing)
+        cursor = db[collection_name].find(query, projection, sort=sort, limit=(limit + 1) if limit else 0,
+                                          batch_size=batch_size or 0)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+    async def lines():
+        count = 0
+        last_document = None
+        try:
+            async for document in cursor:
+                if limit and count == limit:
+                    yield json_util.dumps({"continuation_token": _page_token(fingerprint, sort, last_document)}) + "\n"
+                    return
+                count += 1
+                last_document = document
+                yield json_util.dumps(_strip_hidden(dict(document), hidden)) + "\n"
+        finally:
+            await cursor.close()
+
+    return {"status": "success", "lines": lines()}
+
+
+def pipeline_writes(pipeline: list) -> bool:
+    """
+    管道是否以 $out / $merge 写入集合（只能在主库执行）。
+    """
+    return any(isinstance(stage, dict) and ("$out" in stage or "$merge" in stage) for stage in pipeline)
+
+
+def _leading_match(pipeline: list) -> dict:
+    """
+    合并管道开头连续的 $match 阶段，用于记录筛选形状；开头不是 $match 时返回 None。
+    """
+    filters = []
+    for stage in pipeline:
+        if not isinstance(stage, dict) or "$match" not in stage:
+            break
+        filters.append(stage["$match"])
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+@instrument("mongo")
+async def aggregate_documents(collection_name: str, pipeline: list, allow_disk_use: bool = None,
+                              max_time_ms: int = None, batch_size: int = None, routing=None):
+    """
+    在服务器端执行聚合管道（$match、$group、$lookup、$facet 等），以 NDJSON 流式返回结果。
+    游标按 batch_size 分批获取，内存占用与结果集大小无关。
+    在请求截止时间内执行时（pymongo.timeout），驱动改用剩余时间作为 maxTimeMS；该端点默认不设截止时间，
+    由 max_time_ms 限制服务器端执行时间。
+
+    :param pipeline: 聚合管道阶段列表
+    :param allow_disk_use: $group、$sort 等阶段超出内存上限时是否写临时文件，默认 Config.MONGO_AGGREGATE_ALLOW_DISK_USE
+    :param max_time_ms: 服务器端执行时间上限（毫秒），默认 Config.MONGO_AGGREGATE_MAX_TIME_MS
+    :param batch_size: 游标每批从服务器获取的文档数
+    :param routing: 读路由（read_routing.ReadRouting），None 表示使用客户端默认设置
+    :return: 成功时为 {"status": "success", "lines": NDJSON 行的异步生成器}
+    """
+    try:
+        options = {
+            "allowDiskUse": Config.MONGO_AGGREGATE_ALLOW_DISK_USE if allow_disk_use is None else allow_disk_use,
+            "maxTimeMS": max_time_ms or Config.MONGO_AGGREGATE_MAX_TIME_MS,
+        }
+        if batch_size:
+            options["batchSize"] = batch_size
+        db = MongoDatabaseManager.get_async_connection(routing)
+        started = time.perf_counter()
+        cursor = await db[collection_name].aggregate(pipeline, **options)
+        match = _leading_match(pipeline)
+        if match is not None:
+            _observe_filter(collection_name, "aggregate", match, started)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+    async def lines():
+        try:
+            async for document in cursor:
+                yield json_util.dumps(document) + "\n"
+        finally:
+            await cursor.close()
+
+    return {"status": "success", "lines": lines()}
+
+
+@instrument("mongo")
+async def explain_aggregate(collection_name: str, pipeline: list, allow_disk_use: bool = None,
+                            max_time_ms: int = None, routing=None):
+    """
+    获取聚合管道的查询计划（queryPlanner，不执行管道），并汇总前导 $match / $sort 是否使用索引、
+    哪些阶段留在聚合层执行。
+    :return: 操作结果字典，summary 为汇总，explain 为原始输出
+    """
+    try:
+        db = MongoDatabaseManager.get_async_connection(routing)
+        command = {
+            "aggregate": collection_name,
+            "pipeline": pipeline,
+            "cursor": {},
+            "allowDiskUse": Config.MONGO_AGGREGATE_ALLOW_DISK_USE if allow_disk_use is None else allow_disk_use,
+        }
+        explain = await db.command(
+            "explain", command, verbosity="queryPlanner", maxTimeMS=max_time_ms or Config.MONGO_AGGREGATE_MAX_TIME_MS
+        )
+        return {
+            "status": "success",
+            "summary": summarize_aggregate_explain(pipeline, explain),
+            "explain": json.loads(json_util.dumps(explain)),
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+@instrument("mongo")
+async def create_indexes(collection_name: str, indexes: list):
+    """
+    为已有集合创建索引，支持复合、部分和 TTL 索引，全部索引在一次 create_indexes 调用中创建。
+    """
+    try:
+        models = build_index_models(indexes)
+        if not models:
+            return {"status": "error", "message": "No indexes to create."}
+        db = MongoDatabaseManager.get_async_connection()
+        names = await db[collection_name].create_indexes(models)
+        return {"status": "success", "message": f"{len(names)} indexes created.", "index_names": names}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+@instrument("mongo")
+async def get_index_advice(collection_name: str = None):
+    """
+    返回记录到的筛选形状统计和索引建议（已被现有索引覆盖的形状不再建议）。
+    """
+    try:
+        shapes = index_advisor.shapes(collection_name)
+        db = MongoDatabaseManager.get_async_connection()
+        existing = {}
+        for name in {item["collection"] for item in shapes}:
+            information = await db[name].index_information()
+            existing[name] = [spec["key"] for spec in information.values()]
+        return {
+            "status": "success",
+            "recommendations": index_advisor.advise(existing, collection_name, Config.MONGO_INDEX_ADVICE_MIN_COUNT),
+            "shapes": shapes,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def _build_write_model(index: int, operation: dict):
+    """
+    将单个操作描述转换为 pymongo 的写模型。
+    """
+    kind = operation.get("op")
+    filter_query = operation.get("filter")
+    upsert = operation.get("upsert", False)
+
+    if kind == "insert_one":
+        if operation.get("document") is None:
+            raise ValueError(f"Operation {index} ({kind}) requires 'document'.")
+        return InsertOne(operation["document"])
+    if kind in ("update_one", "update_many"):
+        if filter_query is None or operation.get("update") is None:
+            raise ValueError(f"Operation {index} ({kind}) requires 'filter' and 'update'.")
+        model = UpdateOne if kind == "update_one" else UpdateMany
+        return model(filter_query, operation["update"], upsert=upsert, array_filters=operation.get("array_filters"))
+    if kind == "replace_one":
+        if filter_query is None or operation.get("replacement") is None:
+            raise ValueError(f"Operation {index} ({kind}) requires 'filter' and 'replacement'.")
+        return ReplaceOne(filter_query, operation["replacement"], upsert=upsert)
+    if kind in ("delete_one", "delete_many"):
+        if filter_query is None:
+            raise ValueError(f"Operation {index} ({kind}) requires 'filter'.")
+        return DeleteOne(filter_query) if kind == "delete_one" else DeleteMany(filter_query)
+    raise ValueError(f"Operation {index} has unsupported type '{kind}'.")
+
+
+def _summarize_bulk_result(details: dict, operations: list) -> dict:
+    """
+    将 bulk_api_result 转换为汇总计数和逐操作错误列表。
+    """
+    return {
+        "inserted_count": details.get("nInserted", 0),
+        "matched_count": details.get("nMatched", 0),
+        "modified_count": details.get("nModified", 0),
+        "deleted_count": details.get("nRemoved", 0),
+        "upserted_count": details.get("nUpserted", 0),
+        "upserted_ids": {str(item["index"]): str(item["_id"]) for item in details.get("upserted", [])},
+        "write_errors": [
+            {
+                "index": error["index"],
+                "op": operations[error["index"]].get("op"),
+                "code": error.get("code"),
+                "message": error.get("errmsg"),
+            }
+            for error in details.get("writeErrors", [])
+        ],
+        "write_concern_errors": [error.get("errmsg") for error in details.get("writeConcernErrors", [])],
+    }
+
+
+@instrument("mongo")
+async def bulk_write(collection_name: str, operations: list, ordered: bool = True):
+    """
+    在一次 bulk_write 往返中执行多种写操作。
+
+    :param collection_name: 集合名称
+    :param operations: 操作列表，每项包含 op（insert_one / update_one / update_many / replace_one /
+                       delete_one / delete_many）及对应的 document、filter、update、replacement、upsert 等字段
+    :param ordered: True 时按顺序执行并在第一个错误处停止；False 时尽可能执行全部操作
+    :return: 操作结果字典，包含汇总计数和逐操作错误
+    """
+    try:
+        requests = [_build_write_model(index, operation) for index, operation in enumerate(operations)]
+        if not requests:
+            raise ValueError("No operations to execute.")
+
+        db = MongoDatabaseManager.get_async_connection()
+        collection = db[collection_name]
+
+        started = time.perf_counter()
+        try:
+            result = await collection.bulk_write(requests, ordered=ordered)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        _observe_write(collection_name, "bulk_write", started, len(operations),
+                       [operation["op"] for operation in operations])
+
+        summary = _summarize_bulk_result(details, operations)
+        failed = len(summary["write_errors"])
+        message = "Bulk write completed." if not failed else f"Bulk write completed with {failed} failed operations."
+        return {"status": "success", "message": message, **summary}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,203 @@
+# backend/app/services/ndjson_ingest.py
+import json
+import zlib
+from bson import json_util
+from pymongo.errors import BulkWriteError
+from backend.app.config import Config
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.metrics import instrument, DB_ROWS
+
+try:
+    # 可选依赖：安装了 orjson 时用它解析，速度明显快于标准库
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_CHUNK_LIMIT = 1024 * 1024
+
+
+class _GzipStream:
+    """
+    增量解压 gzip 数据，支持多个 gzip 成员首尾相接（如 cat a.gz b.gz）。
+    """
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, data: bytes):
+        """
+        逐段产出解压后的数据，每段不超过 _CHUNK_LIMIT 字节（高压缩比的输入不会一次性展开到内存）。
+        """
+        while data:
+            yield self._decompressor.decompress(data, _CHUNK_LIMIT)
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                data = self._decompressor.unconsumed_tail
+
+    def close(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class IngestReport:
+    """
+    导入结果：总数始终准确；逐批明细和被拒绝的行只保留前若干条，内存占用与上传大小无关。
+    """
+
+    def __init__(self, max_batches: int, max_rejections: int):
+        self.max_batches = max_batches
+        self.max_rejections = max_rejections
+        self.lines = 0
+        self.inserted_count = 0
+        self.rejected_count = 0
+        self.batches = []
+        self.rejected = []
+        self._batch_count = 0
+
+    def reject(self, line: int, error: str):
+        self.rejected_count += 1
+        if len(self.rejected) < self.max_rejections:
+            self.rejected.append({"line": line, "error": error})
+
+    def add_batch(self, first_line: int, last_line: int, inserted: int, failed: int):
+        self._batch_count += 1
+        self.inserted_count += inserted
+        if len(self.batches) < self.max_batches:
+            self.batches.append({"batch": self._batch_count - 1, "first_line": first_line, "last_line": last_line,
+                                 "inserted": inserted, "failed": failed})
+
+    def to_dict(self) -> dict:
+        return {
+            "lines": self.lines,
+            "inserted_count": self.inserted_count,
+            "rejected_count": self.rejected_count,
+            "batch_count": self._batch_count,
+            "batches": self.batches,
+            "batches_truncated": self._batch_count > len(self.batches),
+            "rejected": self.rejected,
+            "rejected_truncated": self.rejected_count > len(self.rejected),
+        }
+
+
+async def _flush(collection, documents: list, line_numbers: list, report: IngestReport):
+    failed = 0
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        # 无序写入：出错的文档单独记录，同批其他文档照常写入
+        errors = e.details.get("writeErrors", [])
+        for error in errors:
+            report.reject(line_numbers[error["index"]], error.get("errmsg"))
+        failed = len(errors)
+        inserted = e.details.get("nInserted", len(documents) - failed)
+    report.add_batch(line_numbers[0], line_numbers[-1], inserted, failed)
+    DB_ROWS.observe(inserted, backend="mongo", operation="ingest_ndjson")
+
+
+@instrument("mongo")
+async def ingest_ndjson(collection_name: str, chunks, compressed: bool = None, batch_size: int = None,
+                        extended_json: bool = False, max_rejected: int = None):
+    """
+    以流式方式解析 NDJSON 请求体并分批写入集合，内存占用只取决于 batch_size 和单行长度上限。
+
+    :param chunks: 请求体字节块的异步迭代器（request.stream()）
+    :param compressed: 是否为 gzip 压缩；None 时根据前两个字节自动识别
+    :param batch_size: 每次 insert_many(ordered=False) 的文档数，默认 Config.NDJSON_INGEST_BATCH_SIZE
+    :param extended_json: 按 MongoDB Extended JSON 解析（$oid / $date 等还原为 BSON 类型，较慢）
+    :param max_rejected: 被拒绝的行超过该数量时停止导入（已写入的批次不回滚）
+    :return: 操作结果字典，包含总行数、写入数、拒绝数、逐批明细和被拒绝的行（行号从 1 开始）
+    """
+    batch_size = batch_size or Config.NDJSON_INGEST_BATCH_SIZE
+    loads = json_util.loads if extended_json else _loads
+    report = IngestReport(Config.NDJSON_MAX_REPORTED_BATCHES, Config.NDJSON_MAX_REPORTED_REJECTIONS)
+    collection = MongoDatabaseManager.get_async_connection()[collection_name]
+    documents, line_numbers = [], []
+    buffer = bytearray()
+    # 超长行：丢弃到下一个换行符为止
+    skipping = False
+    gzip_stream = None
+
+    def parse(line: bytes):
+        report.lines += 1
+        line = line.strip()
+        if not line:
+            return
+        try:
+            document = loads(line)
+        except Exception as e:
+            report.reject(report.lines, f"Invalid JSON: {e}")
+            return
+        if not isinstance(document, dict):
+            report.reject(report.lines, "Expected a JSON object.")
+            return
+        documents.append(document)
+        line_numbers.append(report.lines)
+
+    def lines_from(data: bytes):
+        """
+        解析数据中的完整行；每凑满一批文档暂停一次（生成器），由调用方写入后再继续，
+        因此高压缩比的 gzip 输入展开后缓冲的文档也不超过 batch_size。
+        """
+        nonlocal skipping
+        buffer.extend(data)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            if skipping:
+                skipping = False
+            else:
+                parse(bytes(buffer[start:end]))
+            start = end + 1
+            if len(documents) >= batch_size:
+                yield
+        del buffer[:start]
+        if len(buffer) > Config.NDJSON_MAX_LINE_BYTES:
+            if not skipping:
+                report.lines += 1
+                report.reject(report.lines, f"Line exceeds {Config.NDJSON_MAX_LINE_BYTES} bytes.")
+            skipping = True
+            buffer.clear()
+
+    async def flush_full_batch():
+        await _flush(collection, documents[:batch_size], line_numbers[:batch_size], report)
+        del documents[:batch_size]
+        del line_numbers[:batch_size]
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if gzip_stream is None and compressed is not False:
+                if compressed or (not buffer and report.lines == 0 and chunk[:2] == _GZIP_MAGIC):
+                    gzip_stream = _GzipStream()
+                compressed = gzip_stream is not None
+            for data in (gzip_stream.feed(chunk) if gzip_stream else (chunk,)):
+                for _ in lines_from(data):
+                    await flush_full_batch()
+            if max_rejected is not None and report.rejected_count > max_rejected:
+                return {"status": "error", "message": f"More than {max_rejected} lines were rejected.",
+                        **report.to_dict()}
+
+        if gzip_stream is not None:
+            for _ in lines_from(gzip_stream.close()):
+                await flush_full_batch()
+        if buffer and not skipping:
+            parse(bytes(buffer))
+        if documents:
+            await _flush(collection, documents, line_numbers, report)
+        if max_rejected is not None and report.rejected_count > max_rejected:
+            return {"status": "error", "message": f"More than {max_rejected} lines were rejected.",
+                    **report.to_dict()}
+        return {"status": "success", "message": f"{report.inserted_count} documents inserted.", **report.to_dict()}
+    except zlib.error as e:
+        return {"status": "error", "message": f"Invalid gzip data: {e}", **report.to_dict()}
+    except Exception as e:
+        return {"status": "error", "message": str(e), **report.to_dict()}
@@ -0,0 +1,193 @@
+# backend/app/services/parquet_loader.py
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+from backend.app.config import Config
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.query_cache import query_cache
+from backend.app.services.catalog import schema_catalog
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ("sql_server", "mongo")
+
+
+def arrow_type_to_sql(arrow_type: pa.DataType) -> str:
+    """
+    将 Arrow 字段类型映射为 SQL Server 列类型。
+    """
+    if pa.types.is_boolean(arrow_type):
+        return "BIT"
+    if pa.types.is_int8(arrow_type) or pa.types.is_int16(arrow_type) or pa.types.is_uint8(arrow_type):
+        return "SMALLINT"
+    if pa.types.is_int32(arrow_type) or pa.types.is_uint16(arrow_type):
+        return "INT"
+    if pa.types.is_integer(arrow_type):
+        return "BIGINT"
+    if pa.types.is_float16(arrow_type) or pa.types.is_float32(arrow_type):
+        return "REAL"
+    if pa.types.is_floating(arrow_type):
+        return "FLOAT"
+    if pa.types.is_decimal(arrow_type):
+        return f"DECIMAL({arrow_type.precision}, {arrow_type.scale})"
+    if pa.types.is_timestamp(arrow_type):
+        return "DATETIME2"
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    if pa.types.is_time(arrow_type):
+        return "TIME"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return "VARBINARY(MAX)"
+    return "NVARCHAR(MAX)"
+
+
+def inspect_parquet(file_path: str) -> dict:
+    """
+    只读取 Parquet 文件元数据，返回行数、行组数和字段类型。
+    """
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    return {
+        "num_rows": metadata.num_rows,
+        "num_row_groups": metadata.num_row_groups,
+        "columns": [{"name": field.name, "type": str(field.type)} for field in parquet_file.schema_arrow],
+    }
+
+
+def build_column_mapping(schema: pa.Schema, column_mapping: dict = None) -> list:
+    """
+    生成 (源字段, 目标列) 列表。未提供 column_mapping 时使用全部字段且目标列名与源字段同名。
+    """
+    if not column_mapping:
+        return [(name, name) for name in schema.names]
+    missing = [source for source in column_mapping if source not in schema.names]
+    if missing:
+        raise ValueError(f"Columns not found in Parquet schema: {missing}")
+    return list(column_mapping.items())
+
+
+def build_create_table_sql(schema: pa.Schema, table_name: str, mapping: list) -> str:
+    """
+    根据 Arrow schema 和列映射生成 CREATE TABLE 语句。
+    """
+    columns = [
+        f"[{target}] {arrow_type_to_sql(schema.field(source).type)} NULL" for source, target in mapping
+    ]
+    return f"CREATE TABLE {table_name} ({', '.join(columns)})"
+
+
+def _write_sql_server_row_group(batches, table_name: str, targets: list) -> int:
+    """
+    在一个事务中写入一个行组的所有批次，行组是断点续传的最小单位。
+    """
+    columns_str = ", ".join(f"[{target}]" for target in targets)
+    placeholders = ", ".join(["?"] * len(targets))
+    query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+
+    written = 0
+    with SQLServerDatabaseManager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        for batch in batches:
+            rows = list(zip(*(column.to_pylist() for column in batch.columns)))
+            if rows:
+                cursor.executemany(query, rows)
+                written += len(rows)
+        conn.commit()
+    query_cache.invalidate_table(table_name)
+    return written
+
+
+def _write_mongo_row_group(batches, collection_name: str, targets: list) -> int:
+    """
+    逐批写入 MongoDB。MongoDB 不支持跨批次回滚，从中断的行组续传时该行组可能出现重复文档。
+    """
+    collection = MongoDatabaseManager.get_connection()[collection_name]
+    written = 0
+    for batch in batches:
+        documents = batch.rename_columns(targets).to_pylist()
+        if documents:
+            collection.insert_many(documents, ordered=False)
+            written += len(documents)
+    return written
+
+
+def load_parquet(file_path: str, target: str, name: str, batch_size: int = None, column_mapping: dict = None,
+                 start_row_group: int = 0, create_table: bool = False, progress_callback=None):
+    """
+    以记录批次流式读取 Parquet 文件并批量写入 SQL Server 表或 MongoDB 集合，内存占用只取决于 batch_size。
+
+    :param file_path: Parquet 文件路径
+    :param target: 写入目标，"sql_server" 或 "mongo"
+    :param name: 目标表名或集合名
+    :param batch_size: 每批读取的行数，默认使用 Config.PARQUET_BATCH_SIZE
+    :param column_mapping: {源字段: 目标列} 映射，只导入映射中的字段
+    :param start_row_group: 从该行组开始导入，用于断点续传
+    :param create_table: target 为 sql_server 时，是否根据 Arrow schema 先创建目标表
+    :param progress_callback: 每完成一个行组调用一次，参数为进度字典
+    :return: 操作结果字典，失败时 next_row_group 为续传起点
+    """
+    batch_size = batch_size or Config.PARQUET_BATCH_SIZE
+    next_row_group = start_row_group
+    rows_loaded = 0
+    try:
+        if target not in TARGETS:
+            raise ValueError(f"Unsupported target '{target}', expected one of {TARGETS}.")
+
+        parquet_file = pq.ParquetFile(file_path)
+        metadata = parquet_file.metadata
+        num_row_groups = metadata.num_row_groups
+        if not 0 <= start_row_group <= num_row_groups:
+            raise ValueError(f"start_row_group must be between 0 and {num_row_groups}.")
+
+        schema = parquet_file.schema_arrow
+        mapping = build_column_mapping(schema, column_mapping)
+        sources = [source for source, _ in mapping]
+        targets = [target_column for _, target_column in mapping]
+
+        if target == "sql_server" and create_table and start_row_group == 0:
+            with SQLServerDatabaseManager.get_connection() as conn:
+                conn.cursor().execute(build_create_table_sql(schema, name, mapping))
+                conn.commit()
+            schema_catalog.invalidate_sql()
+
+        write_row_group = _write_sql_server_row_group if target == "sql_server" else _write_mongo_row_group
+        total_rows = metadata.num_rows
+        rows_done = sum(metadata.row_group(i).num_rows for i in range(start_row_group))
+
+        for row_group in range(start_row_group, num_row_groups):
+            batches = parquet_file.iter_batches(batch_size=batch_size, row_groups=[row_group], columns=sources)
+            written = write_row_group(batches, name, targets)
+            rows_loaded += written
+            rows_done += written
+            next_row_group = row_group + 1
+
+            progress = {
+                "row_group": row_group,
+                "next_row_group": next_row_group,
+                "num_row_groups": num_row_groups,
+                "rows_loaded": rows_loaded,
+                "rows_done": rows_done,
+                "total_rows": total_rows,
+            }
+            logger.info("Loaded row group %s/%s (%s/%s rows) into %s '%s'",
+                        next_row_group, num_row_groups, rows_done, total_rows, target, name)
+            if progress_callback:
+                progress_callback(progress)
+
+        return {
+            "status": "success",
+            "message": f"{rows_loaded} rows loaded from '{file_path}' into {target} '{name}'.",
+            "rows_loaded": rows_loaded,
+            "next_row_group": next_row_group,
+            "num_row_groups": num_row_groups,
+        }
+    except Exception as e:
+        logger.error("Parquet load failed at row group %s: %s", next_row_group, e)
+        return {
+            "status": "error",
+            "message": str(e),
+            "rows_loaded": rows_loaded,
+            "next_row_group": next_row_group,
+        }
@@ -0,0 +1,165 @@
+# backend/app/services/query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from backend.app.config import Config
+
+# 表名，支持 schema.table、[table] 和 "table" 写法
+_NAME = r'(?:[\[\"]?[\w$#]+[\]\"]?\.)*[\[\"]?[\w$#]+[\]\"]?'
+_CLAUSE_KEYWORDS = (
+    "WHERE|ON|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|OUTER|GROUP|ORDER|HAVING|UNION|EXCEPT|INTERSECT|OPTION|FOR|WITH"
+)
+# FROM / JOIN 关键字
+_FROM_RE = re.compile(r'\b(?:FROM|JOIN)\b', re.IGNORECASE)
+# 一个表引用：表名、可选的 "(" （表值函数）、可选的别名和 WITH (...) 表提示，以及之后的逗号（逗号分隔的 FROM 列表）
+_REFERENCE_RE = re.compile(
+    rf'\s*({_NAME})(\s*\()?(?:\s+(?:AS\s+)?(?!(?:{_CLAUSE_KEYWORDS})\b)[\w$#\[\]"]+)?'
+    r'(?:\s+WITH\s*\([^)]*\))?\s*(,)?',
+    re.IGNORECASE,
+)
+# 无法可靠判断引用了哪些表的写法：CTE 和 APPLY
+_UNCERTAIN_RE = re.compile(r'^\s*;?\s*WITH\b|\bAPPLY\b', re.IGNORECASE)
+
+def normalize_table_name(table_name: str) -> str:
+    """
+    规范化表名：去掉 schema 前缀、方括号和引号，并转为小写。
+    """
+    last = table_name.strip().split(".")[-1]
+    return last.strip('[]"').lower()
+
+
+def normalize_query(query: str) -> str:
+    """
+    规范化查询文本作为缓存键：合并空白并去掉末尾分号。
+    """
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def extract_tables(query: str) -> frozenset:
+    """
+    提取查询中 FROM / JOIN 引用的表名，包括逗号分隔的 FROM 列表。
+    无法可靠判断时（CTE、APPLY、表值函数）返回空集合，调用方据此不缓存结果。
+    """
+    if _UNCERTAIN_RE.search(query):
+        return frozenset()
+    tables = set()
+    for keyword in _FROM_RE.finditer(query):
+        position = keyword.end()
+        while True:
+            match = _REFERENCE_RE.match(query, position)
+            if match is None:
+                # 派生表 FROM (SELECT ...)：其中的 FROM 会被单独匹配
+                break
+            if match.group(2):
+                return frozenset()
+            tables.add(normalize_table_name(match.group(1)))
+            if not match.group(3):
+                break
+            position = match.end()
+    return frozenset(tables)
+
+class QueryCache:
+    """
+    进程内 LRU + TTL 查询结果缓存，按表失效。
+
+    每张表维护一个版本号，写操作使其递增；查询开始前记录版本快照，
+    写入缓存时若快照已过期则放弃写入，避免并发写操作后缓存旧结果。
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60, max_rows: int = 10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, tables, stored_at)
+        self._generations = defaultdict(int)
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+                       "rejected": 0}
+
+    def get(self, key, max_age: float = None):
+        """
+        读取缓存。返回 (value, age)；未命中或已过期时返回 (None, None)。
+        :param max_age: 调用方可接受的最大缓存年龄（秒），不超过 TTL
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, None
+            value, _, stored_at = entry
+            age = now - stored_at
+            if age > self.ttl:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None, None
+            if max_age is not None and age > max_age:
+                self._stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value, age
+
+    def snapshot(self, tables) -> tuple:
+        """
+        记录查询开始前相关表的版本号。
+        """
+        with self._lock:
+            return tuple(self._generations[table] for table in sorted(tables))
+
+    def put(self, key, value, tables, snapshot: tuple, row_count: int = 0):
+        """
+        写入缓存。未识别出表名、结果过大或相关表在查询期间被修改时不缓存。
+        """
+        if not tables or row_count > self.max_rows:
+            with self._lock:
+                self._stats["rejected"] += 1
+            return False
+        with self._lock:
+            if tuple(self._generations[table] for table in sorted(tables)) != snapshot:
+                self._stats["rejected"] += 1
+                return False
+            self._entries[key] = (value, tables, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            return True
+
+    def invalidate_table(self, table_name: str) -> int:
+        """
+        使引用了指定表的缓存项失效，返回失效的条目数。
+        """
+        table = normalize_table_name(table_name)
+        with self._lock:
+            self._generations[table] += 1
+            stale = [key for key, (_, tables, _) in self._entries.items() if table in tables]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+# 全局查询缓存（每个进程一份）
+query_cache = QueryCache(
+    max_entries=Config.QUERY_CACHE_MAX_ENTRIES,
+    ttl=Config.QUERY_CACHE_TTL_SECONDS,
+    max_rows=Config.QUERY_CACHE_MAX_ROWS,
+)
@@ -0,0 +1,220 @@
+# backend/app/services/read_routing.py
+import itertools
+import logging
+import threading
+import time
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from backend.app.config import Config
+from backend.app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+READ_CONCERNS = ("local", "available", "majority", "linearizable")
+# MongoDB 要求 maxStalenessSeconds 至少为 90 秒
+MONGO_MIN_STALENESS_SECONDS = 90
+
+# 只读端点及其访问的后端；未列出的端点视为写端点，始终访问主库
+READ_ENDPOINTS = {
+    "sqlserver.join_tables": ("sqlserver",),
+    "mongo.find": ("mongo",),
+    "mongo.aggregate": ("mongo",),  # 以 $out / $merge 写入的管道按写端点 mongo.aggregate_write 处理
+    "federated.join": ("sqlserver", "mongo"),
+}
+
+READ_ROUTES = registry.counter(
+    "db_read_routes_total",
+    "Routed reads: SQL Server by the node class that served them, MongoDB by requested read preference.",
+    ("backend", "target"),
+)
+REPLICA_LAG = registry.gauge(
+    "sqlserver_replica_lag_seconds", "Last measured replication lag of each read replica.", ("replica",)
+)
+
+
+class ReadRouting:
+    """
+    单个请求的读路由：读偏好（MongoDB 的五种模式，SQL Server 按相同语义选择主库或只读副本）、
+    可接受的最大复制延迟（秒）和 MongoDB 读关注级别。
+    """
+
+    def __init__(self, preference: str = "primary", max_staleness: float = None, read_concern: str = None):
+        self.preference = preference
+        self.max_staleness = max_staleness
+        self.read_concern = read_concern
+
+    @property
+    def is_primary(self) -> bool:
+        return self.preference == "primary"
+
+    def mongo_options(self) -> dict:
+        """
+        转换为 database.with_options / get_collection 的参数。
+        """
+        if self.is_primary:
+            options = {"read_preference": Primary()}
+        else:
+            max_staleness = -1 if self.max_staleness is None else int(self.max_staleness)
+            options = {"read_preference": READ_PREFERENCES[self.preference](max_staleness=max_staleness)}
+        if self.read_concern:
+            options["read_concern"] = ReadConcern(self.read_concern)
+        return options
+
+    def __repr__(self):
+        return (f"ReadRouting(preference={self.preference!r}, max_staleness={self.max_staleness!r}, "
+                f"read_concern={self.read_concern!r})")
+
+
+PRIMARY = ReadRouting()
+
+
+def resolve_routing(endpoint: str, preference: str = None, max_staleness: float = None,
+                    read_concern: str = None) -> ReadRouting:
+    """
+    根据端点分类、配置和请求覆盖值得到读路由。
+    默认读偏好为 Config.ENDPOINT_READ_PREFERENCE[endpoint]，其次为 Config.READ_PREFERENCE_DEFAULT；
+    写端点只能使用 primary。参数不合法时抛出 ValueError。
+    """
+    backends = READ_ENDPOINTS.get(endpoint)
+    if backends is None:
+        if preference not in (None, "primary") or max_staleness is not None:
+            raise ValueError(f"Endpoint '{endpoint}' writes data and must use the primary.")
+        return PRIMARY
+
+    preference = preference or Config.ENDPOINT_READ_PREFERENCE.get(endpoint, Config.READ_PREFERENCE_DEFAULT)
+    if preference not in READ_PREFERENCES:
+        raise ValueError(f"Unsupported read preference '{preference}', expected one of {list(READ_PREFERENCES)}.")
+    read_concern = read_concern or Config.READ_CONCERN_DEFAULT
+    if read_concern is not None and read_concern not in READ_CONCERNS:
+        raise ValueError(f"Unsupported read concern '{read_concern}', expected one of {list(READ_CONCERNS)}.")
+    if read_concern == "linearizable" and preference != "primary":
+        raise ValueError("Read concern 'linearizable' requires the primary read preference.")
+
+    if max_staleness is None:
+        max_staleness = Config.READ_MAX_STALENESS_SECONDS
+    if max_staleness is not None:
+        if max_staleness <= 0:
+            raise ValueError("max_staleness must be positive.")
+        if preference == "primary":
+            # 主库没有复制延迟
+            max_staleness = None
+        elif "mongo" in backends and max_staleness < MONGO_MIN_STALENESS_SECONDS:
+            raise ValueError(f"MongoDB requires max_staleness of at least {MONGO_MIN_STALENESS_SECONDS} seconds.")
+    return ReadRouting(preference, max_staleness, read_concern)
+
+
+class NoReadableReplicaError(Exception):
+    """读偏好为 secondary，但没有可用且复制延迟在允许范围内的只读副本。"""
+
+
+class _Replica:
+    def __init__(self, name: str, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None  # 最近一次测得的复制延迟（秒），None 表示无法获取延迟信息
+        self.healthy = False  # 第一次测量成功之前不参与路由
+        self.checked_at = None
+
+
+class ReadReplicas:
+    """
+    SQL Server 只读副本集合：每个副本一个连接池，后台线程定期测量复制延迟，按读路由在主库和副本之间选择。
+    请求路径只读取最近一次的测量结果，不会因为副本不可达而阻塞在连接超时上。
+
+    :param replicas: {名称: ConnectionPool}
+    :param lag_query: 在副本上执行、返回复制延迟秒数的语句（返回 NULL 表示延迟未知）
+    :param check_interval: 两次测量之间的间隔（秒）；测量失败的副本在下次测量成功前不参与路由
+    """
+
+    def __init__(self, replicas: dict, lag_query: str, check_interval: float):
+        self._replicas = [_Replica(name, pool) for name, pool in replicas.items()]
+        self.lag_query = lag_query
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __bool__(self):
+        return bool(self._replicas)
+
+    def start(self):
+        """
+        启动后台测量线程。
+        """
+        if self._replicas and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.check_all()
+            self._stopped.wait(self.check_interval)
+
+    def check_all(self):
+        """
+        立即测量所有副本（后台线程和启动预热时调用）。
+        """
+        for replica in self._replicas:
+            self._check(replica)
+
+    def _check(self, replica: _Replica):
+        try:
+            with replica.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.lag_query)
+                row = cursor.fetchone()
+            replica.lag = None if row is None or row[0] is None else float(row[0])
+            replica.healthy = True
+            if replica.lag is not None:
+                REPLICA_LAG.set(replica.lag, replica=replica.name)
+        except Exception as e:
+            logger.warning("Read replica %s is unavailable: %s", replica.name, e)
+            replica.healthy = False
+        replica.checked_at = time.monotonic()
+
+    def readable(self, max_staleness: float = None) -> list:
+        """
+        返回最近一次测量可用且复制延迟不超过 max_staleness 的副本连接池；
+        指定了 max_staleness 时，延迟未知的副本也被排除。
+        """
+        pools = []
+        for replica in self._replicas:
+            if not replica.healthy:
+                continue
+            if max_staleness is not None and (replica.lag is None or replica.lag > max_staleness):
+                continue
+            pools.append(replica.pool)
+        return pools
+
+    def choose(self, routing: ReadRouting, primary):
+        """
+        按读路由选择连接池：
+        - primary / primaryPreferred：主库
+        - secondary：满足延迟要求的副本，没有时抛出 NoReadableReplicaError
+        - secondaryPreferred：满足延迟要求的副本，没有时回退到主库
+        - nearest：主库和满足延迟要求的副本轮询
+        :return: (连接池, "primary" 或 "secondary")
+        """
+        if routing.preference in ("primary", "primaryPreferred"):
+            return primary, "primary"
+        candidates = self.readable(routing.max_staleness)
+        if routing.preference == "nearest":
+            candidates = [primary] + candidates
+        if not candidates:
+            if routing.preference == "secondary":
+                raise NoReadableReplicaError("No read replica is available within the requested staleness.")
+            return primary, "primary"
+        pool = candidates[next(self._counter) % len(candidates)]
+        return pool, "primary" if pool is primary else "secondary"
+
+    def close(self):
+        self._stopped.set()
+        for replica in self._replicas:
+            replica.pool.close()
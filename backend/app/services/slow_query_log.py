@@ -0,0 +1,181 @@
+# backend/app/services/slow_query_log.py
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from backend.app.config import Config
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$#@\]])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+
+def normalize_statement(sql: str) -> str:
+    """
+    规范化 SQL 文本：去掉注释，字符串和数字字面量替换为 ?，IN 列表折叠为 IN (?...)，合并空白。
+    只有字面量不同的语句得到相同结果。
+    """
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (?...)", text)
+    return " ".join(text.split()).rstrip(";").strip()
+
+
+def statement_fingerprint(backend: str, statement: str) -> str:
+    return hashlib.sha1(f"{backend}:{statement}".encode("utf-8")).hexdigest()[:16]
+
+
+class SlowQueryLog:
+    """
+    慢查询日志：超过阈值的语句以 JSON 行写入本地滚动文件（单文件超过 max_bytes 时轮转，保留 backup_count 份）。
+    同一指纹的执行计划每 plan_interval 秒最多采集一次，其余记录不带计划。
+    """
+
+    def __init__(self, path: str, threshold_ms: float = 500, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, plan_interval: float = 300):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.plan_interval = plan_interval
+        self._lock = threading.Lock()
+        self._logger = None
+        self._plan_captured_at = {}
+
+    def is_slow(self, duration_ms: float) -> bool:
+        return self.threshold_ms is not None and self.threshold_ms >= 0 and duration_ms >= self.threshold_ms
+
+    def should_capture_plan(self, fingerprint: str) -> bool:
+        """
+        判断是否需要为该指纹采集执行计划；返回 True 时同时占位，避免并发重复采集。
+        """
+        now = time.monotonic()
+        with self._lock:
+            captured_at = self._plan_captured_at.get(fingerprint)
+            if captured_at is not None and now - captured_at < self.plan_interval:
+                return False
+            if len(self._plan_captured_at) >= 10000:
+                self._plan_captured_at.clear()
+            self._plan_captured_at[fingerprint] = now
+            return True
+
+    def _get_logger(self) -> logging.Logger:
+        with self._lock:
+            if self._logger is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                handler = RotatingFileHandler(
+                    self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8", delay=True
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                # 独立的 Logger 实例，不受全局日志配置影响，也不向上传播
+                slow_logger = logging.Logger("slow_query_log", logging.INFO)
+                slow_logger.propagate = False
+                slow_logger.addHandler(handler)
+                self._logger = slow_logger
+            return self._logger
+
+    def record(self, backend: str, operation: str, statement: str, duration_ms: float, rows: int = None,
+               plan=None, plan_format: str = None, plan_error: str = None, fingerprint: str = None):
+        entry = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "backend": backend,
+            "operation": operation,
+            "fingerprint": fingerprint or statement_fingerprint(backend, statement),
+            "statement": statement,
+            "duration_ms": round(duration_ms, 3),
+            "rows": rows,
+        }
+        if plan is not None:
+            entry["plan"] = plan
+            entry["plan_format"] = plan_format
+        if plan_error:
+            entry["plan_error"] = plan_error
+        self._get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def entries(self):
+        """
+        按时间从旧到新读取全部记录（包括已轮转的文件），跳过无法解析的行。
+        """
+        paths = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)] + [self.path]
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                continue
+
+    def top(self, limit: int = 20, backend: str = None, include_plans: bool = True) -> list:
+        """
+        按指纹分组，返回总耗时最高的语句，附带次数、平均/最大耗时、行数和最近一次采集的执行计划。
+        """
+        groups = {}
+        for entry in self.entries():
+            if backend and entry.get("backend") != backend:
+                continue
+            group = groups.get(entry["fingerprint"])
+            if group is None:
+                group = groups[entry["fingerprint"]] = {
+                    "fingerprint": entry["fingerprint"],
+                    "backend": entry["backend"],
+                    "operations": set(),
+                    "statement": entry["statement"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "max_rows": None,
+                    "first_seen": entry["timestamp"],
+                    "last_seen": entry["timestamp"],
+                    "plan": None,
+                    "plan_format": None,
+                }
+            group["operations"].add(entry["operation"])
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            if entry.get("rows") is not None:
+                group["max_rows"] = max(group["max_rows"] or 0, entry["rows"])
+            group["last_seen"] = entry["timestamp"]
+            if entry.get("plan") is not None:
+                group["plan"] = entry["plan"]
+                group["plan_format"] = entry.get("plan_format")
+
+        result = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+        for group in result:
+            group["operations"] = sorted(group["operations"])
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+            group["total_ms"] = round(group["total_ms"], 3)
+            if not include_plans:
+                group.pop("plan")
+                group.pop("plan_format")
+        return result
+
+
+def worker_log_path(path: str) -> str:
+    """
+    多个工作进程时每个进程写自己的文件（文件名带 pid），RotatingFileHandler 不支持多进程写同一文件的轮转。
+    """
+    if Config.SERVER_WORKERS <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+# 全局慢查询日志（每个进程一份，诊断端点只汇总本进程的记录）
+slow_query_log = SlowQueryLog(
+    worker_log_path(Config.SLOW_QUERY_LOG_PATH),
+    threshold_ms=Config.SLOW_QUERY_THRESHOLD_MS,
+    max_bytes=Config.SLOW_QUERY_LOG_MAX_BYTES,
+    backup_count=Config.SLOW_QUERY_LOG_BACKUP_COUNT,
+    plan_interval=Config.SLOW_QUERY_PLAN_INTERVAL_SECONDS,
+)
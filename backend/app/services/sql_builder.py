@@ -0,0 +1,145 @@
+# backend/app/services/sql_builder.py
+import re
+from functools import lru_cache
+from backend.app.config import Config
+
+# ODBC 标准类型码 SQL_WVARCHAR（与 pyodbc.SQL_WVARCHAR 相同）
+SQL_WVARCHAR = -9
+
+# 合法标识符，允许 schema.table 形式
+_IDENTIFIER_PART_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_$#@]*$")
+
+# 结构化筛选支持的运算符 -> SQL 片段
+OPERATORS = {
+    "=": "=",
+    "!=": "<>",
+    "<>": "<>",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "like": "LIKE",
+    "not_like": "NOT LIKE",
+    "in": "IN",
+    "not_in": "NOT IN",
+    "between": "BETWEEN",
+    "is_null": "IS NULL",
+    "is_not_null": "IS NOT NULL",
+}
+_LIST_OPERATORS = {"in", "not_in"}
+_NULLARY_OPERATORS = {"is_null", "is_not_null"}
+
+
+def quote_identifier(name: str) -> str:
+    """
+    校验并用方括号引用标识符，例如 dbo.Orders -> [dbo].[Orders]。
+    """
+    parts = name.strip().split(".")
+    for part in parts:
+        if not _IDENTIFIER_PART_RE.match(part):
+            raise ValueError(f"Invalid identifier: '{name}'")
+    return ".".join(f"[{part}]" for part in parts)
+
+
+def _bucket_size(count: int) -> int:
+    """
+    IN 列表参数个数向上取整到 2 的幂，使不同长度的列表共享少量语句文本和执行计划。
+    """
+    size = 1
+    while size < count:
+        size *= 2
+    return size
+
+
+def build_filter_shape(filters: list):
+    """
+    将 [{"column", "op", "value"}] 拆分为只含结构的形状元组和参数列表。
+    形状不含任何字面值，相同形状的操作得到相同的语句文本。
+    :return: (shape, params)
+    """
+    shape = []
+    params = []
+    for condition in filters:
+        column = condition.get("column")
+        op = (condition.get("op") or "=").lower()
+        value = condition.get("value")
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}' for column '{column}'.")
+        quote_identifier(column)
+
+        if op in _NULLARY_OPERATORS:
+            shape.append((column, op, 0))
+        elif op in _LIST_OPERATORS:
+            if not isinstance(value, (list, tuple)) or not value:
+                raise ValueError(f"Operator '{op}' on column '{column}' requires a non-empty list value.")
+            values = list(value)
+            # 用最后一个值填充到桶大小，不改变 IN 的语义
+            values += [values[-1]] * (_bucket_size(len(values)) - len(values))
+            shape.append((column, op, len(values)))
+            params.extend(values)
+        elif op == "between":
+            if not isinstance(value, (list, tuple)) or len(value) != 2:
+                raise ValueError(f"Operator 'between' on column '{column}' requires a [low, high] value.")
+            shape.append((column, op, 2))
+            params.extend(value)
+        else:
+            shape.append((column, op, 1))
+            params.append(value)
+    return tuple(shape), params
+
+
+def _compile_where(shape: tuple) -> str:
+    clauses = []
+    for column, op, count in shape:
+        target = quote_identifier(column)
+        sql_op = OPERATORS[op]
+        if op in _NULLARY_OPERATORS:
+            clauses.append(f"{target} {sql_op}")
+        elif op in _LIST_OPERATORS:
+            clauses.append(f"{target} {sql_op} ({', '.join(['?'] * count)})")
+        elif op == "between":
+            clauses.append(f"{target} BETWEEN ? AND ?")
+        else:
+            clauses.append(f"{target} {sql_op} ?")
+    return " AND ".join(clauses)
+
+
+@lru_cache(maxsize=Config.SQL_STATEMENT_CACHE_SIZE)
+def compile_update(table_name: str, set_columns: tuple, filter_shape: tuple) -> str:
+    """
+    编译参数化 UPDATE 语句，结果按 (表, 更新列, 筛选形状) 缓存。
+    """
+    if not set_columns:
+        raise ValueError("At least one column must be updated.")
+    if not filter_shape:
+        raise ValueError("At least one filter condition is required.")
+    assignments = ", ".join(f"{quote_identifier(column)} = ?" for column in set_columns)
+    return f"UPDATE {quote_identifier(table_name)} SET {assignments} WHERE {_compile_where(filter_shape)}"
+
+
+@lru_cache(maxsize=Config.SQL_STATEMENT_CACHE_SIZE)
+def compile_delete(table_name: str, filter_shape: tuple) -> str:
+    """
+    编译参数化 DELETE 语句，结果按 (表, 筛选形状) 缓存。
+    """
+    if not filter_shape:
+        raise ValueError("At least one filter condition is required.")
+    return f"DELETE FROM {quote_identifier(table_name)} WHERE {_compile_where(filter_shape)}"
+
+
+def input_sizes(params: list) -> list:
+    """
+    为字符串参数声明固定的 NVARCHAR(4000) 类型，避免驱动按实际长度声明参数，
+    导致同一语句因参数长度不同生成多个计划。其他类型交给驱动推断（None）。
+    """
+    return [(SQL_WVARCHAR, 4000, 0) if isinstance(value, str) and len(value) <= 4000 else None
+            for value in params]
+
+
+def statement_cache_info() -> dict:
+    """
+    已编译语句缓存的命中统计。
+    """
+    info = {"update": compile_update.cache_info(), "delete": compile_delete.cache_info()}
+    return {name: {"hits": item.hits, "misses": item.misses, "size": item.currsize, "max_size": item.maxsize}
+            for name, item in info.items()}
@@ -1,95 +1,462 @@
 # backend/app/services/sql_server_service.py
-import pyodbc
+import functools
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from backend.app.config import Config
+from backend.app.services.connection_pool import ConnectionPool
+from backend.app.services.read_routing import ReadReplicas, READ_ROUTES, PRIMARY
+from backend.app.services.admission import cancellable, statement_timeout
+from backend.app.services.query_cache import query_cache, normalize_query, extract_tables
+from backend.app.services.sql_builder import build_filter_shape, compile_update, compile_delete, input_sizes
+from backend.app.services.catalog import schema_catalog
+from backend.app.services.metrics import (
+    instrument, observe_execution, registry, DB_ROWS, POOL_WAIT, POOL_CONNECTIONS
+)
+from backend.app.services.slow_query_log import slow_query_log, normalize_statement, statement_fingerprint
+from backend.app.services.streaming import (
+    query_fingerprint, encode_continuation_token, decode_continuation_token
+)
+
+logger = logging.getLogger(__name__)
+
+# 合法的 SQL 标识符（用于续页键列名）
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 慢语句中需要采集估计执行计划的操作（DDL 没有有意义的计划）
+_PLAN_OPERATIONS = {
+    "insert_data", "delete_data", "update_data", "update_rows", "delete_rows", "join_tables", "stream_join_tables",
+}
+# 在独立连接上采集执行计划，不占用请求线程
+_plan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="showplan")
 
 class SQLServerDatabaseManager:
-    _connection = None
+    _pool = None
+    _replicas = None
+    _lock = threading.Lock()
 
     @classmethod
+    def init_pool(cls):
+        """
+        创建全局连接池并预热 min_size 个连接。重复调用不会重复创建。
+        """
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = ConnectionPool(
+                    Config.get_sql_server_connection,
+                    min_size=Config.SQL_SERVER_POOL_MIN_SIZE,
+                    max_size=Config.SQL_SERVER_POOL_MAX_SIZE,
+                    timeout=Config.SQL_SERVER_POOL_TIMEOUT,
+                    validate_idle_seconds=Config.SQL_SERVER_POOL_VALIDATE_IDLE_SECONDS,
+                    on_acquire=lambda seconds: POOL_WAIT.observe(seconds, backend="sqlserver"),
+                )
+                cls._pool.open()
+            return cls._pool
+
+    @classmethod
+    def get_pool(cls):
+        """
+        获取全局连接池。如果不存在，则创建一个新连接池。
+        """
+        return cls._pool or cls.init_pool()
+
+    @classmethod
+    @contextmanager
     def get_connection(cls):
         """
-        获取全局数据库连接。如果不存在，则创建一个新连接。
+        从连接池借出一个连接，用法: with SQLServerDatabaseManager.get_connection() as conn。
+        退出 with 块时自动归还；块内出错会回滚，坏连接会被丢弃并在下次借出时补建。
+        借出时按当前请求的剩余时间设置查询超时（对之后创建的游标生效）。
+        """
+        with cls.get_pool().connection() as conn:
+            conn.timeout = statement_timeout()
+            yield conn
+
+    @classmethod
+    def get_replicas(cls) -> ReadReplicas:
+        """
+        获取只读副本集合（按 Config.SQL_SERVER_READ_REPLICAS 创建并启动后台延迟测量线程）。
+        """
+        with cls._lock:
+            if cls._replicas is None:
+                pools = {
+                    f"{host}:{port}": ConnectionPool(
+                        functools.partial(Config.get_sql_server_read_connection, host, port),
+                        min_size=0,
+                        max_size=Config.SQL_SERVER_READ_POOL_MAX_SIZE,
+                        timeout=Config.SQL_SERVER_POOL_TIMEOUT,
+                        validate_idle_seconds=Config.SQL_SERVER_POOL_VALIDATE_IDLE_SECONDS,
+                        on_acquire=lambda seconds: POOL_WAIT.observe(seconds, backend="sqlserver"),
+                    )
+                    for host, port in Config.SQL_SERVER_READ_REPLICAS
+                }
+                cls._replicas = ReadReplicas(
+                    pools, Config.SQL_SERVER_REPLICA_LAG_QUERY, Config.SQL_SERVER_REPLICA_CHECK_SECONDS
+                )
+                cls._replicas.start()
+            return cls._replicas
+
+    @classmethod
+    def choose_read_pool(cls, routing=None):
+        """
+        按读路由选择主库或只读副本的连接池。
+        :param routing: read_routing.ReadRouting，None 表示访问主库
+        :return: (连接池, "primary" 或 "secondary")
         """
-        if cls._connection is None:
-            cls._connection = pyodbc.connect(
-                driver=Config.SQL_SERVER_DRIVER,
-                server=Config.SQL_SERVER_HOST,
-                port=Config.SQL_SERVER_PORT,
-                database=Config.SQL_SERVER_DB,
-                user=Config.SQL_SERVER_USER,
-                password=Config.SQL_SERVER_PASSWORD
-            )
-        return cls._connection
+        routing = routing or PRIMARY
+        pool, target = cls.get_pool(), "primary"
+        if not routing.is_primary:
+            pool, target = cls.get_replicas().choose(routing, pool)
+        READ_ROUTES.inc(backend="sqlserver", target=target)
+        return pool, target
+
+    @classmethod
+    @contextmanager
+    def get_read_connection(cls, routing=None, pool=None):
+        """
+        按读路由借出主库或只读副本的连接，用法同 get_connection。只读查询使用，不能在其中写入。
+        :param routing: read_routing.ReadRouting，None 表示访问主库
+        :param pool: 已由 choose_read_pool 选定的连接池，提供时忽略 routing
+        """
+        if pool is None:
+            pool, _ = cls.choose_read_pool(routing)
+        with pool.connection() as conn:
+            conn.timeout = statement_timeout()
+            yield conn
 
     @classmethod
     def close_connection(cls):
         """
-        关闭全局数据库连接。
+        关闭全局连接池和只读副本连接池。
         """
-        if cls._connection:
-            cls._connection.close()
-            cls._connection = None
+        with cls._lock:
+            if cls._pool:
+                cls._pool.close()
+                cls._pool = None
+            if cls._replicas is not None:
+                cls._replicas.close()
+                cls._replicas = None
 
 
-def create_table(query: str):
+def _collect_pool_metrics():
+    pool = SQLServerDatabaseManager._pool
+    if pool is not None:
+        stats = pool.stats()
+        for state in ("idle", "in_use", "waiting"):
+            POOL_CONNECTIONS.set(stats[state], backend="sqlserver", state=state)
+
+
+registry.add_collect_hook(_collect_pool_metrics)
+
+
+def _capture_showplan(sql: str, params=None) -> str:
     """
-    创建表并打印连接的 SQL Server 实例和当前数据库。
+    在独立的新连接上获取语句的估计执行计划（SHOWPLAN XML），语句本身不会被执行。
+    不使用连接池，避免 SHOWPLAN 会话状态泄漏到池中的连接。
     """
+    conn = Config.get_sql_server_connection()
     try:
-        conn = SQLServerDatabaseManager.get_connection()
         cursor = conn.cursor()
+        cursor.execute("SET SHOWPLAN_XML ON")
+        try:
+            if params:
+                cursor.setinputsizes(input_sizes(params))
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            plans = []
+            while True:
+                plans.extend(row[0] for row in cursor.fetchall())
+                if not cursor.nextset():
+                    break
+            return "\n".join(plans)
+        finally:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+    finally:
+        conn.close()
+
+
+def _record_slow_statement(operation: str, sql: str, params, statement: str, fingerprint: str,
+                           duration_ms: float, rows):
+    plan, plan_error = None, None
+    try:
+        plan = _capture_showplan(sql, params)
+    except Exception as e:
+        plan_error = str(e)
+    slow_query_log.record("sqlserver", operation, statement, duration_ms, rows, plan=plan,
+                          plan_format="showplan_xml", plan_error=plan_error, fingerprint=fingerprint)
 
-        # 打印 SQL Server 实例的唯一标识符
-        cursor.execute("SELECT @@SERVERNAME AS ServerName;")
-        server_name = cursor.fetchone()
-        print("Connected to SQL Server instance:", server_name[0])
 
-        # 打印当前连接的数据库名称
-        cursor.execute("SELECT DB_NAME() AS CurrentDatabase;")
-        current_db = cursor.fetchone()
-        print("Connected to database:", current_db[0])
+def _log_slow_statement(operation: str, sql: str, params, seconds: float, rows):
+    """
+    超过阈值的语句写入慢查询日志；需要采集执行计划时交给后台线程，不阻塞当前请求。
+    """
+    duration_ms = seconds * 1000
+    if not slow_query_log.is_slow(duration_ms):
+        return
+    try:
+        statement = normalize_statement(sql)
+        fingerprint = statement_fingerprint("sqlserver", statement)
+        if (Config.SLOW_QUERY_CAPTURE_PLANS and operation in _PLAN_OPERATIONS
+                and slow_query_log.should_capture_plan(fingerprint)):
+            _plan_executor.submit(_record_slow_statement, operation, sql, params, statement, fingerprint,
+                                  duration_ms, rows)
+        else:
+            slow_query_log.record("sqlserver", operation, statement, duration_ms, rows, fingerprint=fingerprint)
+    except Exception as e:
+        logger.warning("Failed to record slow statement: %s", e)
 
-        # 执行创建表的 SQL 语句
-        cursor.execute(query)
-        conn.commit()
 
-        print(f"Table creation query executed successfully in database {current_db[0]} on server {server_name[0]}.")
-        return {
-            "status": "success",
-            "message": f"Table created successfully in database {current_db[0]} on server {server_name[0]}"
-        }
+def _execute(cursor, operation: str, sql: str, params=None, fetch: bool = False):
+    """
+    执行语句并记录执行耗时和行数（SELECT 的 rowcount 为 -1，不记录），超过阈值时写入慢查询日志。
+    语句文本只在 DEBUG 级别按 Config.SQL_LOG_SAMPLE_RATE 抽样记录，避免请求路径上的同步输出。
+    :param fetch: 为 True 时在计时内 fetchall 并返回结果行，否则返回游标
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < Config.SQL_LOG_SAMPLE_RATE:
+        logger.debug("Generated query (%s): %s params=%r", operation, sql, params)
+    started = time.perf_counter()
+    # 请求超时或客户端断开时取消正在执行的语句
+    with cancellable(cursor.cancel):
+        if params is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql, params)
+        results = cursor.fetchall() if fetch else None
+    seconds = time.perf_counter() - started
+    rows = len(results) if fetch else cursor.rowcount
+    rows = rows if rows >= 0 else None
+    observe_execution("sqlserver", operation, seconds, rows)
+    _log_slow_statement(operation, sql, params, seconds, rows)
+    return results if fetch else cursor
+
+
+def get_schema_catalog(force: bool = False):
+    """
+    返回 SQL Server 元数据缓存，未加载、已过期或 force=True 时重新加载。
+    """
+    if force or schema_catalog.sql_is_stale():
+        with schema_catalog.refresh_lock:
+            if force or schema_catalog.sql_is_stale():
+                with SQLServerDatabaseManager.get_connection() as conn:
+                    schema_catalog.load_sql(conn)
+    return schema_catalog
+
+
+def _coerce_rows(table_name: str, columns: list, rows: list) -> list:
+    """
+    按元数据缓存校验列名并转换每行的值，不需要额外的网络往返。
+    表不在缓存中（可能刚由其他进程创建），或列不在缓存中、类型转换失败（表结构可能已被 ALTER TABLE 修改）时，
+    最多每 CATALOG_MISS_REFRESH_SECONDS 秒重新加载一次并重试。
+    """
+    if not Config.CATALOG_VALIDATE_INSERTS or table_name.lstrip("[").startswith("#"):
+        return rows
+    catalog = get_schema_catalog()
+    table = catalog.get_table(table_name)
+    if table is not None:
+        try:
+            return [catalog.coerce_row(table, columns, row) for row in rows]
+        except ValueError:
+            if catalog.sql_age() <= Config.CATALOG_MISS_REFRESH_SECONDS:
+                raise
+    elif catalog.sql_age() <= Config.CATALOG_MISS_REFRESH_SECONDS:
+        raise ValueError(f"Table '{table_name}' does not exist.")
+    catalog = get_schema_catalog(force=True)
+    table = catalog.get_table(table_name)
+    if table is None:
+        raise ValueError(f"Table '{table_name}' does not exist.")
+    return [catalog.coerce_row(table, columns, row) for row in rows]
+
+
+@instrument("sqlserver")
+def create_table(query: str):
+    """
+    创建表并记录连接的 SQL Server 实例和当前数据库（来自元数据缓存）。
+    """
+    try:
+        catalog = get_schema_catalog()
+        server_name, current_db = catalog.server_name, catalog.database_name
+        logger.debug("Creating table on SQL Server instance %s, database %s", server_name, current_db)
+
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # 执行创建表的 SQL 语句
+            _execute(cursor, "create_table", query)
+            conn.commit()
+            schema_catalog.invalidate_sql()
+
+            return {
+                "status": "success",
+                "message": f"Table created successfully in database {current_db} on server {server_name}"
+            }
     except Exception as e:
-        print("Error during table creation:", e)
+        logger.error("Error during table creation: %s", e)
         return {"status": "error", "message": str(e)}
 
 
+@instrument("sqlserver")
 def insert_data(table_name: str, columns: list, values: list):
     """
     向指定表插入数据，不使用 dict 或键值对。
     """
     try:
-        conn = SQLServerDatabaseManager.get_connection()
-        cursor = conn.cursor()
+        if len(values) != len(columns):
+            return {"status": "error", "message": f"Got {len(values)} values for {len(columns)} columns."}
+        values = _coerce_rows(table_name, columns, [values])[0]
 
-        # 动态生成 SQL 插入语句
-        columns_str = ", ".join(columns)
-        placeholders = ", ".join(["?"] * len(values))
-        query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # 打印调试信息
-        print("Generated Query:", query)
-        print("Data Values (list):", values)
+            # 动态生成 SQL 插入语句
+            columns_str = ", ".join(columns)
+            placeholders = ", ".join(["?"] * len(values))
+            query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
 
-        # 执行插入语句
-        cursor.execute(query, values)
-        conn.commit()
+            # 执行插入语句
+            _execute(cursor, "insert_data", query, values)
+            conn.commit()
+            query_cache.invalidate_table(table_name)
 
-        return {"status": "success", "message": f"Data inserted into table '{table_name}' successfully."}
+            return {"status": "success", "message": f"Data inserted into table '{table_name}' successfully."}
     except Exception as e:
-        print("Error during data insertion:", e)
+        logger.error("Error during data insertion: %s", e)
         return {"status": "error", "message": str(e)}
 
 
+@instrument("sqlserver")
+def insert_data_batch(table_name: str, columns: list, rows: list) -> list:
+    """
+    将多个独立调用方的单行插入合并为一次 executemany 和一次提交（写合并使用）。
+    每行的结果相互独立：校验失败的行单独返回错误；整批执行失败时回滚并逐行重试，只有出错的行返回错误。
+    :param rows: 行列表，每行对应一个调用方
+    :return: 与 rows 一一对应的结果字典列表（格式与 insert_data 相同）
+    """
+    success = {"status": "success", "message": f"Data inserted into table '{table_name}' successfully."}
+    results = [None] * len(rows)
+    valid, positions = [], []
+    for index, values in enumerate(rows):
+        if len(values) != len(columns):
+            results[index] = {"status": "error", "message": f"Got {len(values)} values for {len(columns)} columns."}
+            continue
+        try:
+            valid.append(_coerce_rows(table_name, columns, [values])[0])
+            positions.append(index)
+        except Exception as e:
+            results[index] = {"status": "error", "message": str(e)}
+    if not valid:
+        return results
+
+    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    try:
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            try:
+                started = time.perf_counter()
+                cursor.executemany(query, valid)
+                conn.commit()
+                seconds = time.perf_counter() - started
+                observe_execution("sqlserver", "insert_data_batch", seconds, len(valid))
+                _log_slow_statement("insert_data_batch", query, None, seconds, len(valid))
+                for index in positions:
+                    results[index] = success
+            except Exception as e:
+                conn.rollback()
+                logger.warning("Coalesced insert into %s failed, retrying %d rows individually: %s",
+                               table_name, len(valid), e)
+                for index, values in zip(positions, valid):
+                    try:
+                        _execute(cursor, "insert_data", query, values)
+                        conn.commit()
+                        results[index] = success
+                    except Exception as row_error:
+                        conn.rollback()
+                        results[index] = {"status": "error", "message": str(row_error)}
+        query_cache.invalidate_table(table_name)
+    except Exception as e:
+        logger.error("Error during coalesced insertion: %s", e)
+        for index in positions:
+            if results[index] is None:
+                results[index] = {"status": "error", "message": str(e)}
+    return results
+
+
+@instrument("sqlserver")
+def bulk_insert_data(table_name: str, columns: list, rows: list, chunk_size: int = None):
+    """
+    向指定表批量插入多行数据。所有块在同一个事务中通过 fast_executemany 写入，
+    任一块失败则整体回滚。
+    :param table_name: 表名
+    :param columns: 字段名列表
+    :param rows: 行列表，每行是与 columns 顺序一致的字段值列表
+    :param chunk_size: 每块行数，默认使用 Config.SQL_SERVER_BULK_CHUNK_SIZE
+    """
+    chunk_size = chunk_size or Config.SQL_SERVER_BULK_CHUNK_SIZE
+    chunks = []
+    try:
+        if not rows:
+            return {"status": "error", "message": "No rows to insert."}
+        for index, row in enumerate(rows):
+            if len(row) != len(columns):
+                return {
+                    "status": "error",
+                    "message": f"Row {index} has {len(row)} values, expected {len(columns)}.",
+                }
+        # 转换后同一列的值类型一致，fast_executemany 无需中途重新绑定参数
+        rows = _coerce_rows(table_name, columns, rows)
+
+        columns_str = ", ".join(columns)
+        placeholders = ", ".join(["?"] * len(columns))
+        query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            # 参数数组一次性发送，避免逐行往返
+            cursor.fast_executemany = True
+
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                chunk_result = {"chunk": len(chunks), "start_row": start, "row_count": len(chunk)}
+                chunks.append(chunk_result)
+                try:
+                    started = time.perf_counter()
+                    cursor.executemany(query, chunk)
+                    seconds = time.perf_counter() - started
+                    observe_execution("sqlserver", "bulk_insert_data", seconds, len(chunk))
+                    _log_slow_statement("bulk_insert_data", query, None, seconds, len(chunk))
+                except Exception as e:
+                    conn.rollback()
+                    for previous in chunks[:-1]:
+                        previous["status"] = "rolled_back"
+                    chunk_result.update({"status": "error", "message": str(e)})
+                    return {
+                        "status": "error",
+                        "message": f"Bulk insert into table '{table_name}' failed at chunk {chunk_result['chunk']}, "
+                                   f"transaction rolled back: {e}",
+                        "chunks": chunks,
+                    }
+                chunk_result["status"] = "success"
+
+            conn.commit()
+            query_cache.invalidate_table(table_name)
+
+        return {
+            "status": "success",
+            "message": f"{len(rows)} rows inserted into table '{table_name}' successfully.",
+            "inserted_count": len(rows),
+            "chunks": chunks,
+        }
+    except Exception as e:
+        logger.error("Error during bulk insertion: %s", e)
+        return {"status": "error", "message": str(e), "chunks": chunks}
+
+
+@instrument("sqlserver")
 def delete_data(table_name: str, condition: str):
     """
     删除指定表中满足条件的数据。
@@ -97,24 +464,23 @@ def delete_data(table_name: str, condition: str):
     :param condition: 删除条件（WHERE 子句）
     """
     try:
-        conn = SQLServerDatabaseManager.get_connection()
-        cursor = conn.cursor()
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # 动态生成 DELETE SQL 语句
-        query = f"DELETE FROM {table_name} WHERE {condition}"
+            # 动态生成 DELETE SQL 语句
+            query = f"DELETE FROM {table_name} WHERE {condition}"
 
-        # 打印调试信息
-        print("Generated Query:", query)
+            # 执行删除操作
+            _execute(cursor, "delete_data", query)
+            conn.commit()
+            query_cache.invalidate_table(table_name)
 
-        # 执行删除操作
-        cursor.execute(query)
-        conn.commit()
-
-        return {"status": "success", "message": f"Data deleted from table '{table_name}' successfully."}
+            return {"status": "success", "message": f"Data deleted from table '{table_name}' successfully."}
     except Exception as e:
-        print("Error during data deletion:", e)
+        logger.error("Error during data deletion: %s", e)
         return {"status": "error", "message": str(e)}
 
+@instrument("sqlserver")
 def update_data(table_name: str, condition: str, updates: list):
     """
     更新指定表中的数据。
@@ -124,76 +490,331 @@ def update_data(table_name: str, condition: str, updates: list):
     """
     try:
         # 获取数据库连接
-        conn = SQLServerDatabaseManager.get_connection()
-        cursor = conn.cursor()
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # 动态生成 SQL 更新语句
+            updates_str = ", ".join(updates)
+            query = f"UPDATE {table_name} SET {updates_str} WHERE {condition}"
+
+            # 执行更新操作
+            _execute(cursor, "update_data", query)
+            conn.commit()
+            query_cache.invalidate_table(table_name)
+
+            return {"status": "success", "message": f"Data in table '{table_name}' updated successfully."}
+    except Exception as e:
+        logger.error("Error during data update: %s", e)
+        return {"status": "error", "message": str(e)}
+
+@instrument("sqlserver")
+def update_rows(table_name: str, updates: dict, filters: list):
+    """
+    使用结构化条件更新数据，生成参数化语句，相同结构的操作复用同一语句文本和执行计划。
+    :param table_name: 表名
+    :param updates: 更新字段和值，例如 {"price": 10.5, "status": "done"}
+    :param filters: 筛选条件列表，例如 [{"column": "id", "op": "in", "value": [1, 2]}]，条件之间为 AND
+    """
+    try:
+        if not updates:
+            return {"status": "error", "message": "No columns to update."}
+        if not filters:
+            return {"status": "error", "message": "At least one filter condition is required."}
+
+        set_columns = tuple(updates.keys())
+        filter_shape, filter_params = build_filter_shape(filters)
+        query = compile_update(table_name, set_columns, filter_shape)
+        params = [updates[column] for column in set_columns] + filter_params
+
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.setinputsizes(input_sizes(params))
+            _execute(cursor, "update_rows", query, params)
+            affected = cursor.rowcount
+            conn.commit()
+            query_cache.invalidate_table(table_name)
 
-        # 动态生成 SQL 更新语句
-        updates_str = ", ".join(updates)
-        query = f"UPDATE {table_name} SET {updates_str} WHERE {condition}"
+        return {
+            "status": "success",
+            "message": f"Data in table '{table_name}' updated successfully.",
+            "affected_rows": affected,
+        }
+    except Exception as e:
+        logger.error("Error during structured update: %s", e)
+        return {"status": "error", "message": str(e)}
+
+@instrument("sqlserver")
+def delete_rows(table_name: str, filters: list):
+    """
+    使用结构化条件删除数据，生成参数化语句。
+    :param table_name: 表名
+    :param filters: 筛选条件列表，条件之间为 AND
+    """
+    try:
+        if not filters:
+            return {"status": "error", "message": "At least one filter condition is required."}
 
-        # 打印调试信息
-        print("Generated Query:", query)
+        filter_shape, params = build_filter_shape(filters)
+        query = compile_delete(table_name, filter_shape)
 
-        # 执行更新操作
-        cursor.execute(query)
-        conn.commit()
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.setinputsizes(input_sizes(params))
+            _execute(cursor, "delete_rows", query, params)
+            affected = cursor.rowcount
+            conn.commit()
+            query_cache.invalidate_table(table_name)
 
-        return {"status": "success", "message": f"Data in table '{table_name}' updated successfully."}
+        return {
+            "status": "success",
+            "message": f"Data deleted from table '{table_name}' successfully.",
+            "affected_rows": affected,
+        }
     except Exception as e:
-        print("Error during data update:", e)
+        logger.error("Error during structured deletion: %s", e)
         return {"status": "error", "message": str(e)}
 
+@instrument("sqlserver")
 def delete_table(table_name: str):
     """
     删除指定数据表。
     """
     try:
-        conn = SQLServerDatabaseManager.get_connection()
-        cursor = conn.cursor()
+        with SQLServerDatabaseManager.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # 动态生成删除表的 SQL 语句
-        query = f"DROP TABLE {table_name}"
+            # 动态生成删除表的 SQL 语句
+            query = f"DROP TABLE {table_name}"
 
-        # 打印调试信息
-        print("Generated Query:", query)
+            # 执行删除表的操作
+            _execute(cursor, "delete_table", query)
+            conn.commit()
+            schema_catalog.invalidate_sql()
+            query_cache.invalidate_table(table_name)
 
-        # 执行删除表的操作
-        cursor.execute(query)
-        conn.commit()
-
-        return {"status": "success", "message": f"Table '{table_name}' deleted successfully."}
+            return {"status": "success", "message": f"Table '{table_name}' deleted successfully."}
     except Exception as e:
-        print("Error during table deletion:", e)
+        logger.error("Error during table deletion: %s", e)
         return {"status": "error", "message": str(e)}
 
-def join_tables(query: str):
+class KeysetPage:
+    """
+    基于键列的分页状态：记录本页最后一行的键值，并生成下一页的续页令牌。
+    """
+
+    def __init__(self, query: str, key_column: str, page_size: int):
+        self.query = query
+        self.key_column = key_column
+        self.page_size = page_size
+        self.row_count = 0
+        self.last_key = None
+        self._key_index = None
+
+    def observe(self, columns: list, rows: list):
+        if not rows:
+            return
+        if self._key_index is None:
+            self._key_index = columns.index(self.key_column)
+        self.row_count += len(rows)
+        self.last_key = rows[-1][self._key_index]
+
+    @property
+    def continuation_token(self):
+        """
+        本页已满时返回下一页令牌，否则返回 None 表示没有更多数据。
+        """
+        if self.row_count < self.page_size:
+            return None
+        return encode_continuation_token({
+            "q": query_fingerprint(self.query),
+            "k": self.key_column,
+            "v": self.last_key,
+        })
+
+
+def _prepare_join_query(query: str, key_column: str = None, page_size: int = None,
+                        continuation_token: str = None):
+    """
+    生成实际执行的语句和参数。提供 page_size 时把原查询包装为按 key_column 排序的键集分页查询：
+    SELECT TOP (n) * FROM (原查询) AS keyset_page WHERE key > ? ORDER BY key
+    原查询中不能包含 ORDER BY，且 key_column 必须在结果中唯一。
+    :return: (sql, params, KeysetPage 或 None)
+    """
+    if continuation_token is not None:
+        token = decode_continuation_token(continuation_token)
+        if token.get("q") != query_fingerprint(query):
+            raise ValueError("Continuation token does not belong to this query.")
+        if key_column is not None and key_column != token.get("k"):
+            raise ValueError("Continuation token was issued for a different key column.")
+        key_column = token.get("k")
+        if page_size is None:
+            raise ValueError("page_size is required when a continuation token is given.")
+
+    if page_size is None:
+        return query, [], None
+    if not key_column or not _IDENTIFIER_RE.match(key_column):
+        raise ValueError("A valid key_column is required for keyset pagination.")
+    if page_size <= 0:
+        raise ValueError("page_size must be positive.")
+
+    inner = query.strip().rstrip(";")
+    sql = f"SELECT TOP ({int(page_size)}) * FROM ({inner}) AS keyset_page"
+    params = []
+    if continuation_token is not None:
+        sql += f" WHERE [{key_column}] > ?"
+        params.append(token.get("v"))
+    sql += f" ORDER BY [{key_column}]"
+    return sql, params, KeysetPage(query, key_column, page_size)
+
+
+@instrument("sqlserver")
+def join_tables(query: str, key_column: str = None, page_size: int = None, continuation_token: str = None,
+                use_cache: bool = True, store_cache: bool = True, max_age: float = None, routing=None):
     """
     执行跨表 JOIN 查询。
     :param query: 完整的 SQL 查询语句（如 JOIN 操作）。
+    :param key_column: 键集分页使用的唯一键列（可选）
+    :param page_size: 每页行数，提供时启用键集分页并返回 continuation_token
+    :param continuation_token: 上一页返回的续页令牌
+    :param use_cache: 是否读取查询结果缓存
+    :param store_cache: 是否把本次结果写入缓存
+    :param max_age: 可接受的缓存最大年龄（秒）
+    :param routing: 读路由（read_routing.ReadRouting），None 表示访问主库
+    :return: 操作结果字典，cache 字段为 hit / miss / bypass
+
+    只缓存主库读到的结果：副本上的结果可能早于刚提交的写入，写入后按新版本号缓存会一直返回旧数据。
+    有界延迟（max_staleness）的读取不接受比 max_staleness 更旧的缓存项。
     """
     try:
-        conn = SQLServerDatabaseManager.get_connection()
-        cursor = conn.cursor()
+        sql, params, page = _prepare_join_query(query, key_column, page_size, continuation_token)
 
-        # 打印调试信息
-        print("Generated Query:", query)
+        routing = routing or PRIMARY
+        cache_key = (normalize_query(query), key_column, page_size, continuation_token)
+        tables = extract_tables(query)
+        if not routing.is_primary and routing.max_staleness is not None:
+            max_age = routing.max_staleness if max_age is None else min(max_age, routing.max_staleness)
+        if use_cache and Config.QUERY_CACHE_ENABLED:
+            cached, _ = query_cache.get(cache_key, max_age)
+            if cached is not None:
+                return {**cached, "cache": "hit"}
+        snapshot = query_cache.snapshot(tables)
 
-        # 执行查询
-        cursor.execute(query)
-        results = cursor.fetchall()
+        pool, target = SQLServerDatabaseManager.choose_read_pool(routing)
+        with SQLServerDatabaseManager.get_read_connection(pool=pool) as conn:
+            cursor = conn.cursor()
 
-        # 获取列名
-        columns = [column[0] for column in cursor.description]
+            # 执行查询
+            results = _execute(cursor, "join_tables", sql, params, fetch=True)
+
+            # 获取列名
+            columns = [column[0] for column in cursor.description]
 
         # 将结果转换为字典格式
         result_data = [dict(zip(columns, row)) for row in results]
 
-        return {"status": "success", "data": result_data}
+        response = {"status": "success", "data": result_data}
+        if page is not None:
+            page.observe(columns, results)
+            response["continuation_token"] = page.continuation_token
+
+        cache_status = "bypass"
+        if store_cache and Config.QUERY_CACHE_ENABLED and target == "primary":
+            query_cache.put(cache_key, response, tables, snapshot, row_count=len(results))
+            cache_status = "miss" if use_cache else "bypass"
+        return {**response, "cache": cache_status}
     except Exception as e:
-        print("Error during JOIN operation:", e)
+        logger.error("Error during JOIN operation: %s", e)
         return {"status": "error", "message": str(e)}
 
 
+@instrument("sqlserver")
+class RowBatches:
+    """
+    流式查询的行批次迭代器，持有借出的连接、游标和请求取消登记。
+    迭代结束、读取出错或调用 close() 时释放；没有迭代或没有读完就放弃结果时必须调用 close()
+    （与生成器不同，未开始迭代时 close() 同样会归还连接）。
+    """
 
+    def __init__(self, stack: ExitStack, cursor, columns: list, batch_size: int, page=None):
+        self._stack = stack
+        self._cursor = cursor
+        self._columns = columns
+        self._batch_size = batch_size
+        self._page = page
+        self.row_count = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        try:
+            rows = self._cursor.fetchmany(self._batch_size)
+        except BaseException as e:
+            self._release(e)
+            raise
+        if not rows:
+            DB_ROWS.observe(self.row_count, backend="sqlserver", operation="stream_join_tables")
+            self.close()
+            raise StopIteration
+        self.row_count += len(rows)
+        if self._page is not None:
+            self._page.observe(self._columns, rows)
+        return rows
+
+    def close(self):
+        self._release(None)
+
+    def _release(self, error):
+        if self.closed:
+            return
+        self.closed = True
+        if error is None:
+            self._stack.close()
+        else:
+            # 读取出错时回滚，连接按坏连接处理
+            self._stack.__exit__(type(error), error, error.__traceback__)
+
+    def __del__(self):
+        # 调用方遗漏 close() 时的兜底，避免连接一直不归还
+        self.close()
+
+
+def stream_join_tables(query: str, batch_size: int = None, key_column: str = None, page_size: int = None,
+                       continuation_token: str = None, routing=None):
+    """
+    以流式方式执行跨表 JOIN 查询，结果按 fetchmany 分批读取，内存占用与结果集大小无关。
+    :param batch_size: 每批行数，默认使用 Config.SQL_SERVER_FETCH_BATCH_SIZE
+    :param routing: 读路由（read_routing.ReadRouting），None 表示访问主库
+    :return: 成功时为 {"status": "success", "columns": 列名列表, "description": cursor.description,
+             "batches": RowBatches, "page": KeysetPage 或 None}。
+             读完 batches 或调用 batches.close() 时归还连接。
+    """
+    batch_size = batch_size or Config.SQL_SERVER_FETCH_BATCH_SIZE
+    stack = ExitStack()
+    try:
+        sql, params, page = _prepare_join_query(query, key_column, page_size, continuation_token)
+
+        conn = stack.enter_context(SQLServerDatabaseManager.get_read_connection(routing))
+        cursor = conn.cursor()
+        stack.callback(cursor.close)
+        # 逐批读取期间客户端断开也取消语句
+        stack.enter_context(cancellable(cursor.cancel))
 
+        # 先执行查询，确保语句错误在开始输出响应之前就能返回
+        _execute(cursor, "stream_join_tables", sql, params)
+        columns = [column[0] for column in cursor.description]
+    except Exception as e:
+        stack.__exit__(type(e), e, e.__traceback__)
+        logger.error("Error during streaming JOIN operation: %s", e)
+        return {"status": "error", "message": str(e)}
 
+    return {
+        "status": "success",
+        "columns": columns,
+        "description": cursor.description,
+        "batches": RowBatches(stack, cursor, columns, batch_size, page),
+        "page": page,
+    }
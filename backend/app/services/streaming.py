@@ -0,0 +1,91 @@
+# backend/app/services/streaming.py
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import uuid
+
+
+def json_default(value):
+    """
+    json.dumps 的 default 回调，处理数据库驱动返回的非 JSON 原生类型。
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> str:
+    return json.dumps(obj, default=json_default, ensure_ascii=False)
+
+
+def query_fingerprint(query: str) -> str:
+    """
+    查询文本的短指纹（忽略空白差异），用于校验续页令牌是否属于同一查询。
+    """
+    normalized = " ".join(query.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_continuation_token(payload: dict, dumps_func=None) -> str:
+    """
+    将续页状态编码为不透明的 URL 安全令牌。
+    :param dumps_func: 自定义序列化函数（如 bson.json_util.dumps，保留 ObjectId 等类型），默认使用 dumps
+    """
+    raw = (dumps_func or dumps)(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_continuation_token(token: str, loads_func=None) -> dict:
+    """
+    解码续页令牌，格式不合法时抛出 ValueError。
+    :param loads_func: 与编码时对应的反序列化函数，默认使用 json.loads
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = (loads_func or json.loads)(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid continuation token.")
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid continuation token.")
+    return payload
+
+
+def iter_ndjson(columns: list, batches, trailer=None):
+    """
+    将逐批产出的行编码为 NDJSON，每行一个 JSON 对象。
+    :param trailer: 可选的无参回调，在所有行输出后调用，返回值（非 None 时）作为最后一行输出
+    """
+    for rows in batches:
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows)
+    if trailer is not None:
+        extra = trailer()
+        if extra is not None:
+            yield dumps(extra) + "\n"
+
+
+def iter_json_document(columns: list, batches, trailer=None):
+    """
+    将逐批产出的行编码为分块输出的 JSON 文档: {"status": "success", "data": [...], ...}。
+    :param trailer: 可选的无参回调，返回的字典字段追加在 data 之后
+    """
+    yield '{"status": "success", "data": ['
+    first = True
+    for rows in batches:
+        encoded = ", ".join(dumps(dict(zip(columns, row))) for row in rows)
+        if not encoded:
+            continue
+        yield encoded if first else ", " + encoded
+        first = False
+    yield "]"
+    extra = trailer() if trailer is not None else None
+    for key, value in (extra or {}).items():
+        yield f", {dumps(key)}: {dumps(value)}"
+    yield "}\n"
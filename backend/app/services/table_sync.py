@@ -0,0 +1,418 @@
+# backend/app/services/table_sync.py
+import datetime
+import decimal
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from bson import Decimal128
+from pymongo import ReplaceOne, DeleteOne
+from backend.app.config import Config
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, _execute
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.sql_builder import quote_identifier
+from backend.app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MODES = ("change_tracking", "rowversion")
+# 每个同步写入的文档上记录的同步时间字段，全量重同步后据此删除源表中已不存在的文档
+SYNCED_AT_FIELD = "_synced_at"
+_NAME_RE = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+SYNC_LAG = registry.gauge(
+    "table_sync_lag_seconds", "Seconds since the source state last fully reflected in MongoDB.", ("sync",),
+)
+SYNC_PENDING_VERSIONS = registry.gauge(
+    "table_sync_pending_versions", "Change tracking versions behind the source at the start of the last run.",
+    ("sync",),
+)
+SYNC_ROWS = registry.counter("table_sync_rows_total", "Rows applied to MongoDB by the sync worker.", ("sync", "op"))
+SYNC_RUNS = registry.counter("table_sync_runs_total", "Sync runs by outcome.", ("sync", "status"))
+
+
+def _to_bson(value):
+    """
+    将 pyodbc 返回的值转换为 BSON 可编码的类型。
+    """
+    if isinstance(value, decimal.Decimal):
+        return Decimal128(value)
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, datetime.time):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return value
+
+
+class SyncStore:
+    """
+    同步定义和检查点的本地持久化：每个同步一个 JSON 文件，先写临时文件再原子替换。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid sync name '{name}'.")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, name: str) -> dict:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(self, state: dict):
+        path = self._path(state["name"])
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(state, file, ensure_ascii=False, default=str)
+            os.replace(temp_path, path)
+
+    def delete(self, name: str) -> bool:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def list(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            self.get(entry[:-len(".json")]) for entry in sorted(os.listdir(self.directory)) if entry.endswith(".json")
+        ]
+
+
+sync_store = SyncStore(Config.SYNC_STATE_DIR)
+# 同一个同步不能并发运行（后台线程和手动触发）
+_sync_locks = {}
+_sync_locks_guard = threading.Lock()
+
+
+def _sync_lock(name: str) -> threading.Lock:
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(name, threading.Lock())
+
+
+def _document_id(row: dict, key_columns: list):
+    if len(key_columns) == 1:
+        return _to_bson(row[key_columns[0]])
+    return {column: _to_bson(row[column]) for column in key_columns}
+
+
+def _upsert(row: dict, key_columns: list, skip: set, synced_at: datetime.datetime) -> ReplaceOne:
+    document = {column: _to_bson(value) for column, value in row.items() if column not in skip}
+    document["_id"] = _document_id(row, key_columns)
+    document[SYNCED_AT_FIELD] = synced_at
+    return ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+
+
+def _apply(collection, name: str, requests: list) -> dict:
+    """
+    以一次无序 bulk_write 应用一批变更（每个主键在一批中最多出现一次，顺序无关）。
+    任何写错误都抛出异常，检查点不会前移。
+    """
+    if not requests:
+        return {"upserted": 0, "deleted": 0}
+    result = collection.bulk_write(requests, ordered=False)
+    counts = {"upserted": result.upserted_count + result.matched_count, "deleted": result.deleted_count}
+    SYNC_ROWS.inc(counts["upserted"], sync=name, op="upsert")
+    SYNC_ROWS.inc(counts["deleted"], sync=name, op="delete")
+    return counts
+
+
+def _rows(cursor, batch_size: int):
+    columns = [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield [dict(zip(columns, row)) for row in rows]
+
+
+def _full_load(cursor, collection, state: dict, synced_at: datetime.datetime) -> dict:
+    """
+    全量加载整张表并删除本次没有写到的旧文档。只在首次同步或变更跟踪版本过期时执行。
+    """
+    totals = {"upserted": 0, "deleted": 0}
+    _execute(cursor, "table_sync", f"SELECT * FROM {quote_identifier(state['table_name'])}")
+    for rows in _rows(cursor, state["batch_size"]):
+        requests = [_upsert(row, state["key_columns"], set(), synced_at) for row in rows]
+        counts = _apply(collection, state["name"], requests)
+        totals["upserted"] += counts["upserted"]
+    pruned = collection.delete_many({SYNCED_AT_FIELD: {"$lt": synced_at}}).deleted_count
+    totals["deleted"] += pruned
+    SYNC_ROWS.inc(pruned, sync=state["name"], op="delete")
+    return totals
+
+
+def _sync_change_tracking(cursor, collection, state: dict, synced_at: datetime.datetime) -> dict:
+    """
+    基于 SQL Server 变更跟踪：读取 CHANGETABLE(CHANGES ...) 中检查点版本之后的净变更，
+    与源表 LEFT JOIN 取当前行，删除的行只有主键。
+    """
+    table = quote_identifier(state["table_name"])
+    key_columns = state["key_columns"]
+    row = _execute(cursor, "table_sync",
+                   "SELECT CHANGE_TRACKING_CURRENT_VERSION(), CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?))",
+                   [state["table_name"]], fetch=True)[0]
+    current_version, min_valid_version = row[0], row[1]
+    if current_version is None or min_valid_version is None:
+        raise ValueError(f"Change tracking is not enabled for table '{state['table_name']}'.")
+
+    checkpoint = (state.get("checkpoint") or {}).get("version")
+    if checkpoint is None or checkpoint < min_valid_version:
+        # 没有检查点或检查点已早于保留期：先记下当前版本再全量加载，之间的变更会在下一轮重复应用（幂等）
+        logger.info("Sync %s: full load at change tracking version %s", state["name"], current_version)
+        totals = _full_load(cursor, collection, state, synced_at)
+        SYNC_PENDING_VERSIONS.set(0, sync=state["name"])
+        return {**totals, "full_load": True, "checkpoint": {"version": current_version}}
+
+    SYNC_PENDING_VERSIONS.set(current_version - checkpoint, sync=state["name"])
+    key_aliases = [f"__sync_key_{index}" for index in range(len(key_columns))]
+    select_keys = ", ".join(
+        f"CT.{quote_identifier(column)} AS [{alias}]" for column, alias in zip(key_columns, key_aliases)
+    )
+    join_on = " AND ".join(f"T.{quote_identifier(column)} = CT.{quote_identifier(column)}" for column in key_columns)
+    sql = (
+        f"SELECT CT.SYS_CHANGE_OPERATION AS [__sync_operation], {select_keys}, T.* "
+        f"FROM CHANGETABLE(CHANGES {table}, ?) AS CT "
+        f"LEFT OUTER JOIN {table} AS T ON {join_on} "
+        f"WHERE CT.SYS_CHANGE_VERSION <= ?"
+    )
+    _execute(cursor, "table_sync", sql, [checkpoint, current_version])
+    skip = {"__sync_operation", *key_aliases}
+    totals = {"upserted": 0, "deleted": 0}
+    for rows in _rows(cursor, state["batch_size"]):
+        requests = []
+        for change in rows:
+            keys = {column: change[alias] for column, alias in zip(key_columns, key_aliases)}
+            if change["__sync_operation"] == "D" or change.get(key_columns[0]) is None:
+                requests.append(DeleteOne({"_id": _document_id(keys, key_columns)}))
+            else:
+                requests.append(_upsert(change, key_columns, skip, synced_at))
+        counts = _apply(collection, state["name"], requests)
+        totals["upserted"] += counts["upserted"]
+        totals["deleted"] += counts["deleted"]
+    return {**totals, "full_load": False, "checkpoint": {"version": current_version}}
+
+
+def _sync_rowversion(cursor, collection, state: dict, synced_at: datetime.datetime) -> dict:
+    """
+    基于 rowversion 高水位：按 rowversion 顺序分批读取大于检查点的行，每批应用后推进检查点。
+    只读取小于 MIN_ACTIVE_ROWVERSION() 的行，避免跳过尚未提交的事务。
+    rowversion 无法感知物理删除；配置 deleted_column 时该列为真的行（软删除）会从 MongoDB 中删除。
+    """
+    table = quote_identifier(state["table_name"])
+    column = quote_identifier(state["rowversion_column"])
+    deleted_column = state.get("deleted_column")
+    skip = {state["rowversion_column"]}
+    checkpoint = (state.get("checkpoint") or {}).get("rowversion")
+    full_load = checkpoint is None
+    last = bytes.fromhex(checkpoint) if checkpoint else bytes(8)
+    sql = (
+        f"SELECT TOP ({int(state['batch_size'])}) * FROM {table} "
+        f"WHERE {column} > ? AND {column} < MIN_ACTIVE_ROWVERSION() ORDER BY {column}"
+    )
+    totals = {"upserted": 0, "deleted": 0}
+    while True:
+        rows = next(_rows(_execute(cursor, "table_sync", sql, [last]), state["batch_size"]), [])
+        if not rows:
+            break
+        requests = []
+        for row in rows:
+            if deleted_column and row.get(deleted_column):
+                requests.append(DeleteOne({"_id": _document_id(row, state["key_columns"])}))
+            else:
+                requests.append(_upsert(row, state["key_columns"], skip, synced_at))
+        counts = _apply(collection, state["name"], requests)
+        totals["upserted"] += counts["upserted"]
+        totals["deleted"] += counts["deleted"]
+        last = bytes(rows[-1][state["rowversion_column"]])
+        state["checkpoint"] = {"rowversion": last.hex()}
+        sync_store.save(state)
+        if len(rows) < state["batch_size"]:
+            break
+    if full_load:
+        pruned = collection.delete_many({SYNCED_AT_FIELD: {"$lt": synced_at}}).deleted_count
+        totals["deleted"] += pruned
+        SYNC_ROWS.inc(pruned, sync=state["name"], op="delete")
+    return {**totals, "full_load": full_load, "checkpoint": {"rowversion": last.hex()}}
+
+
+def define_sync(name: str, table_name: str, collection_name: str, key_columns: list, mode: str = "change_tracking",
+                rowversion_column: str = None, deleted_column: str = None, interval_seconds: float = None,
+                batch_size: int = None, enabled: bool = True) -> dict:
+    """
+    新建或修改同步定义。修改表、集合、键列或模式会清除检查点（下一轮全量加载）。
+    """
+    try:
+        if mode not in MODES:
+            raise ValueError(f"Unsupported sync mode '{mode}'.")
+        if mode == "rowversion" and not rowversion_column:
+            raise ValueError("rowversion_column is required for rowversion mode.")
+        if not key_columns:
+            raise ValueError("key_columns must not be empty.")
+        for identifier in [table_name, *key_columns] + [c for c in (rowversion_column, deleted_column) if c]:
+            quote_identifier(identifier)
+
+        previous = sync_store.get(name) or {}
+        state = {
+            "name": name,
+            "table_name": table_name,
+            "collection_name": collection_name,
+            "key_columns": list(key_columns),
+            "mode": mode,
+            "rowversion_column": rowversion_column,
+            "deleted_column": deleted_column,
+            "interval_seconds": interval_seconds or Config.SYNC_DEFAULT_INTERVAL_SECONDS,
+            "batch_size": batch_size or Config.SYNC_BATCH_SIZE,
+            "enabled": enabled,
+            "checkpoint": previous.get("checkpoint"),
+            "last_run": previous.get("last_run"),
+            "last_success_at": previous.get("last_success_at"),
+        }
+        identity = ("table_name", "collection_name", "key_columns", "mode", "rowversion_column")
+        if any(previous.get(field) != state[field] for field in identity):
+            state["checkpoint"] = None
+        sync_store.save(state)
+        return {"status": "success", "sync": state}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def run_sync(name: str) -> dict:
+    """
+    执行一轮同步：只拉取检查点之后的变更，批量 upsert / delete 到 MongoDB，全部成功后保存检查点。
+    :return: 操作结果字典，包含 upserted / deleted 行数、是否全量加载和新的检查点
+    """
+    lock = _sync_lock(name)
+    if not lock.acquire(blocking=False):
+        return {"status": "error", "message": f"Sync '{name}' is already running."}
+    started = time.time()
+    try:
+        state = sync_store.get(name)
+        if state is None:
+            return {"status": "error", "message": f"Sync '{name}' does not exist."}
+        # MongoDB 只保存到毫秒，统一截断，全量加载后的清理条件才准确
+        synced_at = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        synced_at = synced_at.replace(microsecond=synced_at.microsecond // 1000 * 1000)
+        collection = MongoDatabaseManager.get_connection()[state["collection_name"]]
+        try:
+            with SQLServerDatabaseManager.get_connection() as conn:
+                cursor = conn.cursor()
+                if state["mode"] == "change_tracking":
+                    result = _sync_change_tracking(cursor, collection, state, synced_at)
+                else:
+                    result = _sync_rowversion(cursor, collection, state, synced_at)
+        except Exception as e:
+            logger.error("Sync %s failed: %s", name, e)
+            state["last_run"] = {"started_at": started, "duration_seconds": round(time.time() - started, 3),
+                                 "status": "error", "message": str(e)}
+            sync_store.save(state)
+            SYNC_RUNS.inc(sync=name, status="error")
+            return {"status": "error", "message": str(e)}
+
+        state["checkpoint"] = result["checkpoint"]
+        # 本轮开始之前提交的变更都已应用，滞后从本轮开始时间算起
+        state["last_success_at"] = started
+        state["last_run"] = {"started_at": started, "duration_seconds": round(time.time() - started, 3),
+                             "status": "success", "upserted": result["upserted"], "deleted": result["deleted"],
+                             "full_load": result["full_load"]}
+        sync_store.save(state)
+        SYNC_RUNS.inc(sync=name, status="success")
+        SYNC_LAG.set(time.time() - started, sync=name)
+        return {"status": "success", **result}
+    finally:
+        lock.release()
+
+
+def reset_sync(name: str) -> dict:
+    """
+    清除检查点，下一轮全量加载。
+    """
+    with _sync_lock(name):
+        state = sync_store.get(name)
+        if state is None:
+            return {"status": "error", "message": f"Sync '{name}' does not exist."}
+        state["checkpoint"] = None
+        sync_store.save(state)
+        return {"status": "success", "sync": state}
+
+
+def delete_sync(name: str) -> dict:
+    with _sync_lock(name):
+        if not sync_store.delete(name):
+            return {"status": "error", "message": f"Sync '{name}' does not exist."}
+        return {"status": "success", "message": f"Sync '{name}' deleted."}
+
+
+def sync_status(state: dict) -> dict:
+    """
+    同步定义附带当前滞后秒数（从未成功时为 None）。
+    """
+    last_success = state.get("last_success_at")
+    return {**state, "lag_seconds": round(time.time() - last_success, 3) if last_success else None}
+
+
+def _collect_sync_lag():
+    for state in sync_store.list():
+        if state.get("last_success_at"):
+            SYNC_LAG.set(time.time() - state["last_success_at"], sync=state["name"])
+
+
+registry.add_collect_hook(_collect_sync_lag)
+
+
+class SyncWorker:
+    """
+    后台同步线程：每 poll_interval 秒检查一次，运行已启用且距上次运行超过 interval_seconds 的同步。
+    """
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="table-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            for state in sync_store.list():
+                if self._stop.is_set():
+                    return
+                last_run = (state.get("last_run") or {}).get("started_at") or 0
+                if state.get("enabled") and time.time() - last_run >= state["interval_seconds"]:
+                    try:
+                        run_sync(state["name"])
+                    except Exception as e:
+                        logger.error("Sync %s crashed: %s", state["name"], e)
+            self._stop.wait(self.poll_interval)
+
+
+sync_worker = SyncWorker()
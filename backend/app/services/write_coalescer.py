@@ -0,0 +1,162 @@
+# backend/app/services/write_coalescer.py
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+from backend.app.config import Config
+from backend.app.services.admission import detached_deadline
+from backend.app.services.metrics import registry, ROW_BUCKETS
+from backend.app.services.sql_server_service import insert_data_batch as sql_insert_data_batch
+from backend.app.services.mongo_service import insert_data_batch as mongo_insert_data_batch
+
+COALESCED_BATCH_SIZE = registry.histogram(
+    "write_coalescer_batch_size", "Caller requests merged into one flushed write.", ("backend",),
+    buckets=ROW_BUCKETS,
+)
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        # 线程版为凑满时唤醒首个调用方的 Event，asyncio 版为到期 flush 的定时器
+        self.full = None
+
+
+class WriteCoalescer:
+    """
+    线程版写合并（供同步路由使用）：同一个键的请求在 max_delay 秒内或凑满 max_items 条后合并为一次 flush。
+    不使用后台线程：批次的第一个调用方等待 max_delay 后负责 flush，凑满时由最后加入的调用方立即 flush。
+    flush 在全新的上下文中执行，使用固定的超时，不继承执行它的调用方的请求截止时间和取消登记。
+    flush(key, items) 必须返回与 items 一一对应的结果，每个调用方拿到自己的结果。
+    """
+
+    def __init__(self, flush, max_items: int, max_delay: float, backend: str):
+        self.flush = flush
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def submit(self, key, item):
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+                batch.full = threading.Event()
+            batch.items.append((item, future))
+            full = len(batch.items) >= self.max_items
+            if full:
+                del self._pending[key]
+                batch.full.set()
+
+        if full:
+            self._flush(key, batch)
+        elif leader:
+            batch.full.wait(self.max_delay)
+            with self._lock:
+                owner = self._pending.get(key) is batch
+                if owner:
+                    del self._pending[key]
+            if owner:
+                self._flush(key, batch)
+        return future.result()
+
+    def _flush(self, key, batch: _Batch):
+        items = [item for item, _ in batch.items]
+        COALESCED_BATCH_SIZE.observe(len(items), backend=self.backend)
+        try:
+            results = contextvars.Context().run(self._flush_detached, key, items)
+        except Exception as e:
+            results = [{"status": "error", "message": str(e)}] * len(items)
+        for (_, future), result in zip(batch.items, results):
+            future.set_result(result)
+
+    def _flush_detached(self, key, items: list) -> list:
+        with detached_deadline(Config.WRITE_COALESCING_FLUSH_TIMEOUT_SECONDS):
+            return self.flush(key, items)
+
+
+class AsyncWriteCoalescer:
+    """
+    asyncio 版写合并（供 async 路由使用），语义与 WriteCoalescer 相同，所有调用方必须在同一个事件循环中。
+    flush 由定时器或凑满批次的调用方以独立任务启动，个别调用方被取消（如客户端断开）不影响同批其他调用方。
+    任务以全新的上下文创建，使用固定的超时，不继承触发它的调用方的 pymongo.timeout 和请求截止时间。
+    """
+
+    def __init__(self, flush, max_items: int, max_delay: float, backend: str):
+        self.flush = flush
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.backend = backend
+        self._pending = {}
+        # 持有 flush 任务的引用，防止被垃圾回收
+        self._tasks = set()
+
+    async def submit(self, key, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch()
+            batch.full = loop.call_later(self.max_delay, self._start_flush, key, batch)
+        batch.items.append((item, future))
+        if len(batch.items) >= self.max_items:
+            batch.full.cancel()
+            self._start_flush(key, batch)
+        return await future
+
+    def _start_flush(self, key, batch: _Batch):
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        task = asyncio.get_running_loop().create_task(self._flush(key, batch), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key, batch: _Batch):
+        items = [item for item, _ in batch.items]
+        COALESCED_BATCH_SIZE.observe(len(items), backend=self.backend)
+        try:
+            with detached_deadline(Config.WRITE_COALESCING_FLUSH_TIMEOUT_SECONDS):
+                results = await self.flush(key, items)
+        except Exception as e:
+            results = [{"status": "error", "message": str(e)}] * len(items)
+        for (_, future), result in zip(batch.items, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def _flush_sql(key, rows: list) -> list:
+    table_name, columns = key
+    return sql_insert_data_batch(table_name, list(columns), rows)
+
+
+async def _flush_mongo(collection_name: str, batches: list) -> list:
+    return await mongo_insert_data_batch(collection_name, batches)
+
+
+sql_insert_coalescer = WriteCoalescer(
+    _flush_sql, Config.WRITE_COALESCING_MAX_ROWS, Config.WRITE_COALESCING_MAX_DELAY_MS / 1000, "sqlserver"
+)
+mongo_insert_coalescer = AsyncWriteCoalescer(
+    _flush_mongo, Config.WRITE_COALESCING_MAX_ROWS, Config.WRITE_COALESCING_MAX_DELAY_MS / 1000, "mongo"
+)
+
+
+def insert_data_coalesced(table_name: str, columns: list, values: list) -> dict:
+    """
+    与 sql_server_service.insert_data 相同的参数和返回值，同一表、同一列集合的并发插入合并提交。
+    """
+    return sql_insert_coalescer.submit((table_name, tuple(columns)), values)
+
+
+async def insert_documents_coalesced(collection_name: str, data: list) -> dict:
+    """
+    与 mongo_service.insert_data 相同的参数和返回值，同一集合的并发插入合并为一次 insert_many。
+    """
+    if not isinstance(data, list):
+        data = [data]
+    return await mongo_insert_coalescer.submit(collection_name, data)
@@ -0,0 +1,317 @@
+# backend/benchmarks/memory_mongo.py
+"""
+内存中的异步 MongoDB 替身，只实现服务层用到的 AsyncMongoClient 接口子集，用于本地基准测试。
+安装方式: MongoDatabaseManager._async_connection = MemoryMongoClient()
+
+支持的筛选运算符：等值、$eq / $ne / $gt / $gte / $lt / $lte / $in / $nin / $exists 以及 $and / $or；
+支持的更新运算符：$set / $unset / $inc。
+create_indexes 创建的单字段索引会维护一个哈希表，顶层字段的等值和 $in 条件据此定位候选文档，
+与真实 MongoDB 一样，未建索引的条件为全集合扫描。
+"""
+import copy
+from bson import ObjectId
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, DeleteResult
+
+_MISSING = object()
+
+
+def _get(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(operator: str, value, operand) -> bool:
+    if operator in ("$eq", "$ne", "$in", "$nin") and value is _MISSING:
+        value = None
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        # 数组字段（多键）任一元素命中即匹配
+        if isinstance(value, list):
+            return value in operand or any(item in operand for item in value)
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        if operator == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise OperationFailure(f"Unsupported operator {operator} in the in-memory stand-in.")
+
+
+def matches(document: dict, filter_query: dict) -> bool:
+    for key, condition in (filter_query or {}).items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported operator {key} in the in-memory stand-in.")
+        else:
+            value = _get(document, key)
+            if isinstance(condition, dict) and any(str(op).startswith("$") for op in condition):
+                for operator, operand in condition.items():
+                    if operator == "$exists":
+                        satisfied = (value is not _MISSING) == bool(operand)
+                    else:
+                        satisfied = _compare(operator, value, operand)
+                    if not satisfied:
+                        return False
+            elif not _compare("$eq", value, condition):
+                return False
+    return True
+
+
+def _apply_update(document: dict, update: dict):
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            *parents, leaf = path.split(".")
+            target = document
+            for part in parents:
+                target = target.setdefault(part, {})
+            if operator == "$set":
+                target[leaf] = copy.deepcopy(value)
+            elif operator == "$unset":
+                target.pop(leaf, None)
+            elif operator == "$inc":
+                target[leaf] = target.get(leaf, 0) + value
+            else:
+                raise OperationFailure(f"Unsupported update operator {operator} in the in-memory stand-in.")
+
+
+def _sort_key(value):
+    # None / 缺失值排在最前，与 MongoDB 的升序一致
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+def _project(document: dict, projection: dict) -> dict:
+    if not projection:
+        return document
+    included = any(value for key, value in projection.items() if key != "_id")
+    if included:
+        result = {key: document[key] for key, value in projection.items() if value and key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+class MemoryCursor:
+    def __init__(self, documents: list):
+        self._documents = documents
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._documents:
+            raise StopAsyncIteration
+        return self._documents.pop(0)
+
+    async def to_list(self, length=None):
+        documents, self._documents = self._documents, []
+        return documents
+
+    async def close(self):
+        self._documents = []
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._documents = {}
+        self._indexes = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        # 单字段索引: {字段: {值: {_id, ...}}}
+        self._lookup = {}
+
+    def _index_add(self, document: dict):
+        for field, table in self._lookup.items():
+            value = document.get(field)
+            if _hashable(value):
+                table.setdefault(value, set()).add(document["_id"])
+
+    def _index_remove(self, document: dict):
+        for field, table in self._lookup.items():
+            value = document.get(field)
+            if _hashable(value) and value in table:
+                table[value].discard(document["_id"])
+
+    def _candidates(self, filter_query: dict):
+        """
+        用单字段索引缩小候选范围，无法使用索引时返回全部文档。
+        """
+        for field, condition in (filter_query or {}).items():
+            if field == "_id" and _hashable(condition) and not isinstance(condition, dict):
+                return [self._documents[condition]] if condition in self._documents else []
+            table = self._lookup.get(field)
+            if table is None:
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif not isinstance(condition, dict):
+                values = [condition]
+            else:
+                continue
+            if not all(_hashable(value) for value in values):
+                continue
+            ids = set()
+            for value in values:
+                ids |= table.get(value, set())
+            return [self._documents[_id] for _id in sorted(ids, key=str)]
+        return list(self._documents.values())
+
+    def _matching(self, filter_query: dict):
+        return [document for document in self._candidates(filter_query) if matches(document, filter_query)]
+
+    def _insert(self, document: dict):
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error: {document['_id']}")
+        stored = self._documents[document["_id"]] = copy.deepcopy(document)
+        self._index_add(stored)
+        return document["_id"]
+
+    async def insert_one(self, document: dict):
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: list, ordered: bool = True):
+        return InsertManyResult([self._insert(document) for document in documents], True)
+
+    async def _update(self, filter_query: dict, update: dict, upsert: bool, many: bool):
+        targets = self._matching(filter_query)
+        if not many:
+            targets = targets[:1]
+        for document in targets:
+            self._index_remove(document)
+            _apply_update(document, update)
+            self._index_add(document)
+        raw = {"n": len(targets), "nModified": len(targets), "ok": 1.0}
+        if not targets and upsert:
+            document = {key: value for key, value in filter_query.items() if not key.startswith("$")}
+            _apply_update(document, update)
+            raw["upserted"] = self._insert(document)
+            raw["n"] = 1
+        return UpdateResult(raw, True)
+
+    async def update_one(self, filter_query: dict, update: dict, upsert: bool = False, **kwargs):
+        return await self._update(filter_query, update, upsert, many=False)
+
+    async def update_many(self, filter_query: dict, update: dict, upsert: bool = False, **kwargs):
+        return await self._update(filter_query, update, upsert, many=True)
+
+    async def _delete(self, filter_query: dict, many: bool):
+        targets = self._matching(filter_query)
+        if not many:
+            targets = targets[:1]
+        for document in targets:
+            self._index_remove(document)
+            del self._documents[document["_id"]]
+        return DeleteResult({"n": len(targets), "ok": 1.0}, True)
+
+    async def delete_one(self, filter_query: dict, **kwargs):
+        return await self._delete(filter_query, many=False)
+
+    async def delete_many(self, filter_query: dict, **kwargs):
+        return await self._delete(filter_query, many=True)
+
+    def find(self, filter_query: dict = None, projection: dict = None, sort=None, limit: int = 0,
+             batch_size: int = 0, **kwargs):
+        documents = self._matching(filter_query or {})
+        for field, direction in reversed(list(sort or [])):
+            documents.sort(key=lambda document: _sort_key(_get(document, field)), reverse=direction == -1)
+        if limit:
+            documents = documents[:limit]
+        return MemoryCursor([_project(copy.deepcopy(document), projection) for document in documents])
+
+    async def count_documents(self, filter_query: dict, **kwargs):
+        return len(self._matching(filter_query))
+
+    async def create_indexes(self, models: list):
+        names = []
+        for model in models:
+            document = model.document
+            keys = list(document["key"].items())
+            name = document.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+            self._indexes[name] = {"key": keys, "v": 2}
+            names.append(name)
+            if len(keys) == 1 and keys[0][0] not in self._lookup and keys[0][0] != "_id":
+                field = keys[0][0]
+                self._lookup[field] = {}
+                for stored in self._documents.values():
+                    value = stored.get(field)
+                    if _hashable(value):
+                        self._lookup[field].setdefault(value, set()).add(stored["_id"])
+        return names
+
+    async def index_information(self):
+        return copy.deepcopy(self._indexes)
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def with_options(self, **kwargs):
+        # 单实例，读偏好和读关注没有意义
+        return self
+
+    async def create_collection(self, name: str, **kwargs):
+        if name in self._collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        return self[name]
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
+    async def command(self, name: str, spec=None, **kwargs):
+        if name == "explain":
+            # 没有索引优化器，总是报告全集合扫描
+            return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}, "ok": 1.0}
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the in-memory stand-in.")
+
+
+class MemoryMongoClient:
+    def __init__(self):
+        self._databases = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    async def close(self):
+        pass
@@ -0,0 +1,330 @@
+import sys
+import os
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import tempfile
+import time
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+SQL_PREFIX = "/api/v1/sql_server_database"
+MONGO_PREFIX = "/api/v1/mongo_database"
+TABLE = "bench_items"
+CATEGORY_TABLE = "bench_categories"
+COLLECTION = "bench_items"
+CATEGORY_COUNT = 50
+
+SCENARIOS = ("sql_insert", "sql_update", "sql_delete", "sql_join", "mongo_insert", "mongo_update", "mongo_delete")
+
+
+def install_standins(sql_backend: str, mongo_backend: str, work_dir: str):
+    """
+    在导入应用之前安装本地替身：SQLite 代替 pyodbc，内存实现代替 MongoDB。
+    """
+    if sql_backend == "sqlite":
+        from backend.benchmarks import sqlite_odbc
+        sqlite_odbc.DATABASE_PATH = os.path.join(work_dir, "benchmark.db")
+        sys.modules["pyodbc"] = sqlite_odbc
+    if mongo_backend == "memory":
+        from backend.benchmarks.memory_mongo import MemoryMongoClient
+        from backend.app.services.mongo_service import MongoDatabaseManager
+        MongoDatabaseManager._async_connection = MemoryMongoClient()
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    最近秩百分位数。
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(values, 0.50) * 1000, 3),
+            "p95": round(percentile(values, 0.95) * 1000, 3),
+            "p99": round(percentile(values, 0.99) * 1000, 3),
+            "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+            "max": round(values[-1] * 1000, 3) if values else 0.0,
+        },
+    }
+
+
+class Scenario:
+    """
+    每个场景：prepare 准备数据（不计时），request 构造第 index 个请求 (method, url, kwargs)。
+    payload 为每个请求涉及的行数 / 文档数。
+    """
+
+    def __init__(self, client, payload: int, value_bytes: int, requests: int):
+        self.client = client
+        self.payload = payload
+        self.text = "x" * value_bytes
+        self.requests = requests
+        self.id_offset = 0
+
+    async def call(self, method: str, url: str, **kwargs):
+        response = await self.client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+    def row(self, item_id: int) -> list:
+        return [item_id, self.text, float(item_id % 1000), item_id % CATEGORY_COUNT]
+
+    async def seed_sql(self, count: int):
+        columns = ["id", "name", "price", "category"]
+        for start in range(0, count, 5000):
+            rows = [self.row(self.id_offset + item_id) for item_id in range(start, min(count, start + 5000))]
+            await self.call("POST", f"{SQL_PREFIX}/bulk_insert_data",
+                            json={"table_name": TABLE, "columns": columns, "rows": rows})
+
+    async def seed_mongo(self, count: int):
+        for start in range(0, count, 5000):
+            documents = [{"seq": self.id_offset + seq, "name": self.text, "price": 0}
+                         for seq in range(start, min(count, start + 5000))]
+            await self.call("POST", f"{MONGO_PREFIX}/insert-data", json={"collection_name": COLLECTION, "data": documents})
+
+    def ids(self, index: int) -> list:
+        start = self.id_offset + index * self.payload
+        return list(range(start, start + self.payload))
+
+    async def prepare(self, name: str):
+        if name in ("sql_update", "sql_delete", "sql_join"):
+            await self.seed_sql(self.requests * self.payload)
+        elif name in ("mongo_update", "mongo_delete"):
+            await self.seed_mongo(self.requests * self.payload)
+
+    def request(self, name: str, index: int):
+        ids = self.ids(index)
+        if name == "sql_insert":
+            if self.payload == 1:
+                return "POST", f"{SQL_PREFIX}/insert_data", {
+                    "json": {"table_name": TABLE, "columns": ["id", "name", "price", "category"],
+                             "values": self.row(ids[0])}}
+            return "POST", f"{SQL_PREFIX}/bulk_insert_data", {
+                "json": {"table_name": TABLE, "columns": ["id", "name", "price", "category"],
+                         "rows": [self.row(item_id) for item_id in ids]}}
+        if name == "sql_update":
+            return "PUT", f"{SQL_PREFIX}/update_rows", {
+                "json": {"table_name": TABLE, "updates": {"price": 1.5},
+                         "filters": [{"column": "id", "op": "in", "value": ids}]}}
+        if name == "sql_delete":
+            return "DELETE", f"{SQL_PREFIX}/delete_rows", {
+                "json": {"table_name": TABLE, "filters": [{"column": "id", "op": "in", "value": ids}]}}
+        if name == "sql_join":
+            query = (f"SELECT i.id, i.name, i.price, c.label FROM {TABLE} i "
+                     f"JOIN {CATEGORY_TABLE} c ON c.id = i.category WHERE i.id BETWEEN {ids[0]} AND {ids[-1]}")
+            # 绕过结果缓存，测量数据库路径
+            return "POST", f"{SQL_PREFIX}/join_tables", {
+                "params": {"query": query}, "headers": {"Cache-Control": "no-store"}}
+        if name == "mongo_insert":
+            return "POST", f"{MONGO_PREFIX}/insert-data", {
+                "json": {"collection_name": COLLECTION,
+                         "data": [{"seq": seq, "name": self.text, "price": 0} for seq in ids]}}
+        if name == "mongo_update":
+            return "PUT", f"{MONGO_PREFIX}/update-data", {
+                "json": {"collection_name": COLLECTION, "filter_query": {"seq": {"$in": ids}},
+                         "update_values": {"price": 1}, "multi": True}}
+        if name == "mongo_delete":
+            return "DELETE", f"{MONGO_PREFIX}/delete-data", {
+                "json": {"collection_name": COLLECTION, "filter_query": {"seq": {"$in": ids}}, "multi": True}}
+        raise ValueError(f"Unknown scenario {name}")
+
+
+async def setup_schema(client, value_bytes: int):
+    # 使用真实 SQL Server 时清理上一次运行留下的表，表不存在时的错误忽略
+    await client.delete(f"{SQL_PREFIX}/delete_table", params={"table_name": TABLE})
+    await client.delete(f"{SQL_PREFIX}/delete_table", params={"table_name": CATEGORY_TABLE})
+    for table, query in (
+        (TABLE, f"CREATE TABLE {TABLE} (id INT PRIMARY KEY, name NVARCHAR({max(value_bytes, 1)}), "
+                f"price FLOAT, category INT)"),
+        (CATEGORY_TABLE, f"CREATE TABLE {CATEGORY_TABLE} (id INT PRIMARY KEY, label NVARCHAR(50))"),
+    ):
+        response = await client.post(f"{SQL_PREFIX}/create_table", params={"table_name": table, "table_query": query})
+        response.raise_for_status()
+    response = await client.post(f"{SQL_PREFIX}/bulk_insert_data", json={
+        "table_name": CATEGORY_TABLE, "columns": ["id", "label"],
+        "rows": [[category, f"category {category}"] for category in range(CATEGORY_COUNT)],
+    })
+    response.raise_for_status()
+
+
+async def run_case(client, name: str, concurrency: int, payload: int, value_bytes: int, requests: int,
+                   id_offset: int) -> dict:
+    scenario = Scenario(client, payload, value_bytes, requests)
+    scenario.id_offset = id_offset
+    await scenario.prepare(name)
+
+    latencies = []
+    errors = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for index in next_index:
+            method, url, kwargs = scenario.request(name, index)
+            started = time.perf_counter()
+            try:
+                await scenario.call(method, url, **kwargs)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = {"scenario": name, "concurrency": concurrency, "payload": payload, **summarize(latencies, len(errors), elapsed)}
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+async def run_all(args) -> list:
+    import httpx
+    from backend.app.main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport 不触发 lifespan，这里显式执行启动和关闭
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            if any(name.startswith("sql_") for name in args.scenarios):
+                await setup_schema(client, args.value_bytes)
+            if any(name.startswith("mongo_") for name in args.scenarios):
+                # 集合已存在时（真实 MongoDB 上重复运行）返回 400，忽略
+                await client.post(f"{MONGO_PREFIX}/create-collection",
+                                  json={"collection_name": COLLECTION, "indexes": [{"field": "seq"}]})
+            # 每个组合使用互不重叠的 id 区间，避免主键冲突
+            id_offset = 0
+            for name in args.scenarios:
+                for payload in args.payload_sizes:
+                    for concurrency in args.concurrency:
+                        for _ in range(args.warmup):
+                            await run_case(client, name, concurrency, payload, args.value_bytes,
+                                           max(concurrency, 10), id_offset)
+                            id_offset += max(concurrency, 10) * payload
+                        result = await run_case(client, name, concurrency, payload, args.value_bytes,
+                                                args.requests, id_offset)
+                        id_offset += args.requests * payload
+                        results.append(result)
+                        print(f"{name:14} c={concurrency:<4} payload={payload:<6} "
+                              f"{result['throughput_rps']:>10.1f} req/s  "
+                              f"p50={result['latency_ms']['p50']:.2f}ms  p99={result['latency_ms']['p99']:.2f}ms  "
+                              f"errors={result['errors']}")
+    return results
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    与基线逐项比较：吞吐量下降或 p99 上升超过 tolerance 视为回归。
+    """
+    expected = {(item["scenario"], item["concurrency"], item["payload"]): item for item in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = expected.get((result["scenario"], result["concurrency"], result["payload"]))
+        if base is None:
+            continue
+        throughput_change = result["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        p99_change = result["latency_ms"]["p99"] / base["latency_ms"]["p99"] - 1 if base["latency_ms"]["p99"] else 0.0
+        result["baseline"] = {"throughput_change": round(throughput_change, 4), "p99_change": round(p99_change, 4)}
+        if throughput_change < -tolerance or p99_change > tolerance or result["errors"] > base.get("errors", 0):
+            regressions.append(result)
+    return regressions
+
+
+def parse_int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在进程内驱动 FastAPI 应用，测量写入和 JOIN 的吞吐量与延迟")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"逗号分隔的场景列表，可选: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 8], help="逗号分隔的并发数列表")
+    parser.add_argument("--payload-sizes", type=parse_int_list, default=[1, 100], help="每个请求的行数/文档数列表")
+    parser.add_argument("--value-bytes", type=int, default=64, help="文本字段长度")
+    parser.add_argument("--requests", type=int, default=200, help="每个组合的请求数")
+    parser.add_argument("--warmup", type=int, default=1, help="每个组合正式测量前的预热轮数")
+    parser.add_argument("--sql-backend", choices=["sqlite", "odbc"], default="sqlite",
+                        help="sqlite 使用本地替身；odbc 使用 Config 中配置的 SQL Server")
+    parser.add_argument("--mongo-backend", choices=["memory", "mongo"], default="memory",
+                        help="memory 使用内存替身；mongo 使用 Config 中配置的 MongoDB")
+    parser.add_argument("--coalesce-writes", action="store_true",
+                        help="开启写合并（Config.WRITE_COALESCING_ENABLED），对比单条插入的吞吐量")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线 JSON 文件路径")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化比例")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写为新的基线")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as work_dir:
+        install_standins(args.sql_backend, args.mongo_backend, work_dir)
+        # 慢查询日志会写入仓库目录，基准测试中关闭
+        from backend.app.services.slow_query_log import slow_query_log
+        slow_query_log.threshold_ms = None
+        # 后台同步线程会访问真实的同步定义，基准测试中不启动
+        from backend.app.config import Config
+        Config.SYNC_WORKER_ENABLED = False
+        Config.WRITE_COALESCING_ENABLED = args.coalesce_writes
+        # 测量的是吞吐量而不是过载保护：排队长度放宽到最大并发数，请求不会被准入控制拒绝
+        Config.ADMISSION_QUEUE_SIZE = {backend: max(args.concurrency) for backend in Config.ADMISSION_CONCURRENCY}
+        # 任务状态写入临时目录，不影响仓库中的任务存储
+        from backend.app.services.jobs import job_manager, JobStore
+        job_manager.store = JobStore(os.path.join(work_dir, "jobs.db"))
+        results = asyncio.run(run_all(args))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sql_backend": args.sql_backend,
+            "mongo_backend": args.mongo_backend,
+            "coalesce_writes": args.coalesce_writes,
+            "value_bytes": args.value_bytes,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for result in regressions:
+            print(f"REGRESSION {result['scenario']} c={result['concurrency']} payload={result['payload']}: "
+                  f"{result.get('baseline')} errors={result['errors']}")
+        exit_code = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
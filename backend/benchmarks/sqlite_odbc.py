@@ -0,0 +1,210 @@
+# backend/benchmarks/sqlite_odbc.py
+"""
+基于 SQLite 的 pyodbc 替身，只实现应用实际用到的接口，用于本地基准测试。
+安装方式: sys.modules["pyodbc"] = sqlite_odbc（必须在应用第一次 import pyodbc 之前）。
+
+会改写的 T-SQL 语法：
+- SELECT TOP (n) ... -> SELECT ... LIMIT n
+- COUNT_BIG(...) -> COUNT(...)
+- MIN_ACTIVE_ROWVERSION() -> X'FFFFFFFFFFFFFFFF'（SQLite 没有未提交的并发事务）
+- 元数据缓存使用的 INFORMATION_SCHEMA.COLUMNS 和 @@SERVERNAME / DB_NAME() 查询
+- SET SHOWPLAN_XML 抛出 ProgrammingError（慢查询日志会记录为 plan_error）
+
+与 pyodbc 一样支持 Connection.timeout（查询超时，秒）和 Cursor.cancel()（可从其他线程调用）。
+"""
+import decimal
+import re
+import sqlite3
+import time
+
+from backend.app.services.catalog import CATALOG_COLUMNS_QUERY, CATALOG_IDENTITY_QUERY
+
+Error = sqlite3.Error
+DatabaseError = sqlite3.DatabaseError
+OperationalError = sqlite3.OperationalError
+ProgrammingError = sqlite3.ProgrammingError
+IntegrityError = sqlite3.IntegrityError
+
+# 数据库文件路径，由基准测试在安装替身前设置
+DATABASE_PATH = ":memory:"
+
+sqlite3.register_adapter(decimal.Decimal, str)
+
+_TOP_RE = re.compile(r"^\s*SELECT\s+TOP\s*\(?\s*(\d+)\s*\)?\s+", re.IGNORECASE)
+_COUNT_BIG_RE = re.compile(r"\bCOUNT_BIG\s*\(", re.IGNORECASE)
+_MIN_ACTIVE_ROWVERSION_RE = re.compile(r"\bMIN_ACTIVE_ROWVERSION\s*\(\s*\)", re.IGNORECASE)
+_TYPE_RE = re.compile(r"^\s*(\w+)\s*(?:\(\s*(\d+|max)\s*(?:,\s*\d+\s*)?\))?", re.IGNORECASE)
+
+
+def _translate(sql: str) -> str:
+    match = _TOP_RE.match(sql)
+    if match:
+        sql = "SELECT " + sql[match.end():].rstrip().rstrip(";") + f" LIMIT {int(match.group(1))}"
+    sql = _MIN_ACTIVE_ROWVERSION_RE.sub("X'FFFFFFFFFFFFFFFF'", sql)
+    return _COUNT_BIG_RE.sub("COUNT(", sql)
+
+
+def _normalize_params(params):
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        return tuple(params[0])
+    return tuple(params)
+
+
+class Cursor:
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection._sqlite.cursor()
+        # 预读或合成的行；_synthetic_tail 为 True 时读完这些行后继续从 SQLite 游标读取
+        self._synthetic = None
+        self._synthetic_tail = False
+        self.fast_executemany = False
+        self.description = None
+        self.rowcount = -1
+
+    def _set_synthetic(self, columns: list, rows: list):
+        self._synthetic = list(rows)
+        self._synthetic_tail = False
+        self.description = [(name, str, None, None, None, None, True) for name in columns]
+        self.rowcount = -1
+
+    def _catalog_rows(self) -> list:
+        rows = []
+        tables = self._connection._sqlite.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+        for (table,) in tables:
+            for _, column, declared, not_null, _, _ in self._connection._sqlite.execute(
+                f"PRAGMA table_info([{table}])"
+            ):
+                match = _TYPE_RE.match(declared or "")
+                data_type = match.group(1).lower() if match else "nvarchar"
+                length = match.group(2) if match else None
+                max_length = -1 if (length or "").lower() == "max" else (int(length) if length else None)
+                rows.append(("dbo", table, column, data_type, "NO" if not_null else "YES", max_length))
+        return rows
+
+    def execute(self, sql: str, *params):
+        params = _normalize_params(params)
+        self._synthetic = None
+        self._synthetic_tail = False
+        stripped = sql.strip()
+        if stripped == CATALOG_IDENTITY_QUERY:
+            self._set_synthetic(["server", "database"], [("sqlite", "benchmark")])
+            return self
+        if stripped == CATALOG_COLUMNS_QUERY.strip():
+            self._set_synthetic(
+                ["TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME", "DATA_TYPE", "IS_NULLABLE", "CHARACTER_MAXIMUM_LENGTH"],
+                self._catalog_rows(),
+            )
+            return self
+        if stripped.upper().startswith("SET SHOWPLAN"):
+            raise ProgrammingError("SHOWPLAN is not supported by the SQLite stand-in.")
+
+        self._connection._run(lambda: self._cursor.execute(_translate(sql), params))
+        self.rowcount = self._cursor.rowcount
+        self.description = self._cursor.description
+        if self.description:
+            # SQLite 不提供列类型，按第一行的值推断 type_code（与 pyodbc 一样使用 Python 类型）
+            first = self._cursor.fetchone()
+            self._synthetic = [first] if first is not None else []
+            self._synthetic_tail = True
+            self.description = [
+                (column[0], type(value) if first is not None and value is not None else str,
+                 None, None, None, None, True)
+                for column, value in zip(self._cursor.description, first or [None] * len(self.description))
+            ]
+        return self
+
+    def executemany(self, sql: str, rows):
+        self._synthetic = None
+        self._synthetic_tail = False
+        self._connection._run(lambda: self._cursor.executemany(_translate(sql), [tuple(row) for row in rows]))
+        self.description = None
+        self.rowcount = self._cursor.rowcount
+        return self
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def cancel(self):
+        self._connection._sqlite.interrupt()
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1):
+        if self._synthetic is None:
+            return self._cursor.fetchmany(size)
+        rows, self._synthetic = self._synthetic[:size], self._synthetic[size:]
+        if self._synthetic_tail and len(rows) < size:
+            rows += self._cursor.fetchmany(size - len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._synthetic is None:
+            return self._cursor.fetchall()
+        rows, self._synthetic = self._synthetic, []
+        if self._synthetic_tail:
+            rows += self._cursor.fetchall()
+        return rows
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    def __init__(self, database: str):
+        self._sqlite = sqlite3.connect(database, timeout=30, check_same_thread=False, isolation_level="DEFERRED")
+        self._sqlite.execute("PRAGMA journal_mode=WAL")
+        self._sqlite.execute("PRAGMA synchronous=NORMAL")
+        self.timeout = 0
+
+    def _run(self, statement):
+        """
+        执行语句，timeout 非零时超时中止（pyodbc 的 HYT00），被 cancel() 中断时报 HY008。
+        """
+        expired = []
+        if self.timeout:
+            deadline = time.monotonic() + self.timeout
+
+            def check():
+                if time.monotonic() > deadline:
+                    expired.append(True)
+                    return 1
+                return 0
+
+            self._sqlite.set_progress_handler(check, 1000)
+        try:
+            return statement()
+        except sqlite3.OperationalError as e:
+            if "interrupted" not in str(e):
+                raise
+            if expired:
+                raise OperationalError("HYT00 [SQLite stand-in] Query timeout expired") from e
+            raise OperationalError("HY008 [SQLite stand-in] Operation canceled") from e
+        finally:
+            if self.timeout:
+                self._sqlite.set_progress_handler(None, 0)
+
+    def cursor(self) -> Cursor:
+        return Cursor(self)
+
+    def commit(self):
+        self._sqlite.commit()
+
+    def rollback(self):
+        self._sqlite.rollback()
+
+    def close(self):
+        self._sqlite.close()
+
+
+def connect(*args, **kwargs) -> Connection:
+    """
+    忽略 driver / server 等连接参数，总是连接到 DATABASE_PATH。
+    """
+    return Connection(DATABASE_PATH)
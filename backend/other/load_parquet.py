@@ -0,0 +1,55 @@
+import sys
+import os
+import argparse
+import json
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.app.services.parquet_loader import load_parquet, inspect_parquet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按记录批次将 Parquet 文件导入 SQL Server 表或 MongoDB 集合")
+    parser.add_argument("file_path", help="Parquet 文件路径")
+    parser.add_argument("--target", choices=["sql_server", "mongo"], help="写入目标")
+    parser.add_argument("--name", help="目标表名或集合名")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批读取的行数")
+    parser.add_argument("--map", action="append", default=[], metavar="SOURCE=TARGET",
+                        help="字段映射，可重复；不指定时导入全部字段")
+    parser.add_argument("--start-row-group", type=int, default=0, help="从该行组开始导入（断点续传）")
+    parser.add_argument("--create-table", action="store_true", help="根据 Parquet schema 创建 SQL Server 表")
+    parser.add_argument("--inspect", action="store_true", help="只打印文件元数据，不导入")
+    args = parser.parse_args()
+
+    if args.inspect:
+        print(json.dumps(inspect_parquet(args.file_path), ensure_ascii=False, indent=2))
+        return 0
+    if not args.target or not args.name:
+        parser.error("--target and --name are required unless --inspect is given")
+
+    column_mapping = dict(item.split("=", 1) for item in args.map) or None
+
+    def report(progress):
+        print(f"行组 {progress['next_row_group']}/{progress['num_row_groups']}，"
+              f"已导入 {progress['rows_done']}/{progress['total_rows']} 行")
+
+    result = load_parquet(
+        args.file_path,
+        args.target,
+        args.name,
+        batch_size=args.batch_size,
+        column_mapping=column_mapping,
+        start_row_group=args.start_row_group,
+        create_table=args.create_table,
+        progress_callback=report,
+    )
+    print(result["message"])
+    if result["status"] == "error":
+        print(f"可使用 --start-row-group {result['next_row_group']} 续传")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,26 @@
 import pyarrow
+import pyarrow.parquet
 import fastparquet
 import pandas as pd
 
 # 读取 .parquet 文件并输出条目数和字段信息
 def inspect_parquet(file_path):
-    # 读取文件
-    df = pd.read_parquet(file_path)
+    # 只读取元数据，不把整个文件加载进内存
+    parquet_file = pyarrow.parquet.ParquetFile(file_path)
     # 输出条目数（行数）和字段信息（列名）
-    print(f"文件 {file_path} 包含 {df.shape[0]} 条数据")
-    print(f"数据字段为: {df.columns.tolist()}")
+    print(f"文件 {file_path} 包含 {parquet_file.metadata.num_rows} 条数据")
+    print(f"数据字段为: {parquet_file.schema_arrow.names}")
 
-    df = pd.read_parquet(file_path)
+    # 只读取第一个批次的前100条数据
+    first_batch = next(parquet_file.iter_batches(batch_size=100), None)
+    df = first_batch.to_pandas() if first_batch is not None else pd.DataFrame()
 
     # 打印前100条数据
-    print(df.head(100))
+    print(df)
 
     # 将前100行数据保存为 CSV 文件
     csv_file_path = r'C:\Users\Ye\Desktop\数据库课设项目\data\archive\fundamentals_processed_first_100_rows.csv'  # 替换为你希望保存的路径
-    df.head(100).to_csv(csv_file_path, index=False)
+    df.to_csv(csv_file_path, index=False)
 
 # 调用方法，将路径改为待读取的文件路径
 inspect_parquet(r"C:\Users\Ye\Desktop\数据库课设项目\data\archive\fundamentals_processed.parquet")
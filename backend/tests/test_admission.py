@@ -0,0 +1,172 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from backend.app.config import Config
+from backend.app.services.admission import AdmissionMiddleware, ConcurrencyLimiter, current_request
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, join_tables
+from backend.benchmarks import sqlite_odbc
+
+# SQLite 上需要运行数秒的查询
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 500000000) SELECT COUNT(*) FROM c"
+)
+
+
+def test_limiter_queues_hands_off_and_sheds():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+        assert await limiter.acquire() is None
+        waiter = asyncio.ensure_future(limiter.acquire(1))
+        await asyncio.sleep(0)
+        assert await limiter.acquire(1) == "queue_full"
+        limiter.release()
+        assert await waiter is None
+        assert limiter.active == 1
+        assert await limiter.acquire(0.01) == "queue_timeout"
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def sql_app(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "admission.db")
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    monkeypatch.setattr(Config, "ADMISSION_BACKENDS", {"/sql": ("sqlserver",)})
+    monkeypatch.setattr(Config, "ADMISSION_CONCURRENCY", {"sqlserver": 1})
+    monkeypatch.setattr(Config, "ADMISSION_QUEUE_SIZE", {"sqlserver": 0})
+    monkeypatch.setattr(Config, "ENDPOINT_TIMEOUT_SECONDS", {})
+    monkeypatch.setattr(Config, "REQUEST_TIMEOUT_SECONDS", 10)
+    SQLServerDatabaseManager.close_connection()
+
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+    outcomes = []
+
+    @app.post("/sql/slow")
+    def slow_endpoint():
+        started = time.monotonic()
+        with SQLServerDatabaseManager.get_connection() as conn:
+            timeout = conn.timeout
+        result = join_tables(SLOW_QUERY, use_cache=False, store_cache=False)
+        outcomes.append({"timeout": timeout, "seconds": time.monotonic() - started, **result})
+        return result
+
+    @app.get("/sql/sleep")
+    async def sleep_endpoint():
+        await asyncio.sleep(float(current_request().remaining()) + 5)
+
+    yield app, outcomes
+    SQLServerDatabaseManager.close_connection()
+
+
+async def _wait_for(outcomes: list):
+    for _ in range(200):
+        if outcomes:
+            return outcomes[0]
+        await asyncio.sleep(0.05)
+    raise AssertionError("endpoint did not finish")
+
+
+def test_deadline_cancels_running_statement_and_returns_504(sql_app):
+    app, outcomes = sql_app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            started = time.monotonic()
+            response = await client.post("/sql/slow", headers={"X-Request-Timeout": "0.5"})
+            assert response.status_code == 504
+            assert time.monotonic() - started < 3
+            return await _wait_for(outcomes)
+
+    outcome = asyncio.run(scenario())
+    assert outcome["timeout"] == 1
+    assert outcome["status"] == "error"
+    assert outcome["seconds"] < 3
+
+
+def test_concurrency_limit_sheds_with_retry_after(sql_app):
+    app, _ = sql_app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/sql/sleep", headers={"X-Request-Timeout": "0.5"}))
+            await asyncio.sleep(0.1)
+            shed = await client.get("/sql/sleep")
+            return shed, await first
+
+    shed, first = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == str(Config.ADMISSION_RETRY_AFTER_SECONDS)
+    assert first.status_code == 504
+
+
+def test_client_disconnect_cancels_running_statement(sql_app):
+    app, outcomes = sql_app
+
+    async def scenario():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": b"", "more_body": False})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/sql/slow", "raw_path": b"/sql/slow",
+                 "query_string": b"", "headers": [], "scheme": "http", "server": ("test", 80),
+                 "client": ("test", 1), "root_path": "", "http_version": "1.1", "asgi": {"version": "3.0"}}
+        task = asyncio.ensure_future(app(scope, messages.get, send))
+        await asyncio.sleep(0.3)
+        await messages.put({"type": "http.disconnect"})
+        await task
+        return sent, await _wait_for(outcomes)
+
+    sent, outcome = asyncio.run(scenario())
+    assert sent == []
+    assert outcome["status"] == "error"
+    assert "canceled" in outcome["message"]
+    assert outcome["seconds"] < 3
+
+
+def test_disconnect_after_the_response_does_not_cancel_background_tasks(sql_app):
+    app, outcomes = sql_app
+
+    @app.get("/sql/background")
+    async def background_endpoint(background_tasks: BackgroundTasks):
+        async def after_response():
+            await asyncio.sleep(0.3)
+            outcomes.append({"status": "done"})
+
+        background_tasks.add_task(after_response)
+        return {"ok": True}
+
+    async def scenario():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": b"", "more_body": False})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # 客户端读完响应后立即关闭连接
+                await messages.put({"type": "http.disconnect"})
+
+        scope = {"type": "http", "method": "GET", "path": "/sql/background", "raw_path": b"/sql/background",
+                 "query_string": b"", "headers": [], "scheme": "http", "server": ("test", 80),
+                 "client": ("test", 1), "root_path": "", "http_version": "1.1", "asgi": {"version": "3.0"}}
+        await app(scope, messages.get, send)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[0]["status"] == 200
+    assert outcomes == [{"status": "done"}]
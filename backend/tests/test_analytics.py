@@ -0,0 +1,130 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from backend.app.config import Config
+from backend.app.services.analytics import _publish, list_snapshots, materialize, run_query
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.benchmarks import sqlite_odbc
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ANALYTICS_SNAPSHOT_DIR", str(tmp_path))
+
+    def publish(snapshot, table):
+        def write(path):
+            pq.write_table(table, path)
+            return {"rows": table.num_rows, "columns": [{"name": f.name, "type": str(f.type)} for f in table.schema]}
+        _publish(snapshot, write, {"snapshot": snapshot})
+
+    publish("sql_server.orders", pa.table({
+        "id": [1, 2, 3, 4], "customer_id": [1, 1, 2, 3], "amount": [10.0, 20.0, 5.0, 7.5],
+    }))
+    publish("mongo.customers", pa.table({"_id": [1, 2, 3], "id": [3, 7, 8], "tier": ["gold", "silver", "gold"]}))
+
+
+def test_join_filter_and_aggregate_report_freshness(snapshots):
+    result = run_query({
+        "snapshot": "sql_server.orders",
+        "filters": [{"column": "tier", "op": "=", "value": "gold"}],
+        "join": {"snapshot": "mongo.customers", "left_on": "customer_id", "right_on": "_id"},
+        "group_by": ["tier"],
+        "aggregations": [{"column": "amount", "func": "sum", "as": "total"}],
+    })
+    assert result["status"] == "success"
+    assert result["data"] == [{"total": 37.5, "tier": "gold"}] or result["data"] == [{"tier": "gold", "total": 37.5}]
+    assert set(result["freshness"]) == {"sql_server.orders", "mongo.customers"}
+    assert result["as_of"] == min(result["freshness"].values())
+
+
+def test_projection_order_and_limit(snapshots):
+    result = run_query({
+        "snapshot": "sql_server.orders", "columns": ["id", "amount"],
+        "filters": [{"column": "amount", "op": "between", "value": [5, 20]}],
+        "order_by": [["amount", "desc"]], "limit": 2,
+    })
+    assert result["data"] == [{"id": 2, "amount": 20.0}, {"id": 1, "amount": 10.0}]
+    assert result["truncated"] is True
+    assert [item["snapshot"] for item in list_snapshots()] == ["mongo.customers", "sql_server.orders"]
+
+
+def test_unknown_snapshot_and_column_are_errors(snapshots):
+    assert run_query({"snapshot": "sql_server.missing"})["status"] == "error"
+    assert run_query({"snapshot": "../etc"})["status"] == "error"
+    result = run_query({"snapshot": "sql_server.orders", "filters": [{"column": "nope", "op": "=", "value": 1}]})
+    assert result["status"] == "error"
+
+
+def test_order_by_column_outside_projection(snapshots):
+    result = run_query({"snapshot": "sql_server.orders", "columns": ["id"], "order_by": [["amount", "desc"]]})
+    assert result["status"] == "success", result
+    assert result["data"] == [{"id": 2}, {"id": 1}, {"id": 4}, {"id": 3}]
+
+
+def test_filter_on_column_in_both_snapshots_must_be_qualified(snapshots):
+    spec = {
+        "snapshot": "sql_server.orders",
+        "join": {"snapshot": "mongo.customers", "left_on": "customer_id", "right_on": "_id"},
+        "columns": ["id", "tier"],
+        "order_by": [["id", "asc"]],
+    }
+    ambiguous = run_query({**spec, "filters": [{"column": "id", "op": "=", "value": 3}]})
+    assert ambiguous["status"] == "error" and "qualify" in ambiguous["message"]
+    left = run_query({**spec, "filters": [{"column": "sql_server.orders.id", "op": "=", "value": 3}]})
+    assert left["data"] == [{"id": 3, "tier": "silver"}]
+    right = run_query({**spec, "filters": [{"column": "mongo.customers.id", "op": "=", "value": 3}]})
+    assert right["data"] == [{"id": 1, "tier": "gold"}, {"id": 2, "tier": "gold"}]
+
+
+def test_outer_join_applies_filters_on_the_null_supplying_side_after_the_join(snapshots):
+    spec = {
+        "snapshot": "sql_server.orders",
+        "join": {"snapshot": "mongo.customers", "left_on": "customer_id", "right_on": "_id", "how": "left"},
+        "columns": ["id", "tier"],
+        "order_by": [["id", "asc"]],
+    }
+    gold = run_query({**spec, "filters": [{"column": "tier", "op": "=", "value": "gold"}]})
+    assert gold["data"] == [{"id": 1, "tier": "gold"}, {"id": 2, "tier": "gold"}, {"id": 4, "tier": "gold"}]
+    shared = run_query({**spec, "filters": [{"column": "mongo.customers.id", "op": "=", "value": 3}]})
+    assert [row["id"] for row in shared["data"]] == [1, 2]
+
+    right = {**spec, "join": {**spec["join"], "how": "right"}}
+    large = run_query({**right, "filters": [{"column": "amount", "op": ">", "value": 8}]})
+    assert [row["id"] for row in large["data"]] == [1, 2]
+    key = run_query({**spec, "filters": [{"column": "_id", "op": "is_null"}]})
+    assert key["status"] == "error" and "join column" in key["message"]
+
+
+def test_materialize_reports_progress_per_batch_and_stops_when_the_callback_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ANALYTICS_SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(Config, "PARQUET_BATCH_SIZE", 2)
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "source.db")
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    SQLServerDatabaseManager.close_connection()
+    with SQLServerDatabaseManager.get_connection() as conn:
+        conn.cursor().execute("CREATE TABLE items (id INTEGER, name TEXT)")
+        conn.cursor().executemany("INSERT INTO items VALUES (?, ?)", [(i, f"item {i}") for i in range(5)])
+        conn.commit()
+
+    def cancel_after_first_batch(progress):
+        raise RuntimeError("Job was cancelled.")
+
+    try:
+        cancelled = materialize("sql_server", "items", progress_callback=cancel_after_first_batch)
+        assert cancelled == {"status": "error", "message": "Job was cancelled."}
+        assert os.listdir(Config.ANALYTICS_SNAPSHOT_DIR) == []
+        # 取消时已归还连接
+        assert SQLServerDatabaseManager.get_pool().stats()["in_use"] == 0
+
+        progress = []
+        result = materialize("sql_server", "items", progress_callback=progress.append)
+        assert result["status"] == "success" and result["rows"] == 5
+        assert progress == [{"rows": 2}, {"rows": 4}, {"rows": 5}]
+    finally:
+        SQLServerDatabaseManager.close_connection()
@@ -0,0 +1,128 @@
+import sys
+import os
+import datetime
+import decimal
+import io
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import FastAPI
+from backend.app.config import Config
+from backend.app.routes import sql_server_routes
+from backend.app.routes.sql_server_routes import router as sql_server_router
+from backend.app.services.arrow_export import (
+    negotiate_format, schema_from_description, iter_arrow_ipc, iter_parquet
+)
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, stream_join_tables
+from backend.benchmarks import sqlite_odbc
+
+DESCRIPTION = [
+    ("id", int, None, 10, 10, 0, False),
+    ("price", decimal.Decimal, None, 10, 10, 2, True),
+    ("created_at", datetime.datetime, None, 27, 27, 7, True),
+    ("name", str, None, 50, 50, 0, True),
+]
+BATCHES = [
+    [(1, decimal.Decimal("9.99"), datetime.datetime(2024, 1, 1, 12), "a")],
+    [(2, None, None, None), (3, decimal.Decimal("0.50"), datetime.datetime(2024, 1, 2), "c")],
+]
+
+
+def test_negotiate_format():
+    assert negotiate_format(None) == "json"
+    assert negotiate_format("application/json") == "json"
+    assert negotiate_format("application/vnd.apache.arrow.stream") == "arrow"
+    assert negotiate_format("application/vnd.apache.arrow.stream;q=0, application/x-parquet") == "parquet"
+    assert negotiate_format("application/vnd.apache.arrow.file") == "arrow_file"
+
+
+def test_arrow_ipc_round_trip():
+    schema = schema_from_description(DESCRIPTION)
+    data = b"".join(iter_arrow_ipc(schema, iter(BATCHES)))
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.schema == schema
+    assert table.column("id").to_pylist() == [1, 2, 3]
+    assert table.column("price").to_pylist()[1] is None
+
+
+def test_arrow_ipc_file_format_round_trip():
+    schema = schema_from_description(DESCRIPTION)
+    data = b"".join(iter_arrow_ipc(schema, iter(BATCHES), file_format=True))
+    reader = pa.ipc.open_file(pa.BufferReader(data))
+    assert reader.num_record_batches == 2
+    assert reader.read_all().column("name").to_pylist() == ["a", None, "c"]
+
+
+def test_parquet_groups_batches_into_row_groups():
+    schema = schema_from_description(DESCRIPTION)
+    data = b"".join(iter_parquet(schema, iter(BATCHES), row_group_size=2))
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_rows == 3
+    assert parquet_file.metadata.num_row_groups == 1
+    assert parquet_file.read().column("name").to_pylist() == ["a", None, "c"]
+
+
+@pytest.fixture
+def join_app(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "arrow.db")
+    conn = sqlite_odbc.connect()
+    conn.cursor().execute("CREATE TABLE items (id INT PRIMARY KEY, name TEXT)")
+    conn.cursor().executemany("INSERT INTO items VALUES (?, ?)", [(1, "a"), (2, "b")])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    SQLServerDatabaseManager.close_connection()
+    app = FastAPI()
+    app.include_router(sql_server_router, prefix="/sqlserver")
+    yield app
+    SQLServerDatabaseManager.close_connection()
+
+
+def test_join_endpoint_returns_arrow_file_and_rejects_pagination(join_app):
+    query = {"query": "SELECT id, name FROM items ORDER BY id"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=join_app), base_url="http://test") as client:
+            headers = {"Accept": "application/vnd.apache.arrow.file"}
+            arrow_file = await client.post("/sqlserver/join_tables", params=query, headers=headers)
+            paged = await client.post("/sqlserver/join_tables", params={**query, "key_column": "id", "page_size": 1},
+                                      headers=headers)
+            resumed = await client.post("/sqlserver/join_tables", params={**query, "continuation_token": "abc"},
+                                        headers={"Accept": "application/vnd.apache.parquet"})
+            return arrow_file, paged, resumed
+
+    arrow_file, paged, resumed = asyncio.run(scenario())
+    assert arrow_file.status_code == 200
+    assert arrow_file.headers["content-type"] == "application/vnd.apache.arrow.file"
+    assert pa.ipc.open_file(pa.BufferReader(arrow_file.content)).read_all().column("id").to_pylist() == [1, 2]
+    assert paged.status_code == 400 and resumed.status_code == 400
+
+
+def test_stream_result_releases_its_connection_when_closed_or_when_the_response_cannot_be_built(join_app,
+                                                                                              monkeypatch):
+    def in_use():
+        return SQLServerDatabaseManager.get_pool().stats()["in_use"]
+
+    unread = stream_join_tables("SELECT id FROM items")
+    assert in_use() == 1
+    unread["batches"].close()
+    assert in_use() == 0 and list(unread["batches"]) == []
+
+    partial = stream_join_tables("SELECT id FROM items", batch_size=1)
+    assert next(partial["batches"]) == [(1,)]
+    partial["batches"].close()
+    assert in_use() == 0
+
+    def broken_schema(description):
+        raise TypeError("unsupported column type")
+
+    monkeypatch.setattr(sql_server_routes, "schema_from_description", broken_schema)
+    with pytest.raises(TypeError):
+        sql_server_routes._binary_join_response("arrow", "SELECT id FROM items", None, None)
+    assert in_use() == 0
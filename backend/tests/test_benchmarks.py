@@ -0,0 +1,59 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+from pymongo import IndexModel
+from backend.benchmarks import sqlite_odbc
+from backend.benchmarks.memory_mongo import MemoryMongoClient, matches
+from backend.benchmarks.run_benchmarks import percentile, compare
+
+
+def test_sqlite_standin_translates_top_and_catalog(tmp_path):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "bench.db")
+    conn = sqlite_odbc.connect(driver="ignored")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE items (id INT PRIMARY KEY, name NVARCHAR(20))")
+    cursor.executemany("INSERT INTO items (id, name) VALUES (?, ?)", [[1, "a"], [2, "b"], [3, "c"]])
+    conn.commit()
+    cursor.execute("SELECT TOP (2) * FROM (SELECT * FROM items) AS keyset_page WHERE [id] > ? ORDER BY [id]", [1])
+    assert cursor.fetchall() == [(2, "b"), (3, "c")]
+
+    from backend.app.services.catalog import SchemaCatalog
+    catalog = SchemaCatalog()
+    catalog.load_sql(conn)
+    assert catalog.get_table("dbo.items")["columns"]["name"] == {
+        "name": "name", "type": "nvarchar", "nullable": True, "max_length": 20,
+    }
+    conn.close()
+
+
+def test_memory_mongo_filters_updates_and_indexes():
+    assert matches({"a": {"b": 3}}, {"a.b": {"$gte": 3}, "c": {"$exists": False}})
+    assert not matches({"a": 1}, {"$or": [{"a": 2}, {"a": {"$in": [3]}}]})
+
+    async def scenario():
+        collection = MemoryMongoClient()["db"]["items"]
+        await collection.create_indexes([IndexModel([("seq", 1)])])
+        await collection.insert_many([{"seq": seq, "v": 0} for seq in range(10)])
+        result = await collection.update_many({"seq": {"$in": [1, 2]}}, {"$inc": {"v": 5}})
+        assert result.modified_count == 2
+        assert (await collection.delete_many({"seq": {"$lt": 3}})).deleted_count == 3
+        cursor = collection.find({}, {"seq": 1, "_id": 0}, sort=[("seq", -1)], limit=2)
+        return [document async for document in cursor]
+
+    assert asyncio.run(scenario()) == [{"seq": 9}, {"seq": 8}]
+
+
+def test_percentile_and_baseline_comparison():
+    assert percentile([1, 2, 3, 4], 0.5) == 2
+    assert percentile([1, 2, 3, 4], 0.99) == 4
+    baseline = {"results": [{"scenario": "sql_insert", "concurrency": 1, "payload": 1, "errors": 0,
+                             "throughput_rps": 100.0, "latency_ms": {"p99": 10.0}}]}
+    fast = {"scenario": "sql_insert", "concurrency": 1, "payload": 1, "errors": 0,
+            "throughput_rps": 95.0, "latency_ms": {"p99": 11.0}}
+    slow = dict(fast, throughput_rps=50.0)
+    assert compare([fast], baseline, 0.2) == []
+    assert compare([slow], baseline, 0.2) == [slow]
@@ -0,0 +1,115 @@
+import sys
+import os
+import datetime
+import decimal
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from backend.app.config import Config
+from backend.app.services.catalog import SchemaCatalog, schema_catalog
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, _coerce_rows
+
+
+COLUMNS = [
+    ("dbo", "Orders", "Id", "int", "NO", None),
+    ("dbo", "Orders", "Amount", "decimal", "YES", None),
+    ("dbo", "Orders", "Note", "nvarchar", "YES", 5),
+    ("dbo", "Orders", "CreatedAt", "datetime2", "YES", None),
+    ("sales", "Orders", "Id", "int", "NO", None),
+]
+
+
+class FakeCursor:
+    def __init__(self, columns=COLUMNS):
+        self.columns = columns
+        self._result = None
+
+    def execute(self, query):
+        if "@@SERVERNAME" in query:
+            self._result = [("SQL01", "MyDatabase")]
+        else:
+            self._result = list(self.columns)
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConnection:
+    def __init__(self, columns=COLUMNS):
+        self.columns = columns
+
+    def cursor(self):
+        return FakeCursor(self.columns)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def catalog():
+    catalog = SchemaCatalog(ttl=60)
+    catalog.load_sql(FakeConnection())
+    return catalog
+
+
+def test_load_sql_caches_identity_and_tables(catalog):
+    assert (catalog.server_name, catalog.database_name) == ("SQL01", "MyDatabase")
+    assert catalog.get_table("[dbo].[orders]")["schema"] == "dbo"
+    assert catalog.get_table("Orders")["schema"] == "dbo"
+    assert catalog.get_table("sales.Orders")["schema"] == "sales"
+    assert catalog.get_table("missing") is None
+    assert not catalog.sql_is_stale()
+    catalog.invalidate_sql()
+    assert catalog.sql_is_stale()
+
+
+def test_coerce_row_converts_types(catalog):
+    table = catalog.get_table("orders")
+    row = catalog.coerce_row(table, ["id", "Amount", "note", "CreatedAt"], ["7", 1.5, 12, "2024-01-02T03:04:05"])
+    assert row == [7, decimal.Decimal("1.5"), "12", datetime.datetime(2024, 1, 2, 3, 4, 5)]
+
+
+@pytest.mark.parametrize("columns, values", [
+    (["Unknown"], [1]),
+    (["Id"], [None]),
+    (["Id"], ["abc"]),
+    (["Id"], [1.5]),
+    (["Note"], ["too long"]),
+    (["Id", "Note"], [1]),
+])
+def test_coerce_row_rejects_invalid_values(catalog, columns, values):
+    with pytest.raises(ValueError):
+        catalog.coerce_row(catalog.get_table("orders"), columns, values)
+
+
+def test_column_added_by_another_process_triggers_one_rate_limited_refresh(monkeypatch):
+    columns = list(COLUMNS)
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: FakeConnection(columns)))
+    monkeypatch.setattr(Config, "CATALOG_MISS_REFRESH_SECONDS", 60)
+    SQLServerDatabaseManager.close_connection()
+    schema_catalog.invalidate_sql()
+    try:
+        assert _coerce_rows("Orders", ["Id"], [["1"]]) == [[1]]
+        # ALTER TABLE ... ADD Region / ALTER COLUMN Note INT
+        columns.append(("dbo", "Orders", "Region", "nvarchar", "YES", 10))
+        columns[2] = ("dbo", "Orders", "Note", "int", "YES", None)
+        # 刚加载过，频率限制内不重新加载
+        with pytest.raises(ValueError, match="Region"):
+            _coerce_rows("Orders", ["Id", "Region"], [["1", "eu"]])
+
+        monkeypatch.setattr(Config, "CATALOG_MISS_REFRESH_SECONDS", 0)
+        assert _coerce_rows("Orders", ["Id", "Region"], [["2", "eu"]]) == [[2, "eu"]]
+        assert _coerce_rows("Orders", ["Note"], [["12"]]) == [[12]]
+        with pytest.raises(ValueError, match="not valid"):
+            _coerce_rows("Orders", ["Id"], [["abc"]])
+    finally:
+        schema_catalog.invalidate_sql()
+        SQLServerDatabaseManager.close_connection()
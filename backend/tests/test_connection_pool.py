@@ -0,0 +1,108 @@
+import sys
+import os
+import threading
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from backend.app.services.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, *params):
+        if not self.conn.alive:
+            raise RuntimeError("connection is dead")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_prefills_min_size_and_reuses_connections():
+    pool = ConnectionPool(FakeConnection, min_size=2, max_size=4)
+    pool.open()
+    assert pool.stats()["size"] == 2
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert pool.stats()["size"] == 2
+
+
+def test_pool_times_out_when_exhausted():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_pool_replaces_dead_connection_on_checkout():
+    pool = ConnectionPool(FakeConnection, min_size=1, max_size=1)
+    pool.open()
+    dead = pool.acquire()
+    dead.alive = False
+    pool.release(dead)
+
+    fresh = pool.acquire()
+    assert fresh is not dead
+    assert dead.closed
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_rolls_back_on_error():
+    pool = ConnectionPool(FakeConnection, min_size=0, max_size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("boom")
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_pool_is_bounded_under_concurrency():
+    created = []
+
+    def factory():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    pool = ConnectionPool(factory, min_size=0, max_size=3, timeout=5)
+
+    def worker():
+        for _ in range(50):
+            with pool.connection():
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) <= 3
+    assert pool.stats()["in_use"] == 0
@@ -0,0 +1,115 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import json
+import pytest
+from backend.app.config import Config
+from backend.app.services import federated_join as federated
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.benchmarks import sqlite_odbc
+from backend.benchmarks.memory_mongo import matches
+
+
+class _Collection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    def find(self, filter_query, projection=None, batch_size=0):
+        self.queries.append(filter_query)
+        return (dict(document) for document in self.documents if matches(document, filter_query))
+
+    def count_documents(self, filter_query):
+        return sum(1 for document in self.documents if matches(document, filter_query))
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "federated.db")
+    conn = sqlite_odbc.connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE orders (id INT PRIMARY KEY, customer_id INT, amount INT)")
+    cursor.executemany("INSERT INTO orders VALUES (?, ?, ?)",
+                       [(1, 1, 10), (2, 1, 20), (3, 2, 5), (4, 9, 7), (5, None, 1)])
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    monkeypatch.setattr(Config, "FEDERATED_JOIN_SPILL_DIR", str(tmp_path))
+    SQLServerDatabaseManager.close_connection()
+
+    customers = _Collection([{"_id": 1, "tier": "gold"}, {"_id": 2, "tier": "silver"}, {"_id": 3, "tier": "gold"}])
+    monkeypatch.setattr(MongoDatabaseManager, "get_connection", classmethod(lambda cls, routing=None: {"customers": customers}))
+    yield customers
+    SQLServerDatabaseManager.close_connection()
+
+
+def _run(**kwargs):
+    result = federated.federated_join("SELECT * FROM orders", "customers", "customer_id", "_id", **kwargs)
+    assert result["status"] == "success", result
+    lines = [json.loads(line) for chunk in result["lines"] for line in chunk.splitlines()]
+    return result["build_side"], lines[:-1], lines[-1]["stats"]
+
+
+def test_sql_build_side_pushes_keys_to_mongo_as_in_batches(sources):
+    side, rows, stats = _run(build_side="sql", key_batch_size=2)
+    assert side == "sql"
+    assert sorted((row["sql"]["id"], row["mongo"]["tier"]) for row in rows) == [(1, "gold"), (2, "gold"), (3, "silver")]
+    assert all(set(query["_id"]) == {"$in"} and len(query["_id"]["$in"]) <= 2 for query in sources.queries)
+    assert stats["output_rows"] == 3 and stats["spilled"] is False
+
+
+def test_mongo_build_side_probes_sql_with_in_list_and_filter(sources):
+    side, rows, stats = _run(build_side="mongo", filter_query={"tier": "gold"})
+    assert side == "mongo"
+    assert sorted(row["sql"]["id"] for row in rows) == [1, 2]
+    assert stats["build_rows"] == 2
+
+
+def test_auto_picks_smaller_side_and_left_join_keeps_unmatched(sources):
+    assert _run()[0] == "mongo"
+    _, rows, _ = _run(how="left")
+    unmatched = sorted(row["sql"]["id"] for row in rows if row["mongo"] is None)
+    assert unmatched == [4, 5]
+
+
+def test_spill_to_disk_gives_same_result(sources, tmp_path):
+    _, rows, stats = _run(build_side="sql", memory_limit=1)
+    assert stats["spilled"] is True
+    assert sorted(row["sql"]["id"] for row in rows) == [1, 2, 3]
+    assert not any(name.startswith("federated_join_") for name in os.listdir(tmp_path))
+
+
+def test_invalid_key_column_is_rejected(sources):
+    result = federated.federated_join("SELECT * FROM orders", "customers", "id; DROP", "_id", build_side="mongo")
+    assert result["status"] == "error"
+
+
+@pytest.mark.parametrize("build_side", ["sql", "mongo"])
+def test_array_keys_match_per_element_and_subdocument_keys_never_match(sources, build_side):
+    sources.documents[:] = [
+        {"_id": "a", "customer": [1, 2, 2]},
+        {"_id": "b", "customer": {"id": 1}},
+        {"_id": "c", "customer": [9, {"id": 2}]},
+        {"_id": "d", "customer": []},
+    ]
+    result = federated.federated_join("SELECT * FROM orders", "customers", "customer_id", "customer",
+                                      build_side=build_side, memory_limit=1)
+    assert result["status"] == "success", result
+    lines = [json.loads(line) for chunk in result["lines"] for line in chunk.splitlines()]
+    pairs = sorted((row["sql"]["id"], row["mongo"]["_id"]) for row in lines[:-1])
+    assert pairs == [(1, "a"), (2, "a"), (3, "a"), (4, "c")]
+
+
+def test_array_key_split_across_key_batches_is_matched_once_per_pair(sources):
+    sources.documents[:] = [{"_id": "a", "customer": [1, 2]}]
+    result = federated.federated_join("SELECT * FROM orders", "customers", "customer_id", "customer",
+                                      build_side="sql", key_batch_size=1)
+    lines = [json.loads(line) for chunk in result["lines"] for line in chunk.splitlines()]
+    # 文档被键 1 和键 2 两个批次各返回一次
+    assert len(sources.queries) >= 2
+    assert sorted(row["sql"]["id"] for row in lines[:-1]) == [1, 2, 3]
+    assert lines[-1]["stats"]["output_rows"] == 3
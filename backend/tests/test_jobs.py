@@ -0,0 +1,203 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import threading
+import time
+import pytest
+from backend.app.config import Config
+from backend.app.services.jobs import JobManager, JobStore, JobType
+
+
+def _wait(manager, job_id, statuses=("succeeded", "failed", "cancelled"), timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.store.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "JOB_RESULT_DIR", str(tmp_path / "results"))
+    monkeypatch.setattr(Config, "JOB_PROGRESS_INTERVAL_SECONDS", 0)
+    manager = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=4)
+    yield manager
+    manager.stop(timeout=5)
+
+
+def test_per_type_concurrency_and_results(manager):
+    release = threading.Event()
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow(context, value):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        release.wait(5)
+        with lock:
+            active[0] -= 1
+        context.report({"done": value})
+        return {"status": "success", "value": value}
+
+    async def double(context, value):
+        return {"status": "success", "value": value * 2}
+
+    manager.register(JobType("slow", slow, concurrency=1))
+    manager.register(JobType("double", double, concurrency=2))
+    manager.start()
+    slow_jobs = [manager.submit("slow", {"value": index}) for index in range(3)]
+    fast = manager.submit("double", {"value": 21})
+    assert _wait(manager, fast["id"])["result"]["value"] == 42
+    assert [manager.store.get(job["id"])["status"] for job in slow_jobs] == ["running", "queued", "queued"]
+    release.set()
+    finished = [_wait(manager, job["id"]) for job in slow_jobs]
+    assert [job["result"]["value"] for job in finished] == [0, 1, 2]
+    assert finished[0]["progress"] == {"done": 0}
+    assert peak[0] == 1
+    with pytest.raises(ValueError):
+        manager.submit("unknown", {})
+
+
+def test_cancel_queued_and_running_jobs(manager):
+    started = threading.Event()
+
+    def loop(context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            time.sleep(0.01)
+
+    manager.register(JobType("loop", loop, concurrency=1))
+    manager.start()
+    running = manager.submit("loop", {})
+    queued = manager.submit("loop", {})
+    started.wait(5)
+    assert manager.cancel(queued["id"])["status"] == "cancelled"
+    manager.cancel(running["id"])
+    job = _wait(manager, running["id"])
+    assert job["status"] == "cancelled" and job["cancel_requested"] is True
+
+
+def test_jobs_submitted_and_cancelled_by_another_process_are_picked_up(tmp_path, manager, monkeypatch):
+    """
+    未启动的 JobManager 代表另一个工作进程：只写共享的任务存储，由启动的实例轮询执行和取消。
+    """
+    monkeypatch.setattr(Config, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+    started = threading.Event()
+
+    def loop(context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            time.sleep(0.01)
+
+    other = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=4)
+    for instance in (manager, other):
+        instance.register(JobType("loop", loop, concurrency=1))
+    manager.start()
+    job = other.submit("loop", {})
+    assert job["status"] == "queued"
+    assert started.wait(5)
+    assert other.cancel(job["id"])["cancel_requested"] is True
+    assert _wait(manager, job["id"])["status"] == "cancelled"
+
+
+def test_job_cancelled_after_the_queue_was_read_is_not_started(manager, monkeypatch):
+    ran = []
+    manager.register(JobType("record", lambda context: ran.append(context.job_id), concurrency=1))
+    job = manager.submit("record", {})
+    # 模拟另一个进程在读取队列和启动之间取消了任务
+    stale = manager.store.queued()
+    manager.store.update(job["id"], status="cancelled", finished_at=time.time())
+    monkeypatch.setattr(manager.store, "queued", lambda: stale)
+    manager.start()
+    time.sleep(0.1)
+    assert ran == []
+    assert manager.store.get(job["id"])["status"] == "cancelled"
+    assert manager.store.get(job["id"])["attempts"] == 0
+    assert manager.store.claim(job["id"]) is False
+
+
+def test_job_started_by_another_process_after_it_was_read_is_cancelled_at_a_checkpoint(tmp_path, manager,
+                                                                                       monkeypatch):
+    monkeypatch.setattr(Config, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+    started = threading.Event()
+
+    def loop(context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            time.sleep(0.01)
+
+    other = JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=4)
+    for instance in (manager, other):
+        instance.register(JobType("loop", loop, concurrency=1))
+    job = other.submit("loop", {})
+    manager.start()
+    assert started.wait(5)
+    # 模拟取消方读取到的还是排队状态，之后任务才被启动
+    stale = dict(job)
+    monkeypatch.setattr(other.store, "get", lambda job_id, get=other.store.get: stale if stale else get(job_id))
+    other.cancel(job["id"])
+    stale.clear()
+    assert other.store.get(job["id"])["status"] == "running"
+    assert _wait(manager, job["id"])["status"] == "cancelled"
+    assert manager.store.get(job["id"])["attempts"] == 1
+
+
+def test_failures_are_recorded(manager):
+    def broken(context):
+        raise RuntimeError("boom")
+
+    manager.register(JobType("broken", broken))
+    manager.register(JobType("error", lambda context: {"status": "error", "message": "bad input"}))
+    manager.start()
+    assert _wait(manager, manager.submit("broken", {})["id"])["error"] == "boom"
+    job = _wait(manager, manager.submit("error", {})["id"])
+    assert (job["status"], job["error"]) == ("failed", "bad input")
+
+
+def test_restart_requeues_resumable_jobs_with_saved_progress(tmp_path, manager):
+    store_path = manager.store.path
+    manager.register(JobType("resumable", lambda context, step: None, resumable=True,
+                             resume=lambda params, progress: {"step": progress["step"]}))
+    manager.register(JobType("oneshot", lambda context: None))
+    now = time.time()
+    for job_id, job_type in (("a", "resumable"), ("b", "oneshot")):
+        manager.store.insert({"id": job_id, "type": job_type, "status": "running",
+                              "params": {"step": 0} if job_type == "resumable" else {}, "created_at": now})
+    manager.store.update("a", progress={"step": 7})
+    manager.store.close()
+
+    restarted = JobManager(JobStore(store_path), max_workers=2)
+    restarted.types = manager.types
+    restarted.start()
+    try:
+        assert _wait(restarted, "a")["params"] == {"step": 7}
+        job = restarted.store.get("b")
+        assert job["status"] == "failed" and "restart" in job["error"]
+    finally:
+        restarted.stop(timeout=5)
+
+
+def test_shutdown_interrupts_running_job_and_requeues_it(manager):
+    started = threading.Event()
+
+    def loop(context):
+        started.set()
+        while True:
+            context.check_cancelled()
+            time.sleep(0.01)
+
+    manager.register(JobType("loop", loop, resumable=True))
+    manager.start()
+    job = manager.submit("loop", {})
+    started.wait(5)
+    manager.stop(timeout=5)
+    assert manager.store.get(job["id"])["status"] == "queued"
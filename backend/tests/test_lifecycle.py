@@ -0,0 +1,128 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import threading
+import time
+import anyio.to_thread
+import httpx
+import pytest
+from fastapi import FastAPI
+from backend.app.config import Config
+from backend.app.routes.health_routes import router as health_router
+from backend.app.services import lifecycle
+from backend.app.services.jobs import JobManager, JobStore
+from backend.app.services.lifecycle import BackgroundServices, configure_threadpool, server_state, warm_up
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.benchmarks import sqlite_odbc
+from backend.benchmarks.memory_mongo import MemoryMongoClient
+
+
+class _UnreachableMongo(MemoryMongoClient):
+    def __getitem__(self, name):
+        db = super().__getitem__(name)
+
+        async def command(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        db.command = command
+        return db
+
+
+@pytest.fixture
+def backends(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "lifecycle.db")
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    monkeypatch.setattr(Config, "HEALTH_CHECK_TIMEOUT_SECONDS", 0.2)
+    SQLServerDatabaseManager.close_connection()
+    MongoDatabaseManager._async_connection = MemoryMongoClient()
+    server_state.reset()
+    yield
+    server_state.reset()
+    SQLServerDatabaseManager.close_connection()
+    MongoDatabaseManager._async_connection = None
+
+
+def test_readiness_follows_warm_up_backends_and_draining(backends):
+    app = FastAPI()
+    app.include_router(health_router, prefix="/health")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = {"live": await client.get("/health/live"), "before": await client.get("/health/ready")}
+            configure_threadpool(7)
+            responses["threads"] = anyio.to_thread.current_default_thread_limiter().total_tokens
+            responses["warmup"] = await warm_up()
+            responses["ready"] = await client.get("/health/ready")
+            MongoDatabaseManager._async_connection = _UnreachableMongo()
+            responses["mongo_down"] = await client.get("/health/ready")
+            MongoDatabaseManager._async_connection = MemoryMongoClient()
+            server_state.draining = True
+            responses["draining"] = await client.get("/health/ready")
+            return responses
+
+    responses = asyncio.run(scenario())
+    assert responses["live"].status_code == 200
+    assert responses["before"].status_code == 503 and responses["before"].json()["warming_up"] is True
+    assert responses["threads"] == 7
+    assert responses["warmup"] == {"sqlserver": "ok", "mongo": "ok"}
+    assert SQLServerDatabaseManager.get_pool().stats()["size"] == Config.SQL_SERVER_POOL_MIN_SIZE
+    assert responses["ready"].status_code == 200
+    assert responses["ready"].json()["checks"] == {"sqlserver": "ok", "mongo": "ok"}
+    assert responses["mongo_down"].status_code == 503
+    assert responses["mongo_down"].json()["checks"]["sqlserver"] == "ok"
+    assert "TimeoutError" in responses["mongo_down"].json()["checks"]["mongo"]
+    assert responses["draining"].status_code == 503 and responses["draining"].json()["draining"] is True
+
+
+def test_warm_up_gives_up_on_an_unresponsive_sql_server(backends, monkeypatch):
+    monkeypatch.setattr(Config, "SERVER_WARMUP_TIMEOUT_SECONDS", 0.2)
+    release = threading.Event()
+
+    def hanging_connect():
+        # 登录一直不返回
+        release.wait(10)
+        raise RuntimeError("login timeout")
+
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(hanging_connect))
+
+    async def scenario():
+        started = time.monotonic()
+        try:
+            return await warm_up(), time.monotonic() - started
+        finally:
+            release.set()
+
+    results, seconds = asyncio.run(scenario())
+    assert seconds < 3
+    assert "TimeoutError" in results["sqlserver"] and results["mongo"] == "ok"
+    assert server_state.ready is True
+
+
+def test_background_services_run_in_one_process_and_fail_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "BACKGROUND_LOCK_PATH", str(tmp_path / "background.lock"))
+    monkeypatch.setattr(Config, "BACKGROUND_LOCK_RETRY_SECONDS", 0.05)
+    monkeypatch.setattr(Config, "SYNC_WORKER_ENABLED", False)
+    monkeypatch.setattr(Config, "JOB_RESULT_DIR", str(tmp_path / "results"))
+    monkeypatch.setattr(lifecycle, "job_manager", JobManager(JobStore(str(tmp_path / "jobs.db")), max_workers=1))
+
+    # 同一进程中两次打开锁文件得到不同的打开文件描述，flock 互斥，可以模拟两个工作进程
+    first, second = BackgroundServices(), BackgroundServices()
+    first.start(None)
+    second.start(None)
+    try:
+        assert first.owner and not second.owner
+        first.stop()
+        deadline = time.monotonic() + 5
+        while not second.owner and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert second.owner
+        assert lifecycle.job_manager._executor is not None
+    finally:
+        first.stop()
+        second.stop()
+    assert lifecycle.job_manager._executor is None
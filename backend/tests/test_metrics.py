@@ -0,0 +1,61 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import pytest
+from backend.app.services.metrics import MetricsRegistry, instrument, SERVICE_ERRORS, SERVICE_LATENCY
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1))
+    histogram.observe(0.05, endpoint="/a")
+    histogram.observe(0.5, endpoint="/a")
+    histogram.observe(5, endpoint="/a")
+    text = registry.render()
+    assert 'latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{endpoint="/a"} 3' in text
+    assert "# TYPE latency_seconds histogram" in text
+
+
+def test_label_values_are_escaped_and_label_names_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors.", ("endpoint",))
+    counter.inc(endpoint='/a"b')
+    assert 'errors_total{endpoint="/a\\"b"} 1' in registry.render()
+    with pytest.raises(ValueError):
+        counter.inc(path="/a")
+
+
+def test_const_labels_are_added_to_every_series():
+    registry = MetricsRegistry({"pid": "42"})
+    registry.counter("errors_total", "Errors.", ("endpoint",)).inc(endpoint="/a")
+    registry.histogram("latency_seconds", "Latency.", buckets=(1,)).observe(0.5)
+    text = registry.render()
+    assert 'errors_total{endpoint="/a",pid="42"} 1' in text
+    assert 'latency_seconds_bucket{pid="42",le="1"} 1' in text
+    assert 'latency_seconds_count{pid="42"} 1' in text
+
+
+def test_instrument_counts_error_results_for_sync_and_async():
+    @instrument("test", "sync_op")
+    def sync_op(fail):
+        return {"status": "error" if fail else "success"}
+
+    @instrument("test", "async_op")
+    async def async_op():
+        raise RuntimeError("boom")
+
+    sync_op(False)
+    sync_op(True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(async_op())
+
+    assert SERVICE_LATENCY.snapshot(backend="test", operation="sync_op")["count"] == 2
+    assert SERVICE_ERRORS.value(backend="test", operation="sync_op") == 1
+    assert SERVICE_ERRORS.value(backend="test", operation="async_op") == 1
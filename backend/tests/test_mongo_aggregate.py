@@ -0,0 +1,109 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from backend.app.config import Config
+from backend.app.routes.mongo_routes import router as mongo_router
+from backend.app.services.mongo_index_advisor import leading_stages, summarize_aggregate_explain
+from backend.app.services.mongo_service import MongoDatabaseManager, pipeline_writes
+from backend.benchmarks.memory_mongo import MemoryCursor, MemoryMongoClient
+
+PIPELINE = [
+    {"$match": {"status": "A"}},
+    {"$sort": {"created_at": -1}},
+    {"$group": {"_id": "$customer", "total": {"$sum": "$amount"}}},
+]
+
+
+def test_leading_stages_and_write_detection():
+    assert leading_stages(PIPELINE) == ["$match", "$sort"]
+    assert leading_stages([{"$group": {"_id": None}}, {"$match": {}}]) == []
+    assert not pipeline_writes(PIPELINE)
+    assert pipeline_writes(PIPELINE + [{"$merge": {"into": "totals"}}])
+
+
+def test_summary_reports_index_backed_match_and_sort():
+    explain = {"stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {
+            "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_1_created_at_-1"}
+        }}}},
+        {"$group": {"_id": "$customer"}},
+    ]}
+    summary = summarize_aggregate_explain(PIPELINE, explain)
+    assert summary["uses_index"] is True
+    plan = summary["plans"][0]
+    assert plan["indexes"] == ["status_1_created_at_-1"]
+    assert plan["match_uses_index"] and plan["sort_uses_index"] and not plan["blocking_sort"]
+    assert plan["aggregation_stages"] == ["$group"]
+
+
+def test_summary_reports_collection_scan_and_blocking_sort_per_shard():
+    pushed_down = {"queryPlanner": {"winningPlan": {"queryPlan": {
+        "stage": "GROUP", "inputStage": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+    }}}}
+    indexed = {"stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "IXSCAN", "indexName": "status_1"}}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": "$customer"}},
+    ]}
+    summary = summarize_aggregate_explain(PIPELINE, {"shards": {"s0": pushed_down, "s1": indexed}})
+    assert summary["uses_index"] is False
+    scan, partial = summary["plans"]
+    assert scan["shard"] == "s0" and scan["collection_scan"] and scan["blocking_sort"]
+    assert not scan["match_uses_index"] and not scan["sort_uses_index"]
+    assert partial["match_uses_index"] and not partial["sort_uses_index"] and partial["blocking_sort"]
+
+
+@pytest.fixture
+def mongo_app():
+    client = MemoryMongoClient()
+    MongoDatabaseManager._async_connection = client
+    app = FastAPI()
+    app.include_router(mongo_router, prefix="/mongo")
+    yield app, client[Config.MONGO_DB_NAME]
+    MongoDatabaseManager._async_connection = None
+
+
+def test_aggregate_streams_ndjson_with_options_and_explains(mongo_app):
+    app, db = mongo_app
+    calls = []
+
+    async def aggregate(pipeline, **options):
+        calls.append((pipeline, options))
+        return MemoryCursor([{"_id": "alice", "total": 3}, {"_id": "bob", "total": 5}])
+
+    db["orders"].aggregate = aggregate
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            streamed = await client.post("/mongo/aggregate", json={
+                "collection_name": "orders", "pipeline": PIPELINE, "max_time_ms": 500, "batch_size": 10,
+            })
+            explained = await client.post("/mongo/aggregate", json={
+                "collection_name": "orders", "pipeline": PIPELINE, "explain": True,
+            })
+            write_on_secondary = await client.post("/mongo/aggregate", headers={"X-Read-Preference": "secondary"}, json={
+                "collection_name": "orders", "pipeline": [{"$out": "copy"}],
+            })
+            return streamed, explained, write_on_secondary
+
+    streamed, explained, write_on_secondary = asyncio.run(scenario())
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in streamed.text.splitlines()] == [
+        {"_id": "alice", "total": 3}, {"_id": "bob", "total": 5}
+    ]
+    assert calls == [(PIPELINE, {
+        "allowDiskUse": Config.MONGO_AGGREGATE_ALLOW_DISK_USE, "maxTimeMS": 500, "batchSize": 10
+    })]
+    assert explained.status_code == 200
+    assert explained.json()["summary"]["plans"][0]["collection_scan"] is True
+    assert explained.json()["summary"]["uses_index"] is False
+    assert write_on_secondary.status_code == 400
@@ -0,0 +1,127 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import pytest
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.app.config import Config
+from backend.app.services.mongo_service import (
+    MongoDatabaseManager, _build_write_model, _summarize_bulk_result, bulk_write
+)
+
+OPERATIONS = [
+    {"op": "insert_one", "document": {"_id": 1, "name": "a"}},
+    {"op": "update_one", "filter": {"_id": 1}, "update": {"$set": {"name": "b"}}, "upsert": True},
+    {"op": "update_many", "filter": {"tags": "x"}, "update": {"$set": {"tags.$[t]": "y"}},
+     "array_filters": [{"t": "x"}]},
+    {"op": "replace_one", "filter": {"_id": 2}, "replacement": {"name": "c"}},
+    {"op": "delete_one", "filter": {"_id": 3}},
+    {"op": "delete_many", "filter": {"name": "old"}},
+]
+
+
+def test_operations_map_to_pymongo_write_models():
+    models = [_build_write_model(index, operation) for index, operation in enumerate(OPERATIONS)]
+    assert models == [
+        InsertOne({"_id": 1, "name": "a"}),
+        UpdateOne({"_id": 1}, {"$set": {"name": "b"}}, upsert=True),
+        UpdateMany({"tags": "x"}, {"$set": {"tags.$[t]": "y"}}, upsert=False, array_filters=[{"t": "x"}]),
+        ReplaceOne({"_id": 2}, {"name": "c"}, upsert=False),
+        DeleteOne({"_id": 3}),
+        DeleteMany({"name": "old"}),
+    ]
+
+
+@pytest.mark.parametrize("operation, message", [
+    ({"op": "upsert_all", "filter": {}}, "unsupported type 'upsert_all'"),
+    ({"filter": {}}, "unsupported type 'None'"),
+    ({"op": "insert_one"}, "requires 'document'"),
+    ({"op": "update_many", "filter": {}}, "requires 'filter' and 'update'"),
+    ({"op": "replace_one", "replacement": {}}, "requires 'filter' and 'replacement'"),
+    ({"op": "delete_many"}, "requires 'filter'"),
+])
+def test_invalid_operations_are_rejected(operation, message):
+    with pytest.raises(ValueError, match=message):
+        _build_write_model(4, operation)
+
+
+def test_summary_reports_counts_upserts_and_errors():
+    upserted_id = ObjectId()
+    summary = _summarize_bulk_result({
+        "nInserted": 1, "nMatched": 2, "nModified": 1, "nRemoved": 3, "nUpserted": 1,
+        "upserted": [{"index": 1, "_id": upserted_id}],
+        "writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}],
+        "writeConcernErrors": [{"errmsg": "waiting for replication timed out"}],
+    }, OPERATIONS)
+    assert summary == {
+        "inserted_count": 1, "matched_count": 2, "modified_count": 1, "deleted_count": 3, "upserted_count": 1,
+        "upserted_ids": {"1": str(upserted_id)},
+        "write_errors": [{"index": 0, "op": "insert_one", "code": 11000, "message": "E11000 duplicate key"}],
+        "write_concern_errors": ["waiting for replication timed out"],
+    }
+    assert _summarize_bulk_result({}, OPERATIONS)["write_errors"] == []
+
+
+class _Result:
+    def __init__(self, details):
+        self.bulk_api_result = details
+
+
+class _Collection:
+    async def bulk_write(self, requests, ordered=True):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def orders(monkeypatch):
+    collection = _Collection()
+    monkeypatch.setattr(MongoDatabaseManager, "_async_connection", {Config.MONGO_DB_NAME: {"orders": collection}})
+    yield collection
+
+
+def test_bulk_write_sends_one_request_and_reports_ordered_and_unordered_errors(orders):
+    calls = []
+
+    async def collection_bulk_write(requests, ordered=True):
+        calls.append((requests, ordered))
+        if ordered:
+            # 有序执行在第一个错误处停止，之后的操作不执行
+            raise BulkWriteError({"nInserted": 0, "writeErrors": [
+                {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+            ]})
+        raise BulkWriteError({"nInserted": 0, "nRemoved": 1, "writeErrors": [
+            {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+            {"index": 3, "code": 2, "errmsg": "bad replacement"},
+        ]})
+
+    orders.bulk_write = collection_bulk_write
+    ordered = asyncio.run(bulk_write("orders", OPERATIONS))
+    unordered = asyncio.run(bulk_write("orders", OPERATIONS, ordered=False))
+
+    assert [ordered_flag for _, ordered_flag in calls] == [True, False]
+    assert all(len(requests) == len(OPERATIONS) for requests, _ in calls)
+    assert ordered["status"] == "success"
+    assert ordered["message"] == "Bulk write completed with 1 failed operations."
+    assert [error["index"] for error in ordered["write_errors"]] == [0]
+    assert unordered["deleted_count"] == 1
+    assert [(error["index"], error["op"]) for error in unordered["write_errors"]] == [
+        (0, "insert_one"), (3, "replace_one")
+    ]
+
+
+def test_bulk_write_success_and_rejections(orders):
+    async def collection_bulk_write(requests, ordered=True):
+        return _Result({"nInserted": 1, "nMatched": 1, "nModified": 1})
+
+    orders.bulk_write = collection_bulk_write
+    result = asyncio.run(bulk_write("orders", OPERATIONS[:2]))
+    assert result["status"] == "success" and result["message"] == "Bulk write completed."
+    assert (result["inserted_count"], result["modified_count"]) == (1, 1)
+    assert asyncio.run(bulk_write("orders", []))["message"] == "No operations to execute."
+    rejected = asyncio.run(bulk_write("orders", [OPERATIONS[0], {"op": "drop"}]))
+    assert rejected == {"status": "error", "message": "Operation 1 has unsupported type 'drop'."}
@@ -0,0 +1,95 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import pytest
+from fastapi import FastAPI
+from backend.app import main
+from backend.app.config import Config
+from backend.app.services import mongo_service
+from backend.app.services.mongo_service import MongoDatabaseManager
+
+
+class _StubClient:
+    created = []
+
+    def __init__(self, uri, **options):
+        self.uri = uri
+        self.options = options
+        self.closed = False
+        _StubClient.created.append(self)
+
+    def __getitem__(self, name):
+        return (self, name)
+
+
+class _StubAsyncClient(_StubClient):
+    async def close(self):
+        self.closed = True
+
+
+class _StubSyncClient(_StubClient):
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    _StubClient.created = []
+    monkeypatch.setattr(mongo_service, "AsyncMongoClient", _StubAsyncClient)
+    monkeypatch.setattr(mongo_service, "MongoClient", _StubSyncClient)
+    monkeypatch.setattr(MongoDatabaseManager, "_async_connection", None)
+    monkeypatch.setattr(MongoDatabaseManager, "_connection", None)
+    yield _StubClient.created
+
+
+def test_async_client_is_created_lazily_once_and_closed(clients):
+    assert clients == []
+    client, db_name = MongoDatabaseManager.get_async_connection()
+    assert MongoDatabaseManager.get_async_connection()[0] is client
+    assert clients == [client] and db_name == Config.MONGO_DB_NAME
+    assert client.uri == Config.MONGO_URI and client.options["maxPoolSize"] == Config.MONGO_MAX_POOL_SIZE
+
+    asyncio.run(MongoDatabaseManager.close_async_connection())
+    assert client.closed and MongoDatabaseManager._async_connection is None
+    # 重复关闭不报错，之后再次获取时重新创建
+    asyncio.run(MongoDatabaseManager.close_async_connection())
+    assert MongoDatabaseManager.get_async_connection()[0] is not client
+
+
+def test_sync_client_for_loaders_is_separate_from_the_async_client(clients):
+    sync_client = MongoDatabaseManager.get_connection()[0]
+    async_client = MongoDatabaseManager.get_async_connection()[0]
+    assert isinstance(sync_client, _StubSyncClient) and isinstance(async_client, _StubAsyncClient)
+
+    asyncio.run(MongoDatabaseManager.close_async_connection())
+    assert async_client.closed and not sync_client.closed
+    assert MongoDatabaseManager.get_connection()[0] is sync_client
+    MongoDatabaseManager.close_connection()
+    assert sync_client.closed and MongoDatabaseManager._connection is None
+
+
+def test_lifespan_opens_the_async_client_and_closes_both_clients_on_shutdown(clients, monkeypatch):
+    # 预热在启动时打开异步客户端
+    async def warm_up():
+        MongoDatabaseManager.get_async_connection()
+        return {"mongo": "ok"}
+
+    monkeypatch.setattr(main, "warm_up", warm_up)
+    monkeypatch.setattr(main.background_services, "start", lambda loop: None)
+    monkeypatch.setattr(main.background_services, "stop", lambda: None)
+    monkeypatch.setattr(main.SQLServerDatabaseManager, "close_connection", classmethod(lambda cls: None))
+
+    async def scenario():
+        async with main.lifespan(FastAPI()):
+            # 后台加载器在运行期间使用同步客户端
+            MongoDatabaseManager.get_connection()
+            return list(clients)
+
+    async_client, sync_client = asyncio.run(scenario())
+    assert isinstance(async_client, _StubAsyncClient) and isinstance(sync_client, _StubSyncClient)
+    assert async_client.closed and sync_client.closed
+    assert MongoDatabaseManager._async_connection is None and MongoDatabaseManager._connection is None
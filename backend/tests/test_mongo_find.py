@@ -0,0 +1,73 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import pytest
+from bson import ObjectId
+from backend.app.config import Config
+from backend.app.services.mongo_service import (
+    MongoDatabaseManager, _keyset_filter, _prepare_find, _page_token, find_documents
+)
+from backend.benchmarks.memory_mongo import MemoryMongoClient
+
+
+def test_keyset_filter_is_lexicographic_and_respects_direction():
+    oid = ObjectId()
+    assert _keyset_filter([("age", -1), ("_id", 1)], [30, oid]) == {"$or": [
+        {"age": {"$lt": 30}},
+        {"age": None},
+        {"age": 30, "_id": {"$gt": oid}},
+    ]}
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_pages_ending_on_null_or_missing_keys_do_not_skip_documents(direction):
+    documents = [{"_id": index, "age": age} for index, age in enumerate([None, 3, None, 1, 2, None])]
+    documents += [{"_id": 6}, {"_id": 7}]
+
+    async def scenario():
+        client = MemoryMongoClient()
+        MongoDatabaseManager._async_connection = client
+        await client[Config.MONGO_DB_NAME]["people"].insert_many(documents)
+        seen, token = [], None
+        while True:
+            page = await find_documents("people", sort=[["age", direction]], limit=2, continuation_token=token)
+            seen += [document["_id"] for document in page["documents"]]
+            token = page["continuation_token"]
+            if token is None:
+                return seen
+
+    try:
+        seen = asyncio.run(scenario())
+    finally:
+        MongoDatabaseManager._async_connection = None
+    nulls, values = [0, 2, 5, 6, 7], [3, 4, 1]
+    assert seen == (nulls + values if direction == 1 else values[::-1] + nulls[::-1])
+
+
+def test_id_tiebreaker_and_hidden_sort_fields():
+    query, projection, sort, hidden, _ = _prepare_find("users", {"active": True}, {"name": 1}, [["age", -1]], None)
+    assert sort == [("age", -1), ("_id", -1)]
+    assert projection == {"name": 1, "age": 1}
+    assert hidden == ["age"]
+    assert query == {"active": True}
+
+
+def test_continuation_token_round_trip_preserves_types():
+    oid = ObjectId()
+    _, _, sort, _, fingerprint = _prepare_find("users", {}, None, [["age", 1]], None)
+    token = _page_token(fingerprint, sort, {"_id": oid, "age": 30})
+    query, _, _, _, _ = _prepare_find("users", {}, None, [["age", 1]], token)
+    assert query == {"$or": [{"age": {"$gt": 30}}, {"age": 30, "_id": {"$gt": oid}}]}
+
+
+def test_token_from_another_query_is_rejected():
+    _, _, sort, _, fingerprint = _prepare_find("users", {}, None, [], None)
+    token = _page_token(fingerprint, sort, {"_id": ObjectId()})
+    with pytest.raises(ValueError):
+        _prepare_find("users", {"active": True}, None, [], token)
+    with pytest.raises(ValueError):
+        _prepare_find("users", {}, None, [], "not-a-token")
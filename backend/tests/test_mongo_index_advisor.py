@@ -0,0 +1,88 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from backend.app.services.mongo_index_advisor import (
+    IndexAdvisor, filter_shape, summarize_explain, build_index_models
+)
+
+
+def test_filter_shape_ignores_values():
+    first = filter_shape({"status": "A", "qty": {"$gt": 5}, "$and": [{"tags": {"$in": ["x"]}}]})
+    second = filter_shape({"status": "B", "qty": {"$gt": 99}, "$and": [{"tags": {"$in": ["y", "z"]}}]})
+    assert first == second == (("qty", "range"), ("status", "equality"), ("tags", "equality"))
+
+
+def test_slow_shape_triggers_single_explain():
+    advisor = IndexAdvisor(slow_ms=10, explain_interval=300)
+    assert advisor.record("orders", "update", {"a": 1}, 50)
+    assert not advisor.record("orders", "update", {"a": 2}, 50)
+    assert not advisor.record("orders", "update", {"b": 2}, 1)
+
+
+def test_advise_orders_equality_before_range_and_skips_covered():
+    advisor = IndexAdvisor(slow_ms=10)
+    for _ in range(3):
+        advisor.record("orders", "delete", {"qty": {"$lt": 3}, "status": "A", "sku": {"$exists": True}}, 40)
+    advisor.record("users", "update", {"email": "x"}, 40)
+
+    recommendations = advisor.advise({"users": [[("email", 1), ("name", 1)]]}, min_count=2)
+    assert recommendations == [{
+        "collection": "orders",
+        "keys": [["status", 1], ["qty", 1]],
+        "reason": "average 40.0 ms",
+        "observed": {"count": 3, "avg_ms": 40.0, "max_ms": 40.0},
+        "partial_filter_expression": {"sku": {"$exists": True}},
+    }]
+
+
+def test_equality_fields_in_any_order_followed_by_the_range_field_are_covered():
+    advisor = IndexAdvisor(slow_ms=10)
+    advisor.record("orders", "find", {"status": "A", "sku": "x", "qty": {"$gt": 1}}, 40)
+    # 形状中的等值字段按名称排序为 sku, status；已有索引为 status, sku, qty
+    assert advisor.advise({"orders": [[("status", 1), ("sku", 1), ("qty", -1)]]}) == []
+    assert advisor.advise({"orders": [[("status", 1), ("sku", 1), ("name", 1), ("qty", 1)]]})
+    assert advisor.advise({"orders": [[("status", 1), ("qty", 1), ("sku", 1)]]})
+
+
+def test_collection_scan_from_explain_is_advised_even_when_fast():
+    advisor = IndexAdvisor(slow_ms=1000)
+    advisor.record("orders", "update", {"status": "A"}, 1)
+    advisor.store_explain("orders", {"status": "B"}, {
+        "queryPlanner": {"winningPlan": {"stage": "UPDATE", "inputStage": {"stage": "COLLSCAN"}}}
+    })
+    assert advisor.advise({})[0]["reason"] == "collection scan"
+
+
+def test_summarize_explain_reports_index():
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "status_1"}
+    }}}
+    assert summarize_explain(explain) == {
+        "stages": ["FETCH", "IXSCAN"], "indexes": ["status_1"], "collection_scan": False
+    }
+
+
+def test_build_index_models_supports_compound_partial_and_ttl():
+    models = build_index_models([
+        {"field": "email", "unique": True},
+        {"keys": [["status", 1], ["created_at", -1]], "partial_filter_expression": {"status": {"$exists": True}}},
+        {"keys": {"expires_at": 1}, "expire_after_seconds": 0},
+    ])
+    documents = [model.document for model in models]
+    assert documents[0]["unique"] is True
+    assert list(documents[1]["key"].items()) == [("status", 1), ("created_at", -1)]
+    assert documents[1]["partialFilterExpression"] == {"status": {"$exists": True}}
+    assert documents[2]["expireAfterSeconds"] == 0
+
+
+def test_build_index_models_rejects_invalid_specs():
+    with pytest.raises(ValueError):
+        build_index_models([{"keys": [["a", 2]]}])
+    with pytest.raises(ValueError):
+        build_index_models([{"keys": [["a", 1], ["b", 1]], "expire_after_seconds": 10}])
+    with pytest.raises(ValueError):
+        build_index_models([{"unique": True}])
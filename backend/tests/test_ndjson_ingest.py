@@ -0,0 +1,100 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import gzip
+import json
+import pytest
+from pymongo.errors import BulkWriteError
+from backend.app.config import Config
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services import ndjson_ingest
+from backend.app.services.ndjson_ingest import ingest_ndjson
+from backend.benchmarks.memory_mongo import MemoryMongoClient
+
+
+@pytest.fixture
+def memory_mongo(monkeypatch):
+    client = MemoryMongoClient()
+    monkeypatch.setattr(MongoDatabaseManager, "_async_connection", client)
+    return client[Config.MONGO_DB_NAME]
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _ingest(data: bytes, chunk_size: int = 7, **kwargs) -> dict:
+    return asyncio.run(ingest_ndjson("events", _chunks(data, chunk_size), **kwargs))
+
+
+def test_ingest_flushes_fixed_size_batches(memory_mongo):
+    data = "".join(json.dumps({"n": n}) + "\n" for n in range(10)).encode()
+    result = _ingest(data, batch_size=4)
+    assert result["status"] == "success"
+    assert result["inserted_count"] == 10
+    assert [batch["inserted"] for batch in result["batches"]] == [4, 4, 2]
+    assert result["batches"][1]["first_line"] == 5 and result["batches"][1]["last_line"] == 8
+    assert len(memory_mongo["events"]._documents) == 10
+
+
+def test_gzip_chunk_with_many_lines_buffers_at_most_one_batch(memory_mongo, monkeypatch):
+    buffered = []
+    flush = ndjson_ingest._flush
+
+    async def recording_flush(collection, documents, line_numbers, report):
+        # 已解析但尚未写入的文档数
+        buffered.append(report.lines - report.inserted_count)
+        await flush(collection, documents, line_numbers, report)
+
+    monkeypatch.setattr(ndjson_ingest, "_flush", recording_flush)
+    data = gzip.compress(b'{"a": 1}\n' * 20000)
+    result = _ingest(data, chunk_size=len(data), batch_size=10)
+    assert result["inserted_count"] == 20000
+    assert max(buffered) == 10
+
+
+def test_ingest_reports_rejected_lines_with_physical_line_numbers(memory_mongo):
+    data = b'{"a": 1}\n\nnot json\n[1, 2]\n{"a": 2}'
+    result = _ingest(data)
+    assert result["status"] == "success"
+    assert result["lines"] == 5
+    assert result["inserted_count"] == 2
+    assert [rejection["line"] for rejection in result["rejected"]] == [3, 4]
+    assert result["rejected"][1]["error"] == "Expected a JSON object."
+
+
+def test_ingest_decompresses_multi_member_gzip(memory_mongo):
+    data = gzip.compress(b'{"a": 1}\n{"a": 2}\n') + gzip.compress(b'{"a": 3}\n')
+    result = _ingest(data, chunk_size=5)
+    assert result["inserted_count"] == 3
+    assert _ingest(b"\x1f\x8b not gzip", compressed=True)["status"] == "error"
+
+
+def test_ingest_stops_after_max_rejected_and_skips_oversized_lines(memory_mongo, monkeypatch):
+    monkeypatch.setattr(Config, "NDJSON_MAX_LINE_BYTES", 32)
+    data = b'{"a": 1}\n{"padding": "' + b"x" * 100 + b'"}\n{"a": 2}\n'
+    result = _ingest(data)
+    assert result["inserted_count"] == 2
+    assert result["rejected"][0]["line"] == 2
+
+    result = _ingest(b"bad\n" * 5 + b'{"a": 3}\n', chunk_size=4, max_rejected=2)
+    assert result["status"] == "error"
+    assert result["inserted_count"] == 0
+
+
+def test_ingest_maps_bulk_write_errors_to_lines(monkeypatch):
+    class Collection:
+        async def insert_many(self, documents, ordered=True):
+            assert ordered is False
+            raise BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key"}], "nInserted": 2})
+
+    monkeypatch.setattr(MongoDatabaseManager, "get_async_connection", classmethod(lambda cls: {"events": Collection()}))
+    result = _ingest(b'{"_id": 1}\n{"_id": 1}\n{"_id": 2}\n')
+    assert result["inserted_count"] == 2
+    assert result["rejected"] == [{"line": 2, "error": "E11000 duplicate key"}]
+    assert result["batches"][0]["failed"] == 1
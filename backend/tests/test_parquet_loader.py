@@ -0,0 +1,137 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import HTTPException
+from backend.app.config import Config
+from backend.app.routes.parquet_routes import _resolve_data_path
+from backend.app.services.parquet_loader import load_parquet
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fast_executemany = False
+
+    def execute(self, query, *params):
+        pass
+
+    def executemany(self, query, rows):
+        self.conn.table.executed.append(len(rows))
+        for row in rows:
+            if row[0] in self.conn.table.committed + self.conn.pending:
+                raise RuntimeError(f"Violation of PRIMARY KEY constraint: duplicate key ({row[0]})")
+            self.conn.pending.append(row[0])
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    只记录主键的单表连接：executemany 写入未提交区，commit 后才可见，rollback 丢弃。
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.table.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeTable:
+    def __init__(self):
+        self.committed = []
+        self.executed = []
+
+
+@pytest.fixture
+def parquet_source(tmp_path, monkeypatch):
+    # 3 个行组，每组 4 行
+    path = str(tmp_path / "items.parquet")
+    pq.write_table(pa.table({"id": list(range(12)), "name": [f"item {i}" for i in range(12)]}), path, row_group_size=4)
+
+    table = FakeTable()
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: FakeConnection(table)))
+    SQLServerDatabaseManager.close_connection()
+    yield path, table
+    SQLServerDatabaseManager.close_connection()
+
+
+def test_row_groups_are_written_in_batches(parquet_source):
+    path, table = parquet_source
+    progress = []
+    result = load_parquet(path, "sql_server", "items", batch_size=3, column_mapping={"id": "id", "name": "label"},
+                          progress_callback=progress.append)
+    assert result["status"] == "success", result
+    assert result["rows_loaded"] == 12 and result["next_row_group"] == result["num_row_groups"] == 3
+    # 批次不跨行组：每个 4 行的行组分为 3 + 1
+    assert table.executed == [3, 1, 3, 1, 3, 1]
+    assert [(item["row_group"], item["rows_done"]) for item in progress] == [(0, 4), (1, 8), (2, 12)]
+    assert sorted(table.committed) == list(range(12))
+
+
+def test_failed_row_group_is_rolled_back_and_resumed_from_next_row_group(parquet_source):
+    path, table = parquet_source
+    table.committed.append(6)
+    mapping = {"id": "id", "name": "label"}
+
+    failed = load_parquet(path, "sql_server", "items", batch_size=3, column_mapping=mapping)
+    assert failed["status"] == "error"
+    assert failed["rows_loaded"] == 4 and failed["next_row_group"] == 1
+    # 行组 1 的第一批已写入，失败时整个行组回滚
+    assert sorted(table.committed) == [0, 1, 2, 3, 6]
+
+    table.committed.remove(6)
+    resumed = load_parquet(path, "sql_server", "items", batch_size=3, column_mapping=mapping,
+                           start_row_group=failed["next_row_group"])
+    assert resumed["status"] == "success", resumed
+    assert resumed["rows_loaded"] == 8
+    assert sorted(table.committed) == list(range(12))
+
+
+def test_invalid_start_row_group_and_unknown_column_are_errors(parquet_source):
+    path, table = parquet_source
+    assert load_parquet(path, "sql_server", "items", start_row_group=4)["status"] == "error"
+    assert load_parquet(path, "sql_server", "items", column_mapping={"missing": "id"})["status"] == "error"
+    assert table.executed == []
+
+
+def test_resolve_data_path_rejects_paths_outside_the_data_directory(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "inside.parquet").write_bytes(b"")
+    (tmp_path / "data_other").mkdir()
+    (tmp_path / "data_other" / "outside.parquet").write_bytes(b"")
+    (tmp_path / "secret.parquet").write_bytes(b"")
+    monkeypatch.setattr(Config, "PARQUET_DATA_DIR", str(data_dir))
+
+    assert _resolve_data_path("inside.parquet") == os.path.realpath(data_dir / "inside.parquet")
+    for path in ("../secret.parquet", "sub/../../secret.parquet", "../data_other/outside.parquet",
+                 str(tmp_path / "secret.parquet")):
+        with pytest.raises(HTTPException) as error:
+            _resolve_data_path(path)
+        assert error.value.status_code == 400, path
+    with pytest.raises(HTTPException) as error:
+        _resolve_data_path("missing.parquet")
+    assert error.value.status_code == 404
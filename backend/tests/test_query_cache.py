@@ -0,0 +1,69 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.app.services.query_cache import QueryCache, extract_tables, normalize_query
+
+
+def test_extract_tables_handles_joins_and_schemas():
+    query = "SELECT * FROM dbo.[Orders] o JOIN Customers c ON o.cid = c.id LEFT JOIN \"Items\" i ON i.oid = o.id"
+    assert extract_tables(query) == {"orders", "customers", "items"}
+
+
+def test_extract_tables_handles_comma_separated_from_lists():
+    assert extract_tables("SELECT * FROM a, b WHERE a.id = b.aid") == {"a", "b"}
+    assert extract_tables("SELECT * FROM dbo.a AS x WITH (NOLOCK), [b] y, c JOIN d ON c.id = d.id") == {"a", "b", "c", "d"}
+
+
+def test_uncertain_references_are_not_cacheable():
+    assert extract_tables("WITH recent AS (SELECT * FROM a) SELECT * FROM recent") == frozenset()
+    assert extract_tables("SELECT * FROM a CROSS APPLY b(a.id)") == frozenset()
+    assert extract_tables("SELECT * FROM dbo.fn_orders(1) o JOIN b ON b.id = o.id") == frozenset()
+    cache = QueryCache(max_entries=10, ttl=60)
+    assert cache.put("q", {"data": []}, frozenset(), ()) is False
+
+
+def test_normalize_query_ignores_whitespace():
+    assert normalize_query("SELECT *\n  FROM t ;") == normalize_query("SELECT * FROM t")
+
+
+def test_cache_hit_and_table_invalidation():
+    cache = QueryCache(max_entries=10, ttl=60)
+    tables = extract_tables("SELECT * FROM t1 JOIN t2 ON t1.id = t2.id")
+    cache.put("q", {"data": [1]}, tables, cache.snapshot(tables))
+    assert cache.get("q")[0] == {"data": [1]}
+
+    assert cache.invalidate_table("[dbo].[T2]") == 1
+    assert cache.get("q") == (None, None)
+
+
+def test_stale_snapshot_is_not_cached():
+    cache = QueryCache(max_entries=10, ttl=60)
+    tables = frozenset({"t"})
+    snapshot = cache.snapshot(tables)
+    cache.invalidate_table("t")  # 查询执行期间发生了写操作
+    assert not cache.put("q", {"data": []}, tables, snapshot)
+    assert cache.get("q") == (None, None)
+
+
+def test_lru_eviction_and_row_limit():
+    cache = QueryCache(max_entries=2, ttl=60, max_rows=5)
+    tables = frozenset({"t"})
+    for key in ("a", "b"):
+        cache.put(key, key, tables, cache.snapshot(tables))
+    cache.get("a")
+    cache.put("c", "c", tables, cache.snapshot(tables))
+    assert cache.get("b") == (None, None)
+    assert cache.get("a")[0] == "a"
+    assert not cache.put("big", "big", tables, cache.snapshot(tables), row_count=6)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_max_age_and_ttl():
+    cache = QueryCache(max_entries=2, ttl=0)
+    tables = frozenset({"t"})
+    cache.put("q", "v", tables, cache.snapshot(tables))
+    assert cache.get("q") == (None, None)
+    assert cache.stats()["expirations"] == 1
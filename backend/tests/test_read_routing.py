@@ -0,0 +1,136 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import time
+import pytest
+from pymongo import MongoClient
+from pymongo.read_concern import ReadConcern
+from backend.app.config import Config
+from backend.app.services.query_cache import query_cache
+from backend.app.services.read_routing import ReadRouting, resolve_routing
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, join_tables
+from backend.benchmarks import sqlite_odbc
+
+
+def test_resolve_routing_applies_endpoint_defaults_and_rejects_invalid_overrides(monkeypatch):
+    monkeypatch.setattr(Config, "ENDPOINT_READ_PREFERENCE", {"mongo.find": "nearest"})
+    assert resolve_routing("sqlserver.join_tables").preference == Config.READ_PREFERENCE_DEFAULT == "primary"
+    assert resolve_routing("mongo.find").preference == "nearest"
+    assert resolve_routing("sqlserver.join_tables", "primary", 30).max_staleness is None
+    assert resolve_routing("sqlserver.join_tables", "secondary", 5).max_staleness == 5
+    # 未列出的端点视为写端点
+    assert resolve_routing("sqlserver.insert_data").is_primary
+    with pytest.raises(ValueError):
+        resolve_routing("sqlserver.insert_data", "secondary")
+    with pytest.raises(ValueError):
+        resolve_routing("mongo.find", "secondary", 30)
+    with pytest.raises(ValueError):
+        resolve_routing("federated.join", "secondary", read_concern="linearizable")
+    with pytest.raises(ValueError):
+        resolve_routing("mongo.find", "fastest")
+
+
+def test_mongo_options_carry_read_preference_staleness_and_concern():
+    options = ReadRouting("secondaryPreferred", 120, "majority").mongo_options()
+    db = MongoClient("mongodb://localhost:27017", connect=False)["mydb"].with_options(**options)
+    assert db.read_preference.mongos_mode == "secondaryPreferred"
+    assert db.read_preference.max_staleness == 120
+    assert db.read_concern == ReadConcern("majority")
+    assert ReadRouting().mongo_options()["read_preference"].mongos_mode == "primary"
+
+
+@pytest.fixture
+def replica_setup(tmp_path, monkeypatch):
+    """
+    两个 SQLite 文件分别充当主库和只读副本，各放一行可区分来源的数据。
+    """
+    paths = {}
+    for name in ("primary", "replica"):
+        paths[name] = str(tmp_path / f"{name}.db")
+        conn = sqlite_odbc.Connection(paths[name])
+        conn.cursor().execute("CREATE TABLE source (name TEXT)")
+        conn.cursor().execute("INSERT INTO source VALUES (?)", [name])
+        conn.commit()
+        conn.close()
+    state = {"replica_up": True}
+
+    def connect_replica(host, port):
+        if not state["replica_up"]:
+            raise ConnectionError("replica is down")
+        return sqlite_odbc.Connection(paths["replica"])
+
+    monkeypatch.setattr(Config, "get_sql_server_connection",
+                        staticmethod(lambda: sqlite_odbc.Connection(paths["primary"])))
+    monkeypatch.setattr(Config, "get_sql_server_read_connection", staticmethod(connect_replica))
+    monkeypatch.setattr(Config, "SQL_SERVER_READ_REPLICAS", [("replica", 1433)])
+    monkeypatch.setattr(Config, "SQL_SERVER_REPLICA_CHECK_SECONDS", 60)
+    monkeypatch.setattr(Config, "SQL_SERVER_REPLICA_LAG_QUERY", "SELECT lag FROM replica_lag")
+    monkeypatch.setattr(Config, "CATALOG_VALIDATE_INSERTS", False)
+    conn = sqlite_odbc.Connection(paths["replica"])
+    conn.cursor().execute("CREATE TABLE replica_lag (lag INT)")
+    conn.cursor().execute("INSERT INTO replica_lag VALUES (0)")
+    conn.commit()
+
+    def set_lag(seconds):
+        conn.cursor().execute("UPDATE replica_lag SET lag = ?", [seconds])
+        conn.commit()
+        probe()
+
+    def probe():
+        # 后台线程每 60 秒测量一次，测试中改变副本状态后立即测量
+        SQLServerDatabaseManager.get_replicas().check_all()
+
+    state["set_lag"] = set_lag
+    state["probe"] = probe
+    query_cache.clear()
+    SQLServerDatabaseManager.close_connection()
+    yield state
+    SQLServerDatabaseManager.close_connection()
+    conn.close()
+
+
+def _source(routing, use_cache: bool = False) -> str:
+    result = join_tables("SELECT name FROM source", use_cache=use_cache, store_cache=use_cache, routing=routing)
+    if result["status"] == "error":
+        return result["message"]
+    return result["data"][0]["name"]
+
+
+def test_only_primary_results_are_cached_and_staleness_bounds_their_age(replica_setup):
+    replica_setup["probe"]()
+    assert _source(ReadRouting("secondaryPreferred"), use_cache=True) == "replica"
+    # 副本读到的结果不缓存，主库读取不会拿到它
+    assert _source(ReadRouting("primary"), use_cache=True) == "primary"
+    # 主库的缓存项足够新时，副本读取也可以使用
+    assert _source(ReadRouting("secondaryPreferred", 60), use_cache=True) == "primary"
+    time.sleep(0.1)
+    assert _source(ReadRouting("secondaryPreferred", 0.05), use_cache=True) == "replica"
+
+
+def test_sql_reads_route_to_replica_within_staleness(replica_setup):
+    replica_setup["probe"]()
+    assert _source(None) == "primary"
+    assert sorted(_source(ReadRouting("nearest")) for _ in range(4)) == ["primary"] * 2 + ["replica"] * 2
+
+    replica_setup["set_lag"](30)
+    assert _source(ReadRouting("secondaryPreferred", 10)) == "primary"
+    assert "No read replica" in _source(ReadRouting("secondary", 10))
+    assert _source(ReadRouting("secondary", 60)) == "replica"
+
+    # 延迟未知的副本不满足有界延迟的读取，但仍可用于不限延迟的读取
+    replica_setup["set_lag"](None)
+    assert _source(ReadRouting("secondaryPreferred", 60)) == "primary"
+    assert _source(ReadRouting("secondary")) == "replica"
+
+
+def test_sql_reads_fall_back_when_replica_is_unavailable(replica_setup):
+    replica_setup["replica_up"] = False
+    replica_setup["probe"]()
+    assert _source(ReadRouting("secondaryPreferred")) == "primary"
+    assert "No read replica" in _source(ReadRouting("secondary"))
+    replica_setup["replica_up"] = True
+    replica_setup["probe"]()
+    assert _source(ReadRouting("secondary")) == "replica"
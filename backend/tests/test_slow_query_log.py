@@ -0,0 +1,111 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import threading
+from backend.app.config import Config
+from backend.app.services import mongo_service
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.app.services.slow_query_log import SlowQueryLog, normalize_statement, worker_log_path
+from backend.benchmarks.memory_mongo import MemoryMongoClient
+
+
+def test_literals_are_normalized_away():
+    a = normalize_statement("SELECT * FROM t1 WHERE id IN (1, 2, 3) AND name = N'o''brien' -- note")
+    b = normalize_statement("SELECT * FROM t1 WHERE id IN (7) AND name = 'x';")
+    assert a == b == "SELECT * FROM t1 WHERE id IN (?...) AND name = ?"
+
+
+def test_each_worker_process_writes_its_own_log_file(monkeypatch):
+    path = os.path.join("logs", "slow_queries.jsonl")
+    assert worker_log_path(path) == path
+    monkeypatch.setattr(Config, "SERVER_WORKERS", 4)
+    assert worker_log_path(path) == os.path.join("logs", f"slow_queries.{os.getpid()}.jsonl")
+
+
+def test_top_groups_by_fingerprint_and_keeps_latest_plan(tmp_path):
+    log = SlowQueryLog(str(tmp_path / "slow.jsonl"), threshold_ms=100)
+    assert not log.is_slow(50) and log.is_slow(100)
+    log.record("sqlserver", "join_tables", "SELECT ?", 200, rows=10, plan="<plan/>", plan_format="showplan_xml")
+    log.record("sqlserver", "join_tables", "SELECT ?", 400, rows=5)
+    log.record("mongo", "find", '{"op": "find"}', 150)
+
+    top = log.top()
+    assert [group["backend"] for group in top] == ["sqlserver", "mongo"]
+    assert top[0]["count"] == 2
+    assert top[0]["avg_ms"] == 300
+    assert top[0]["max_rows"] == 10
+    assert top[0]["plan"] == "<plan/>"
+    assert log.top(backend="mongo", include_plans=False)[0].keys().isdisjoint({"plan"})
+
+
+def test_log_rotates_and_reads_backups(tmp_path):
+    log = SlowQueryLog(str(tmp_path / "slow.jsonl"), max_bytes=300, backup_count=2)
+    for index in range(10):
+        log.record("sqlserver", "update_data", f"UPDATE t{index} SET a = ?", 600)
+    assert os.path.exists(str(tmp_path / "slow.jsonl.1"))
+    assert 0 < sum(1 for _ in log.entries()) < 10
+
+
+def test_plan_capture_is_rate_limited_per_fingerprint(tmp_path):
+    log = SlowQueryLog(str(tmp_path / "slow.jsonl"), plan_interval=60)
+    assert log.should_capture_plan("abc")
+    assert not log.should_capture_plan("abc")
+    assert log.should_capture_plan("def")
+
+
+def test_slow_mongo_operation_is_logged_off_the_event_loop(tmp_path, monkeypatch):
+    log = SlowQueryLog(str(tmp_path / "slow.log"))
+    threads = []
+    record = log.record
+
+    def recording(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return record(*args, **kwargs)
+
+    monkeypatch.setattr(log, "record", recording)
+    monkeypatch.setattr(mongo_service, "slow_query_log", log)
+    monkeypatch.setattr(MongoDatabaseManager, "_async_connection", MemoryMongoClient())
+
+    async def scenario():
+        await mongo_service._explain_filter("orders", {"status": "A"}, advise=False,
+                                            slow={"operation": "find", "duration_ms": 500.0, "rows": 3})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert log.top(backend="mongo")[0]["operations"] == ["find"]
+
+
+def test_writes_are_explained_as_the_command_that_ran_and_inserts_are_logged(tmp_path, monkeypatch):
+    log = SlowQueryLog(str(tmp_path / "slow.log"), threshold_ms=0)
+    client = MemoryMongoClient()
+    explained = []
+    db = client[Config.MONGO_DB_NAME]
+    command = db.command
+
+    async def recording(name, spec=None, **kwargs):
+        explained.append(spec)
+        return await command(name, spec, **kwargs)
+
+    db.command = recording
+    monkeypatch.setattr(mongo_service, "slow_query_log", log)
+    monkeypatch.setattr(MongoDatabaseManager, "_async_connection", client)
+
+    async def scenario():
+        await mongo_service.insert_data("orders", [{"status": "A"}, {"status": "B"}])
+        await mongo_service.update_data("orders", {"status": "A"}, {"status": "C"}, multi=True)
+        await mongo_service.delete_data("orders", {"status": "B"})
+        await asyncio.gather(*mongo_service._background_tasks)
+
+    asyncio.run(scenario())
+    assert {"update": "orders", "updates": [{"q": {"status": "A"}, "u": {"$set": {"status": "C"}}, "multi": True}]} \
+        in explained
+    assert {"delete": "orders", "deletes": [{"q": {"status": "B"}, "limit": 1}]} in explained
+    assert all("find" not in spec for spec in explained)
+    operations = {group["operations"][0]: group for group in log.top(backend="mongo")}
+    assert set(operations) == {"insert", "update", "delete"}
+    assert operations["insert"]["max_rows"] == 2 and operations["insert"]["plan"] is None
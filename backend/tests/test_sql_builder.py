@@ -0,0 +1,49 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from backend.app.services.sql_builder import (
+    build_filter_shape, compile_update, compile_delete, input_sizes, quote_identifier, SQL_WVARCHAR
+)
+
+
+def test_same_shape_with_different_literals_compiles_to_same_statement():
+    shape_a, params_a = build_filter_shape([{"column": "id", "op": "=", "value": 1}])
+    shape_b, params_b = build_filter_shape([{"column": "id", "op": "=", "value": 2}])
+    assert shape_a == shape_b
+    assert compile_delete("orders", shape_a) == "DELETE FROM [orders] WHERE [id] = ?"
+    assert (params_a, params_b) == ([1], [2])
+
+
+def test_in_lists_are_padded_to_power_of_two():
+    shape, params = build_filter_shape([{"column": "id", "op": "in", "value": [1, 2, 3, 4, 5]}])
+    assert shape == (("id", "in", 8),)
+    assert params == [1, 2, 3, 4, 5, 5, 5, 5]
+
+
+def test_compile_update_with_mixed_operators():
+    shape, params = build_filter_shape([
+        {"column": "price", "op": "between", "value": [1, 10]},
+        {"column": "deleted_at", "op": "is_null"},
+    ])
+    query = compile_update("dbo.items", ("price", "name"), shape)
+    assert query == "UPDATE [dbo].[items] SET [price] = ?, [name] = ? WHERE [price] BETWEEN ? AND ? AND [deleted_at] IS NULL"
+    assert params == [1, 10]
+
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(ValueError):
+        quote_identifier("name; DROP TABLE users")
+    with pytest.raises(ValueError):
+        build_filter_shape([{"column": "id", "op": "regex", "value": 1}])
+    with pytest.raises(ValueError):
+        build_filter_shape([{"column": "id", "op": "in", "value": []}])
+    with pytest.raises(ValueError):
+        compile_delete("orders", ())
+
+
+def test_string_parameters_get_fixed_input_size():
+    assert input_sizes(["abc", 1, None]) == [(SQL_WVARCHAR, 4000, 0), None, None]
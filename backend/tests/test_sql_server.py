@@ -0,0 +1,126 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.config import Config
+from backend.app.routes.sql_server_routes import router as sql_server_router
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, bulk_insert_data
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fast_executemany = False
+
+    def execute(self, query, *params):
+        pass
+
+    def executemany(self, query, rows):
+        self.conn.calls.append((query, self.fast_executemany, len(rows)))
+        for row in rows:
+            if row[0] in self.conn.table.committed + self.conn.pending:
+                raise RuntimeError(f"Violation of PRIMARY KEY constraint: duplicate key ({row[0]})")
+            self.conn.pending.append(row[0])
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    只记录主键的单表连接：executemany 写入未提交区，commit 后才可见，rollback 丢弃。
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+        self.calls = table.calls
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.table.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeTable:
+    def __init__(self, committed):
+        self.committed = list(committed)
+        self.calls = []
+
+
+@pytest.fixture
+def items(monkeypatch):
+    table = FakeTable([1])
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: FakeConnection(table)))
+    monkeypatch.setattr(Config, "CATALOG_VALIDATE_INSERTS", False)
+    SQLServerDatabaseManager.close_connection()
+    yield table
+    SQLServerDatabaseManager.close_connection()
+
+
+def test_bulk_insert_splits_rows_into_chunks(items):
+    rows = [[id_, f"item {id_}"] for id_ in range(2, 7)]
+    result = bulk_insert_data("items", ["id", "name"], rows, chunk_size=2)
+    assert result["status"] == "success", result
+    assert result["inserted_count"] == 5
+    assert result["chunks"] == [
+        {"chunk": 0, "start_row": 0, "row_count": 2, "status": "success"},
+        {"chunk": 1, "start_row": 2, "row_count": 2, "status": "success"},
+        {"chunk": 2, "start_row": 4, "row_count": 1, "status": "success"},
+    ]
+    assert items.calls == [("INSERT INTO items (id, name) VALUES (?, ?)", True, size) for size in (2, 2, 1)]
+    assert items.committed == [1, 2, 3, 4, 5, 6]
+
+
+def test_failing_chunk_rolls_back_every_chunk(items):
+    rows = [[2, "a"], [3, "b"], [4, "c"], [1, "duplicate"], [5, "d"]]
+    result = bulk_insert_data("items", ["id", "name"], rows, chunk_size=2)
+    assert result["status"] == "error"
+    assert "chunk 1" in result["message"] and "rolled back" in result["message"]
+    assert [chunk["status"] for chunk in result["chunks"]] == ["rolled_back", "error"]
+    assert "duplicate key" in result["chunks"][1]["message"]
+    assert items.committed == [1]
+
+
+def test_rows_with_wrong_width_are_rejected_before_writing(items):
+    result = bulk_insert_data("items", ["id", "name"], [[2, "a"], [3]])
+    assert result == {"status": "error", "message": "Row 1 has 1 values, expected 2."}
+    assert items.calls == []
+
+
+def test_bulk_insert_endpoint_reports_chunks(items):
+    app = FastAPI()
+    app.include_router(sql_server_router, prefix="/sqlserver")
+    client = TestClient(app)
+
+    inserted = client.post("/sqlserver/bulk_insert_data", json={
+        "table_name": "items", "columns": ["id", "name"], "rows": [[2, "a"], [3, "b"], [4, "c"]], "chunk_size": 2,
+    })
+    failed = client.post("/sqlserver/bulk_insert_data", json={
+        "table_name": "items", "columns": ["id", "name"], "rows": [[5, "d"], [2, "duplicate"]], "chunk_size": 1,
+    })
+    empty = client.post("/sqlserver/bulk_insert_data", json={"table_name": "items", "columns": ["id"], "rows": []})
+
+    assert inserted.status_code == 200
+    assert inserted.json()["inserted_count"] == 3
+    assert [chunk["row_count"] for chunk in inserted.json()["chunks"]] == [2, 1]
+    assert failed.status_code == 400
+    assert [chunk["status"] for chunk in failed.json()["detail"]["chunks"]] == ["rolled_back", "error"]
+    assert empty.status_code == 422
+    assert items.committed == [1, 2, 3, 4]
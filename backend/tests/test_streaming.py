@@ -0,0 +1,44 @@
+import sys
+import os
+import datetime
+import decimal
+import json
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import pytest
+from backend.app.services.streaming import (
+    encode_continuation_token, decode_continuation_token, iter_ndjson, iter_json_document
+)
+
+
+def test_continuation_token_round_trip():
+    payload = {"q": "abc", "k": "id", "v": 42}
+    assert decode_continuation_token(encode_continuation_token(payload)) == payload
+
+
+def test_invalid_continuation_token_is_rejected():
+    with pytest.raises(ValueError):
+        decode_continuation_token("not-a-token!")
+
+
+def test_ndjson_encodes_rows_and_trailer():
+    batches = [[(1, decimal.Decimal("1.50"))], [(2, datetime.date(2024, 1, 2))]]
+    lines = "".join(iter_ndjson(["id", "value"], iter(batches), lambda: {"continuation_token": None}))
+    records = [json.loads(line) for line in lines.splitlines()]
+    assert records == [
+        {"id": 1, "value": "1.50"},
+        {"id": 2, "value": "2024-01-02"},
+        {"continuation_token": None},
+    ]
+
+
+def test_json_document_is_valid_json():
+    batches = [[(1,), (2,)], [], [(3,)]]
+    body = "".join(iter_json_document(["id"], iter(batches), lambda: {"continuation_token": "x"}))
+    assert json.loads(body) == {
+        "status": "success",
+        "data": [{"id": 1}, {"id": 2}, {"id": 3}],
+        "continuation_token": "x",
+    }
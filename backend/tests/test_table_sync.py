@@ -0,0 +1,113 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import decimal
+import datetime
+from types import SimpleNamespace
+import pytest
+from bson import Decimal128
+from pymongo import ReplaceOne
+from backend.app.config import Config
+from backend.app.services import table_sync
+from backend.app.services.sql_server_service import SQLServerDatabaseManager
+from backend.app.services.mongo_service import MongoDatabaseManager
+from backend.benchmarks import sqlite_odbc
+
+
+class _Collection:
+    def __init__(self):
+        self.documents = {}
+        self.batches = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.batches.append(len(requests))
+        matched = upserted = deleted = 0
+        for request in requests:
+            key = request._filter["_id"]
+            if isinstance(request, ReplaceOne):
+                matched += key in self.documents
+                upserted += key not in self.documents
+                self.documents[key] = request._doc
+            else:
+                deleted += self.documents.pop(key, None) is not None
+        return SimpleNamespace(matched_count=matched, upserted_count=upserted, deleted_count=deleted)
+
+    def delete_many(self, filter_query):
+        threshold = filter_query[table_sync.SYNCED_AT_FIELD]["$lt"]
+        stale = [key for key, document in self.documents.items() if document[table_sync.SYNCED_AT_FIELD] < threshold]
+        for key in stale:
+            del self.documents[key]
+        return SimpleNamespace(deleted_count=len(stale))
+
+
+def _rv(value: int) -> bytes:
+    return value.to_bytes(8, "big")
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "sync.db")
+    conn = sqlite_odbc.connect()
+    conn.cursor().execute("CREATE TABLE items (id INT PRIMARY KEY, name TEXT, deleted INT, rv BLOB)")
+    conn.cursor().executemany("INSERT INTO items VALUES (?, ?, ?, ?)",
+                              [(1, "a", 0, _rv(1)), (2, "b", 0, _rv(2)), (3, "c", 0, _rv(3))])
+    conn.commit()
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    monkeypatch.setattr(table_sync, "sync_store", table_sync.SyncStore(str(tmp_path / "state")))
+    SQLServerDatabaseManager.close_connection()
+    collection = _Collection()
+    monkeypatch.setattr(MongoDatabaseManager, "get_connection", classmethod(lambda cls: {"items_copy": collection}))
+    yield conn, collection
+    conn.close()
+    SQLServerDatabaseManager.close_connection()
+
+
+def test_rowversion_sync_applies_only_changes_and_persists_checkpoint(source):
+    conn, collection = source
+    result = table_sync.define_sync("items", "items", "items_copy", ["id"], mode="rowversion",
+                                    rowversion_column="rv", deleted_column="deleted", batch_size=2)
+    assert result["status"] == "success"
+
+    first = table_sync.run_sync("items")
+    assert first["status"] == "success" and first["full_load"] is True
+    assert first["upserted"] == 3 and collection.batches == [2, 1]
+    assert set(collection.documents) == {1, 2, 3} and "rv" not in collection.documents[1]
+
+    conn.cursor().execute("UPDATE items SET name = 'b2', rv = ? WHERE id = 2", [_rv(4)])
+    conn.cursor().execute("UPDATE items SET deleted = 1, rv = ? WHERE id = 3", [_rv(5)])
+    conn.commit()
+    collection.batches.clear()
+    second = table_sync.run_sync("items")
+    assert second["full_load"] is False
+    assert (second["upserted"], second["deleted"]) == (1, 1)
+    assert collection.batches == [2]
+    assert collection.documents[2]["name"] == "b2" and 3 not in collection.documents
+
+    state = table_sync.sync_store.get("items")
+    assert state["checkpoint"] == {"rowversion": _rv(5).hex()}
+    assert table_sync.sync_status(state)["lag_seconds"] >= 0
+    assert table_sync.run_sync("items")["upserted"] == 0
+
+
+def test_changing_identity_clears_checkpoint_and_reset_forces_full_load(source):
+    table_sync.define_sync("items", "items", "items_copy", ["id"], mode="rowversion", rowversion_column="rv")
+    table_sync.run_sync("items")
+    assert table_sync.sync_store.get("items")["checkpoint"] is not None
+    table_sync.define_sync("items", "items", "items_copy", ["id"], mode="rowversion", rowversion_column="rv",
+                           interval_seconds=5)
+    assert table_sync.sync_store.get("items")["checkpoint"] is not None
+    table_sync.define_sync("items", "items", "items_copy", ["id", "name"], mode="rowversion", rowversion_column="rv")
+    assert table_sync.sync_store.get("items")["checkpoint"] is None
+    table_sync.run_sync("items")
+    assert table_sync.reset_sync("items")["sync"]["checkpoint"] is None
+
+
+def test_invalid_definitions_and_bson_conversion():
+    assert table_sync.define_sync("x", "items", "c", ["id"], mode="rowversion")["status"] == "error"
+    assert table_sync.define_sync("x", "items; DROP", "c", ["id"])["status"] == "error"
+    assert table_sync.define_sync("../x", "items", "c", ["id"])["status"] == "error"
+    assert table_sync._to_bson(decimal.Decimal("1.5")) == Decimal128("1.5")
+    assert table_sync._to_bson(datetime.date(2024, 1, 2)) == datetime.datetime(2024, 1, 2)
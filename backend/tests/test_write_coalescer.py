@@ -0,0 +1,133 @@
+import sys
+import os
+
+# 添加项目根目录到 Python 搜索路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+import pymongo
+from pymongo import _csot
+from backend.app.config import Config
+from backend.app.services import admission
+from backend.app.services.admission import RequestContext, current_request
+from backend.app.services.write_coalescer import WriteCoalescer, AsyncWriteCoalescer
+from backend.app.services.sql_server_service import SQLServerDatabaseManager, insert_data_batch
+from backend.benchmarks import sqlite_odbc
+
+
+def test_thread_coalescer_merges_concurrent_calls_and_returns_each_result():
+    flushed = []
+
+    def flush(key, items):
+        flushed.append((key, list(items)))
+        return [{"status": "success", "value": item * 2} for item in items]
+
+    coalescer = WriteCoalescer(flush, max_items=5, max_delay=0.5, backend="test")
+    results = {}
+    start = threading.Barrier(10)
+
+    def call(value):
+        start.wait()
+        results[value] = coalescer.submit("t", value)
+
+    threads = [threading.Thread(target=call, args=(value,)) for value in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(len(items) for _, items in flushed) == [5, 5]
+    assert all(results[value]["value"] == value * 2 for value in range(10))
+
+    # 未凑满时由第一个调用方在 max_delay 后写入
+    coalescer.max_delay = 0.01
+    assert coalescer.submit("t", 7)["value"] == 14
+    assert flushed[-1] == ("t", [7])
+
+
+def test_thread_coalescer_reports_flush_failure_to_every_caller():
+    def flush(key, items):
+        raise RuntimeError("connection lost")
+
+    coalescer = WriteCoalescer(flush, max_items=2, max_delay=0.01, backend="test")
+    assert coalescer.submit("t", 1) == {"status": "error", "message": "connection lost"}
+
+
+def test_async_coalescer_batches_by_key_and_survives_cancelled_callers():
+    flushed = []
+
+    async def flush(key, items):
+        flushed.append((key, list(items)))
+        return [{"status": "success", "value": item} for item in items]
+
+    async def scenario():
+        coalescer = AsyncWriteCoalescer(flush, max_items=3, max_delay=0.02, backend="test")
+        cancelled = asyncio.ensure_future(coalescer.submit("a", 0))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        results = await asyncio.gather(*[coalescer.submit("a", value) for value in range(1, 5)],
+                                       coalescer.submit("b", 9))
+        return [result["value"] for result in results]
+
+    assert asyncio.run(scenario()) == [1, 2, 3, 4, 9]
+    assert sorted(len(items) for key, items in flushed if key == "a") == [2, 3]
+
+
+def test_flush_does_not_inherit_the_triggering_callers_request(monkeypatch):
+    monkeypatch.setattr(Config, "WRITE_COALESCING_FLUSH_TIMEOUT_SECONDS", 30)
+    seen = []
+
+    def observe(key, items):
+        request = current_request()
+        seen.append((request.aborted, round(request.remaining()), round(_csot.get_timeout())))
+        return [{"status": "success"} for _ in items]
+
+    async def async_observe(key, items):
+        return observe(key, items)
+
+    @contextmanager
+    def triggering_request():
+        # 触发 flush 的调用方：剩余 0.5 秒、已被客户端断开
+        request = RequestContext(time.monotonic() + 0.5)
+        request.abort("disconnect")
+        token = admission._current.set(request)
+        try:
+            with pymongo.timeout(0.5):
+                yield
+        finally:
+            admission._current.reset(token)
+
+    coalescer = WriteCoalescer(observe, max_items=1, max_delay=0.01, backend="test")
+    with triggering_request():
+        assert coalescer.submit("t", 1) == {"status": "success"}
+
+    async def scenario():
+        async_coalescer = AsyncWriteCoalescer(async_observe, max_items=1, max_delay=0.01, backend="test")
+        with triggering_request():
+            return await async_coalescer.submit("t", 1)
+
+    assert asyncio.run(scenario()) == {"status": "success"}
+    assert seen == [(None, 30, 30), (None, 30, 30)]
+
+
+def test_sql_batch_isolates_failing_rows(tmp_path, monkeypatch):
+    sqlite_odbc.DATABASE_PATH = str(tmp_path / "coalesce.db")
+    conn = sqlite_odbc.connect()
+    conn.cursor().execute("CREATE TABLE items (id INT PRIMARY KEY, name TEXT)")
+    conn.cursor().execute("INSERT INTO items VALUES (1, 'existing')")
+    conn.commit()
+    monkeypatch.setattr(Config, "get_sql_server_connection", staticmethod(lambda: sqlite_odbc.connect()))
+    monkeypatch.setattr(Config, "CATALOG_VALIDATE_INSERTS", False)
+    SQLServerDatabaseManager.close_connection()
+    try:
+        results = insert_data_batch("items", ["id", "name"], [[2, "a"], [1, "duplicate"], [3], [4, "b"]])
+        assert [result["status"] for result in results] == ["success", "error", "error", "success"]
+        assert "UNIQUE" in results[1]["message"]
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM items ORDER BY id")
+        assert [row[0] for row in cursor.fetchall()] == [1, 2, 4]
+    finally:
+        conn.close()
+        SQLServerDatabaseManager.close_connection()